@@ -39,6 +39,10 @@ class SCMLAWI(AgentWorldInterface):
         """
         return self._world.buy_insurance(contract=contract, agent=self.agent)
 
+    def route_cfps(self) -> None:
+        """Sends new CFPs for the current `interesting_products` of the agent to it (called when they are set)"""
+        self._world._route_cfps(self.agent)
+
     @property
     def products(self):
         """Products in the world"""
@@ -3,6 +3,7 @@ import itertools
 import math
 import sys
 import uuid
+from heapq import heappush, heappop
 from abc import abstractmethod
 from collections import defaultdict
 from typing import Dict, Set, Union, Tuple, Iterable, List, Optional, Any
@@ -29,7 +30,7 @@ __all__ = ['Product', 'Process', 'InputOutput', 'RunningCommandInfo'
     , 'FactoryStatusUpdate', 'Job', 'ProductionNeed'
     , 'MissingInput', 'ProductionReport', 'ProductionFailure'
     , 'SCMLAgreement', 'SCMLAction', 'SCMLAgent'
-    , 'CFP', 'Loan', 'InsurancePolicy', 'Factory']
+    , 'CFP', 'Loan', 'InsurancePolicy', 'Factory', 'ProductionEngine']
 
 
 @dataclass
@@ -822,8 +823,24 @@ class SCMLAgent(Agent):
         self.transportation_delay: int = 0
         self.products: List[Product] = []
         self.processes: List[Process] = []
-        self.interesting_products: List[int] = []
-        """The products for which CFPs should be sent to this agent"""
+        self._interesting_products: List[int] = []
+
+    @property
+    def interesting_products(self) -> List[int]:
+        """The products for which CFPs should be sent to this agent.
+
+        Remarks:
+            - Assign a new list to change them. The world is informed of the assignment and updates the routing of new
+              CFPs to the agent accordingly (changing the list in place is not noticed).
+        """
+        return self._interesting_products
+
+    @interesting_products.setter
+    def interesting_products(self, products: List[int]):
+        self._interesting_products = products
+        route_cfps = getattr(self.awi, 'route_cfps', None)
+        if route_cfps is not None:
+            route_cfps()
 
     def init(self):
         super().init()
@@ -963,6 +980,12 @@ class Factory:
     """Current simulation step"""
     _carried_updates: FactoryStatusUpdate = field(init=False, default_factory=lambda: FactoryStatusUpdate.empty())
     """Carried updates from last executed command"""
+    _line_events: np.array = field(init=False)
+    """The next step at which each line has something to do (run a job, apply an update or end its command)"""
+    _line_synced: np.array = field(init=False)
+    """The step up to which the command of each line was stepped"""
+    _line_jobs: List[List[int]] = field(init=False)
+    """A heap of the times of the jobs scheduled on each line (may contain cancelled jobs)"""
 
     def __post_init__(self, initial_storage: Dict[int, int], initial_wallet=0.0):
         # no matter what are the line indices in the given profiles, the lines used by the factory
@@ -976,6 +999,9 @@ class Factory:
         self._n_lines = len(given_lines)
         self._commands = np.array([RunningCommandInfo.do_nothing() for _ in range(self._n_lines)])
         self._line_schedules = np.ones(self._n_lines, dtype=int) * NO_PRODUCTION
+        self._line_events = np.full(self._n_lines, sys.maxsize, dtype=np.int64)
+        self._line_synced = np.zeros(self._n_lines, dtype=np.int64)
+        self._line_jobs = [[] for _ in range(self._n_lines)]
         self._storage = defaultdict(int)
         self._total_storage = 0
         for k, v in initial_storage.items():
@@ -1088,6 +1114,9 @@ class Factory:
         existing_job = self._jobs.get((t, line), None)
         if existing_job is None:
             self._jobs[(t, line)] = job
+            heappush(self._line_jobs[line], t)
+            if self._next_step <= t < self._line_events[line]:
+                self._line_events[line] = t
             return
         if existing_job.is_cancelling(job):
             del self._jobs[(t, line)]
@@ -1104,23 +1133,51 @@ class Factory:
                 self._storage[k] += v
                 self._total_storage += v
 
+    def _apply_carried_updates(self) -> Optional[ProductionReport]:
+        if self._carried_updates.is_empty:
+            return None
+        report = ProductionReport(line=-1, started=None, continuing=None, finished=None, failure=None
+                                  , updates=self._carried_updates)
+        self._apply_updates(self._carried_updates)
+        self._carried_updates = FactoryStatusUpdate.empty()
+        return report
+
     def step(self) -> List[ProductionReport]:
         reports = []
-        if not self._carried_updates.is_empty:
-            reports.append(ProductionReport(line=-1, started=None, continuing=None, finished=None, failure=None
-                                            , updates=self._carried_updates))
-            self._apply_updates(self._carried_updates)
-            self._carried_updates = FactoryStatusUpdate.empty()
+        carried = self._apply_carried_updates()
+        if carried is not None:
+            reports.append(carried)
         for line in range(self._n_lines):
-            # step the current production process
-            if self._commands[line].ended_before(self._next_step):
-                self._commands[line].action = 'none'
             report = self._step_line(line=line)
             reports.append(report)
             self._apply_updates(report.updates)
         self._next_step += 1
         return reports
 
+    def step_lines(self, lines: Iterable[int]) -> List[ProductionReport]:
+        """
+        Steps the factory running only the given lines.
+
+        Args:
+            lines: The lines to step. Any line that has nothing to do at this step (see `_line_events`) can be left out
+                   and will be caught up the next time it is stepped
+
+        Returns:
+            The reports of the lines that started, finished or failed a command or applied some updates (the carried
+            updates of commands finished in the previous step are reported on line -1)
+        """
+        reports = []
+        carried = self._apply_carried_updates()
+        if carried is not None:
+            reports.append(carried)
+        for line in lines:
+            report = self._step_line(line=line)
+            self._apply_updates(report.updates)
+            if not report.is_empty:
+                reports.append(report)
+        self._next_step += 1
+        return reports
+
     def _run(self, profile: ManufacturingProfile, override=True) -> None:
         """running is executed at the beginning of the step t
 
@@ -1235,6 +1292,47 @@ class Factory:
         (FactoryStatusUpdate(balance=-profile.cancellation_cost, storage={}))}
 
     def _step_line(self, line: int) -> ProductionReport:
+        """
+        Steps the line to the time-step `t` catching up with any steps it was left out of by `step_lines`
+
+        Args:
+            line: the line to step
+
+        Returns:
+            ProductionReport
+        """
+        t = self._next_step
+        command = self._commands[line]
+        if not command.is_none and not command.paused:
+            # the line had nothing to do in the skipped steps so its command just moved forward
+            command.step += t - self._line_synced[line]
+        if command.ended_before(t):
+            command.action = 'none'
+        report = self._execute_line(line=line)
+        self._line_synced[line] = t + 1
+        self._line_events[line] = self._next_line_event(line=line)
+        return report
+
+    def _next_line_event(self, line: int) -> int:
+        """Finds the first step after the current one at which the given line has something to do"""
+        t = self._next_step
+        jobs = self._line_jobs[line]
+        while len(jobs) > 0 and (jobs[0] <= t or (jobs[0], line) not in self._jobs):
+            heappop(jobs)
+        event = jobs[0] if len(jobs) > 0 else sys.maxsize
+        command = self._commands[line]
+        if command.is_none:
+            return event
+        if command.paused:
+            return t + 1
+        # the command finishes at end - 1 and is removed at end
+        event = min(event, max(command.end - 1, t + 1))
+        for k in command.updates.keys():
+            if k >= command.step:
+                event = min(event, t + 1 + k - command.step)
+        return event
+
+    def _execute_line(self, line: int) -> ProductionReport:
         """
         Steps the line to the time-step `t` assuming that it is already stepped to time-step t-1 given the storage
 
@@ -1318,3 +1416,44 @@ class Factory:
                                 , started=running_command if running_command.beg == t else None
                                 , finished=running_command if running_command.end <= t + 1 else None
                                 , failure=None, line=line)
+
+
+class ProductionEngine:
+    """Steps the production lines of a set of factories together.
+
+    The next step at which every line of every factory has something to do (see `Factory._line_events`) is kept in a
+    single array shared with the factories so that finding the lines to step is a single vectorized comparison. Idle
+    lines are never stepped and no reports are created for them.
+
+    Args:
+        factories: The factories to step. They must all be at the same step.
+
+    """
+
+    def __init__(self, factories: List[Factory]):
+        self.factories = factories
+        n_lines = np.array([factory.n_lines for factory in factories], dtype=int)
+        self._owners = np.repeat(np.arange(len(factories)), n_lines)
+        self._offsets = np.concatenate(([0], np.cumsum(n_lines))).astype(int)
+        self._events = np.full(int(self._offsets[-1]), sys.maxsize, dtype=np.int64)
+        for i, factory in enumerate(factories):
+            events = self._events[self._offsets[i]:self._offsets[i + 1]]
+            events[:] = factory._line_events
+            factory._line_events = events
+        self._next_step = factories[0].next_step if len(factories) > 0 else 0
+
+    def step(self) -> List[List[ProductionReport]]:
+        """
+        Steps all factories
+
+        Returns:
+            For every factory (in order), the reports of its lines that started, finished or failed a command or applied
+            some updates (see `Factory.step_lines`)
+        """
+        active = np.flatnonzero(self._events <= self._next_step)
+        owners = self._owners[active]
+        lines: Dict[int, List[int]] = defaultdict(list)
+        for owner, line in zip(owners.tolist(), (active - self._offsets[owners]).tolist()):
+            lines[owner].append(line)
+        self._next_step += 1
+        return [factory.step_lines(lines.get(i, [])) for i, factory in enumerate(self.factories)]
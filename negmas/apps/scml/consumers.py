@@ -262,7 +262,14 @@ class ScheduleDrivenConsumer(Consumer):
         if self.immediate_cfp_update and new_quantity != old_quantity:
             self.register_product_cfps(p=cfp.product, t=t, profile=self.profiles[cfp.product])
         for negotiation in self.running_negotiations.values():
-            self.notify(negotiation.negotiator, Notification(type='ufun_modified', data=None))
+            # only outcomes delivering the same product at the same time depend on the modified schedule
+            other = negotiation.annotation.get('cfp', None) if negotiation.annotation else None
+            if other is not None and other.product != cfp.product:
+                continue
+            info = negotiation.negotiator.mechanism_info
+            modified = None if other is None or info is None or info.outcomes is None \
+                else [_ for _ in info.outcomes if _['time'] == t]
+            self.notify(negotiation.negotiator, Notification(type='ufun_modified', data=modified))
 
 
 
@@ -2,9 +2,11 @@ import itertools
 from abc import abstractmethod, ABC
 from collections import defaultdict
 
+import numpy as np
+
 from negmas import GeniusNegotiator
 from negmas.apps.scml.simulators import FactorySimulator, FastFactorySimulator, storage_as_array, temporary_transaction
-from negmas.common import NamedObject, MechanismState, MechanismInfo
+from negmas.common import MechanismState, MechanismInfo
 from negmas.events import Notification
 from negmas.helpers import get_class, instantiate
 from negmas.java import JavaCallerMixin, JavaConvertible, to_java
@@ -19,7 +21,7 @@ from .consumers import ScheduleDrivenConsumer, ConsumptionProfile
 from .schedulers import Scheduler, ScheduleInfo, GreedyScheduler
 
 if True:
-    from typing import Dict, Iterable, Any, Callable, Collection, Type, List, Optional, Union
+    from typing import Dict, Iterable, Any, Callable, Collection, Type, List, Optional, Union, Sequence
 
 __all__ = [
     'FactoryManager', 'DoNothingFactoryManager', 'GreedyFactoryManager', 'JavaFactoryManager'
@@ -219,6 +221,18 @@ class GreedyFactoryManager(FactoryManager):
             return INVALID_UTILITY
         return schedule.final_balance
 
+    def total_utilities(self, alternatives: Sequence[Contract]) -> np.array:
+        """Calculates the total utility for the agent of each one of the given contracts alone (see `total_utility`)"""
+        if self.scheduler is None:
+            raise ValueError('Cannot calculate total utility without a scheduler')
+        min_concluded_at = self.awi.current_step
+        min_sign_at = min_concluded_at + self.awi.default_signing_delay
+        balances, valid = self.scheduler.evaluate_batch(contracts=alternatives, assume_no_further_negotiations=False
+                                                        , ensure_storage_for=self.transportation_delay
+                                                        , start_at=min_sign_at)
+        balances[~valid] = INVALID_UTILITY
+        return balances
+
     def init(self):
         super().init()
         if self.use_consumer:
@@ -245,10 +259,18 @@ class GreedyFactoryManager(FactoryManager):
             return self.consumer.on_negotiation_request(cfp=cfp, partner=partner)
         else:
             neg = self.negotiator_type(name=self.name + '*' + partner, **self.negotiator_params)
-            neg.utility_function = normalize(self.ufun_factory(self, self._create_annotation(cfp=cfp)),
-                                             outcomes=cfp.outcomes, infeasible_cutoff=0)
+            outcomes = cfp.outcomes
+            neg.utility_function = normalize(self._negotiator_utility(cfp, outcomes), outcomes=outcomes
+                                             , infeasible_cutoff=0)
             return neg
 
+    def _negotiator_utility(self, cfp: 'CFP', outcomes: List[Outcome]) -> 'NegotiatorUtility':
+        """Creates the utility function of a negotiator about the given cfp evaluating all of its outcomes at once"""
+        ufun = self.ufun_factory(self, self._create_annotation(cfp=cfp))
+        if isinstance(ufun, NegotiatorUtility):
+            ufun.prefetch(outcomes)
+        return ufun
+
     def on_negotiation_success(self, contract: Contract, mechanism: MechanismInfo):
         super().on_negotiation_success(contract=contract, mechanism=mechanism)
         if self.use_consumer:
@@ -357,6 +379,7 @@ class GreedyFactoryManager(FactoryManager):
             self._execute_schedule(schedule=schedule, contract=contract)
         if contract.annotation['buyer'] != self.id or not self.use_consumer:
             for negotiation in self.running_negotiations.values():
+                # the outcomes affected by a change in the simulator are not known so all of them are reevaluated
                 self.notify(negotiation.negotiator, Notification(type='ufun_modified', data=None))
 
     def _process_buy_cfp(self, cfp: 'CFP') -> None:
@@ -368,8 +391,9 @@ class GreedyFactoryManager(FactoryManager):
             neg = self.negotiator_type(assume_normalized=True, name=self.name + '>' + cfp.publisher)
         else:
             neg = self.negotiator_type(name=self.name + '>' + cfp.publisher)
-        neg.utility_function = normalize(self.ufun_factory(self, self._create_annotation(cfp=cfp)),
-                                         outcomes=cfp.outcomes, infeasible_cutoff=-1500)
+        outcomes = cfp.outcomes
+        neg.utility_function = normalize(self._negotiator_utility(cfp, outcomes), outcomes=outcomes
+                                         , infeasible_cutoff=-1500)
         self.request_negotiation(negotiator=neg, extra=None, partners=[cfp.publisher, self.id]
                                  , issues=cfp.issues, annotation=self._create_annotation(cfp=cfp)
                                  , mechanism_name='negmas.sao.SAOMechanism')
@@ -482,7 +506,15 @@ TotalUtilityFun = Callable[[Collection[Contract]], float]
 
 
 class NegotiatorUtility(UtilityFunctionProxy):
-    """The utility function of a negotiator."""
+    """The utility function of a negotiator.
+
+    Remarks:
+
+        - Utility values are cached until the committed state of the agent's simulator changes (see
+          `FactorySimulator.version`) or the simulation moves to another step. Evaluating the same agreement again in
+          the meantime costs a dictionary lookup. Subclasses whose value depends on anything else must include it in
+          `_cache_key`.
+    """
 
     def __init__(self, agent: GreedyFactoryManager, annotation: Dict[str, Any], name: Optional[str] = None):
         if name is None:
@@ -490,6 +522,8 @@ class NegotiatorUtility(UtilityFunctionProxy):
         super().__init__(name=name)
         self.agent = agent
         self.annotation = annotation
+        self._cache: Dict[Any, Optional[UtilityValue]] = {}
+        self._cached_state: Any = None
 
     def _contracts(self, agreements: Iterable[SCMLAgreement]) -> Collection[Contract]:
         """Converts agreements/outcomes into contracts"""
@@ -508,17 +542,59 @@ class NegotiatorUtility(UtilityFunctionProxy):
     def _free_sale(self, agreement: SCMLAgreement) -> bool:
         return self.annotation['seller'] == self.agent.id and agreement['unit_price'] < 1e-6
 
-    def __call__(self, outcome: Outcome) -> Optional[UtilityValue]:
+    @staticmethod
+    def _as_agreement(outcome: Outcome) -> SCMLAgreement:
         if isinstance(outcome, dict):
-            return self.call(agreement=SCMLAgreement(**outcome))
+            return SCMLAgreement(**outcome)
         if isinstance(outcome, SCMLAgreement):
-            return self.call(agreement=outcome)
+            return outcome
         raise ValueError(f'Outcome: {outcome} cannot be converted to an SCMLAgreement')
 
+    def _update_cache_state(self) -> None:
+        state = (self.agent.simulator, self.agent.simulator.version, self.agent.awi.current_step)
+        if self._cached_state != state:
+            self._cache, self._cached_state = {}, state
+
+    def prefetch(self, outcomes: Iterable[Outcome]) -> None:
+        """Evaluates the given outcomes together (see `call_batch`) caching their utility values"""
+        self._update_cache_state()
+        missing: Dict[Any, SCMLAgreement] = {}
+        for outcome in outcomes:
+            agreement = self._as_agreement(outcome)
+            key = self._cache_key(agreement)
+            if key not in self._cache:
+                missing[key] = agreement
+        if len(missing) == 0:
+            return
+        self._cache.update(zip(missing.keys(), self.call_batch(list(missing.values()))))
+
+    def __call__(self, outcome: Outcome) -> Optional[UtilityValue]:
+        agreement = self._as_agreement(outcome)
+        self._update_cache_state()
+        key = self._cache_key(agreement)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        value = self._cache[key] = self.call(agreement=agreement)
+        return value
+
+    @staticmethod
+    def _agreement_key(agreement: SCMLAgreement) -> Any:
+        return agreement.time, agreement.unit_price, agreement.quantity, agreement.penalty, agreement.signing_delay
+
+    def _cache_key(self, agreement: SCMLAgreement) -> Any:
+        """The key used to cache the utility value of an agreement (see `__call__`)"""
+        return self._agreement_key(agreement)
+
     @abstractmethod
     def call(self, agreement: SCMLAgreement) -> Optional[UtilityValue]:
         """Called to evaluate a agreement"""
 
+    def call_batch(self, agreements: Sequence[SCMLAgreement]) -> List[Optional[UtilityValue]]:
+        """Called to evaluate many agreements. Override to share computations between them"""
+        return [self.call(agreement=_) for _ in agreements]
+
     def xml(self, issues: List[Issue]) -> str:
         return 'NegotiatorUtility has not xml representation'
 
@@ -540,10 +616,34 @@ class PessimisticNegotiatorUtility(NegotiatorUtility):
             return INVALID_UTILITY
         return hypothetical - base_util
 
+    def call_batch(self, agreements: Sequence[SCMLAgreement]) -> List[Optional[UtilityValue]]:
+        results: List[Optional[UtilityValue]] = [INVALID_UTILITY] * len(agreements)
+        indices = [i for i, _ in enumerate(agreements) if not self._free_sale(_)]
+        if len(indices) == 0:
+            return results
+        base_util = self.agent.simulator.final_balance
+        utilities = self.agent.total_utilities([self._contract(agreements[_]) for _ in indices])
+        for i, u in zip(indices, utilities):
+            results[i] = INVALID_UTILITY if u < 0 else float(u) - base_util
+        return results
+
 
 class OptimisticNegotiatorUtility(NegotiatorUtility):
     """The utility function of a negotiator that assumes other negotiations currently open will succeed."""
 
+    def _current_offers(self) -> List[Outcome]:
+        offers = []
+        for negotiation in self.agent.running_negotiations.values():  # type: ignore
+            current_offer = negotiation.negotiator.my_last_proposal
+            if current_offer is not None:
+                offers.append(current_offer)
+        return offers
+
+    def _cache_key(self, agreement: SCMLAgreement) -> Any:
+        offers = tuple(self._agreement_key(SCMLAgreement(**_) if isinstance(_, dict) else _)
+                       for _ in self._current_offers())
+        return self._agreement_key(agreement), offers
+
     def call(self, agreement: SCMLAgreement) -> Optional[UtilityValue]:
         if self._free_sale(agreement):
             return INVALID_UTILITY
@@ -551,11 +651,8 @@ class OptimisticNegotiatorUtility(NegotiatorUtility):
         # hypothetical = list(contracts)
         # hypothetical.append(self._contract(agreement))
         hypothetical = [self._contract(agreement)]
-        for negotiation in self.agent.running_negotiations.values():  # type: ignore
-            negotiator = negotiation.negotiator
-            current_offer = negotiator.my_last_proposal
-            if current_offer is not None:
-                hypothetical.append(self._contract(current_offer))
+        for current_offer in self._current_offers():
+            hypothetical.append(self._contract(current_offer))
         base_util = self.agent.simulator.final_balance
         hypothetical = self.agent.total_utility(list(hypothetical))
         if hypothetical < 0:
@@ -568,11 +665,18 @@ class AveragingNegotiatorUtility(NegotiatorUtility):
 
     def __init__(self, agent: GreedyFactoryManager, annotation: Dict[str, Any], name: Optional[str] = None
                  , optimism: float = 0.5):
-        NamedObject.__init__(self=self, name=name)
+        super().__init__(agent=agent, annotation=annotation, name=name)
         self.optimism = optimism
         self.optimistic = OptimisticNegotiatorUtility(agent=agent, annotation=annotation)
         self.pessimistic = PessimisticNegotiatorUtility(agent=agent, annotation=annotation)
 
+    def _cache_key(self, agreement: SCMLAgreement) -> Any:
+        return self.optimistic._cache_key(agreement)
+
+    def call_batch(self, agreements: Sequence[SCMLAgreement]) -> List[Optional[UtilityValue]]:
+        self.pessimistic.prefetch(agreements)
+        return super().call_batch(agreements)
+
     def call(self, agreement: SCMLAgreement) -> Optional[UtilityValue]:
         if self._free_sale(agreement):
             return INVALID_UTILITY
@@ -1,15 +1,15 @@
 import math
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Callable, Collection, List, Optional
+from collections import defaultdict
+from typing import Dict, Any, Callable, Collection, List, Optional, Tuple, Sequence
 
 import numpy as np
 from dataclasses import dataclass, field
 
-from negmas.apps.scml.helpers import zero_runs
 from negmas.situated import Contract
 from .common import ProductionNeed, Job, Product, Process, ProductManufacturingInfo, SCMLAgreement, \
     ManufacturingProfileCompiled, INVALID_UTILITY
-from .simulators import FactorySimulator, NO_PRODUCTION, transaction
+from .simulators import FactorySimulator, NO_PRODUCTION, transaction, temporary_transaction
 
 __all__ = [
     'ScheduleInfo', 'Scheduler', 'GreedyScheduler'
@@ -171,6 +171,35 @@ class Scheduler(ABC):
                                   , ensure_storage_for=ensure_storage_for
                                   , start_at=start_at)
 
+    def evaluate_batch(self, contracts: Sequence[Contract]
+                       , assume_no_further_negotiations=False
+                       , ensure_storage_for: int = 0
+                       , start_at: int = 0) -> Tuple[np.array, np.array]:
+        """
+        Evaluates each contract alone against the current state (nothing is scheduled)
+
+        Args:
+            contracts: Alternative contracts to be evaluated
+            assume_no_further_negotiations: whether to assume that more negotiations can take place (to secure
+            production needs)
+            ensure_storage_for: A minimum time to ensure that products are available in storage before contract delivery
+            times (sell contracts).
+            start_at: The time at which to start scheduling. No jobs will be scheduled before this time.
+
+        Returns:
+            The final balance and validity of the schedule resulting from each contract (i.e. the `final_balance` and
+            `valid` members of the `ScheduleInfo` that `schedule` would return for it)
+
+        """
+        balances, valid = np.empty(len(contracts)), np.zeros(len(contracts), dtype=bool)
+        for i, contract in enumerate(contracts):
+            with temporary_transaction(self.simulator):
+                schedule = self.schedule(contracts=[contract], ensure_storage_for=ensure_storage_for
+                                         , assume_no_further_negotiations=assume_no_further_negotiations
+                                         , start_at=start_at)
+            balances[i], valid[i] = schedule.final_balance, schedule.valid
+        return balances, valid
+
     @abstractmethod
     def find_schedule(self, contracts: Collection[Contract]
                       , start: int, end: int
@@ -367,94 +396,18 @@ class GreedyScheduler(Scheduler):
                 else:
                     return ScheduleInfo(end=end, valid=False, failed_contracts=[contract],
                                         final_balance=INVALID_UTILITY)
-            jobs: List[Job] = []
-            needs: List[ProductionNeed] = []
-
             with transaction(simulator) as bookmark:
-                some_production = True
-                while q_needed > 0 and some_production:
-                    some_production = False
-                    # I need now to schedule the production needed and calculate all required input products
-                    for info in self.producing[pid]:
-                        # find if it is possible to use the current process for producing the product
-                        profile = self.profiles[info.profile]
-                        line, process_index, profile_index = profile.line, profile.process, info.profile
-                        q_produced, t_production = info.quantity, info.step
-                        current_schedule = simulator.line_schedules_to(t - ensure_storage_for - 1)[line][start:]
-                        if len(current_schedule) < t_production:
-                            continue
-                        locs = zero_runs((current_schedule != NO_PRODUCTION).astype(int))
-                        lengths = locs[:, 1] - locs[:, 0]
-                        indices = np.array(range(len(lengths)))
-                        indices = indices[lengths >= t_production]
-                        if len(indices) < 1:
-                            continue
-                        lengths, locs = lengths[indices], locs[indices]
-                        if self.strategy == 'earliest':
-                            loc = locs[0, :]
-                        elif self.strategy == 'latest':
-                            loc = locs[-1, :] - 1
-                            loc[0] = loc[1] - t_production + 1
-                        elif self.strategy == 'shortest':
-                            sorted_lengths = sorted(zip(range(len(lengths)), lengths), key=lambda x: x[1])
-                            loc = locs[sorted_lengths[0][0], :]
-                        elif self.strategy == 'longest':
-                            sorted_lengths = sorted(zip(range(len(lengths)), lengths), key=lambda x: x[1], reverse=True)
-                            loc = locs[sorted_lengths[0][0], :]
-                        else:
-                            raise ValueError(f'Unknown production strategy {self.strategy}')
-                        ptime = loc[0] + start
-                        job = Job(line=line, action='run', time=ptime, profile=profile_index
-                                  , contract=contract, override=False)
-                        if not simulator.schedule(job, override=False, ignore_inventory_shortage=ignore_failures
-                            , ignore_money_shortage=ignore_failures
-                            , ignore_space_shortage=ignore_failures):
-                            continue  # should never hit this
-                        jobs.append(job)
-                        # find the needs
-                        new_needs = []
-                        process = self.processes[process_index]
-                        length = profile.n_steps
-                        for i in process.inputs:
-                            pind, quantity = i.product, i.quantity
-                            # I need the input to be available the step before production
-                            step = ptime + int(math.floor(i.step * length)) - 1
-                            if step < 0:
-                                break
-                            available = max(0, self.simulator.available_storage_at(step)[pind] - quantity)
-                            if available >= quantity:
-                                instore, tobuy = quantity, 0
-                            else:
-                                instore, tobuy = available, quantity - available
-                            if tobuy > 0 or instore > 0:
-                                if step < start:
-                                    break
-                                needs.append(ProductionNeed(product=pind, needed_for=contract
-                                                            , quantity_in_storage=instore, quantity_to_buy=tobuy
-                                                            , step=step))
-                        else:  # all inputs can be secured in time
-                            # @todo consider stopping production after the product is available (+ ensure_storage_for) if needed
-                            q_needed -= q_produced
-                            some_production = True
-                            break
+                jobs, needs, q_needed = self._schedule_production(contract=contract, product=pid, q_needed=q_needed
+                                                                  , t=t, start=start
+                                                                  , ensure_storage_for=ensure_storage_for
+                                                                  , ignore_failures=ignore_failures)
                 if q_needed <= 0:
-                    # add the effect of selling
-                    if not simulator.sell(product=pid, quantity=q, price=p, t=t, ignore_money_shortage=ignore_failures
-                        , ignore_inventory_shortage=ignore_failures):
+                    if not self._sell_produced(product=pid, quantity=q, price=p, t=t, needs=needs
+                                               , ignore_failures=ignore_failures):
                         simulator.rollback(bookmark)
                         return ScheduleInfo(end=end, valid=False, failed_contracts=[contract],
                                             final_balance=INVALID_UTILITY)
 
-                    # add the effect of buying raw materials
-                    for need in needs:
-                        product_index = need.product
-                        product = self.products[product_index]
-                        catalog_price = product.catalog_price
-                        if catalog_price == 0 or need.quantity_to_buy <= 0:
-                            continue
-                        price = need.quantity_to_buy * catalog_price
-                        simulator.pay(price, t=need.step)
-
                     # create schedule
                     schedule = ScheduleInfo(jobs=jobs, end=end, needs=needs, failed_contracts=[]
                                             , final_balance=self.simulator.balance_at(end - 1))
@@ -465,6 +418,142 @@ class GreedyScheduler(Scheduler):
         raise ValueError(f'{self.manager_id} Not a seller of a buyer in Contract: {contract} with '
                          f'annotation: {contract.annotation}')
 
+    def _schedule_production(self, contract: Contract, product: int, q_needed: int, t: int, start: int
+                             , ensure_storage_for: int, ignore_failures: bool
+                             ) -> Tuple[List[Job], List[ProductionNeed], int]:
+        """
+        Schedules the production of a quantity of a product to be delivered at time t (on the simulator)
+
+        Returns:
+            The jobs scheduled, the production needs and the quantity that could not be scheduled
+        """
+        simulator, pid = self.simulator, product
+        jobs: List[Job] = []
+        needs: List[ProductionNeed] = []
+        some_production = True
+        while q_needed > 0 and some_production:
+            some_production = False
+            # I need now to schedule the production needed and calculate all required input products
+            for info in self.producing[pid]:
+                # find if it is possible to use the current process for producing the product
+                profile = self.profiles[info.profile]
+                line, process_index, profile_index = profile.line, profile.process, info.profile
+                q_produced, t_production = info.quantity, info.step
+                ptime = simulator.free_slot(line=line, length=t_production, start=start
+                                            , end=t - ensure_storage_for, strategy=self.strategy)
+                if ptime is None:
+                    continue
+                job = Job(line=line, action='run', time=ptime, profile=profile_index
+                          , contract=contract, override=False)
+                if not simulator.schedule(job, override=False, ignore_inventory_shortage=ignore_failures
+                    , ignore_money_shortage=ignore_failures
+                    , ignore_space_shortage=ignore_failures):
+                    continue  # should never hit this
+                jobs.append(job)
+                # find the needs
+                new_needs = []
+                process = self.processes[process_index]
+                length = profile.n_steps
+                for i in process.inputs:
+                    pind, quantity = i.product, i.quantity
+                    # I need the input to be available the step before production
+                    step = ptime + int(math.floor(i.step * length)) - 1
+                    if step < 0:
+                        break
+                    available = max(0, self.simulator.available_storage_at(step)[pind] - quantity)
+                    if available >= quantity:
+                        instore, tobuy = quantity, 0
+                    else:
+                        instore, tobuy = available, quantity - available
+                    if tobuy > 0 or instore > 0:
+                        if step < start:
+                            break
+                        needs.append(ProductionNeed(product=pind, needed_for=contract
+                                                    , quantity_in_storage=instore, quantity_to_buy=tobuy
+                                                    , step=step))
+                else:  # all inputs can be secured in time
+                    # @todo consider stopping production after the product is available (+ ensure_storage_for) if needed
+                    q_needed -= q_produced
+                    some_production = True
+                    break
+        return jobs, needs, q_needed
+
+    def _sell_produced(self, product: int, quantity: int, price: float, t: int, needs: List[ProductionNeed]
+                       , ignore_failures: bool) -> bool:
+        """Simulates selling after production is scheduled paying for the inputs needed. Returns success"""
+        simulator = self.simulator
+        pid, q, p = product, quantity, price
+        # add the effect of selling
+        if not simulator.sell(product=pid, quantity=q, price=p, t=t, ignore_money_shortage=ignore_failures
+            , ignore_inventory_shortage=ignore_failures):
+            return False
+
+        # add the effect of buying raw materials
+        for need in needs:
+            product_index = need.product
+            product = self.products[product_index]
+            catalog_price = product.catalog_price
+            if catalog_price == 0 or need.quantity_to_buy <= 0:
+                continue
+            price = need.quantity_to_buy * catalog_price
+            simulator.pay(price, t=need.step)
+
+        return True
+
+    def evaluate_batch(self, contracts: Sequence[Contract]
+                       , assume_no_further_negotiations=False
+                       , ensure_storage_for: int = 0
+                       , start_at: int = 0) -> Tuple[np.array, np.array]:
+        """
+        Evaluates each contract alone against the current state (nothing is scheduled)
+
+        Remarks:
+
+            - Sell contracts that need production and differ only in price share the production schedule (jobs and
+              needs) which is found once per delivery time and quantity.
+            - See `Scheduler.evaluate_batch` for the arguments and return value
+
+        """
+        simulator = self.simulator
+        balances, valid = np.full(len(contracts), INVALID_UTILITY, dtype=float), np.zeros(len(contracts), dtype=bool)
+        ignore_failures = not assume_no_further_negotiations
+        # `schedule` does not pass start_at to schedule_contract
+        start = max(simulator.fixed_before, 0)
+        productions: Dict[Tuple[int, int, int], List[int]] = defaultdict(list)
+        others = []
+        for i, contract in enumerate(contracts):
+            agreement, annotation = contract.agreement, contract.annotation
+            if agreement is None or annotation['buyer'] == self.manager_id \
+                or annotation['seller'] != self.manager_id or agreement['time'] < start:
+                others.append(i)
+                continue
+            t, q, pid = agreement['time'], int(agreement['quantity']), annotation['cfp'].product
+            if q - simulator.available_storage_at(t)[pid] <= 0:
+                others.append(i)
+                continue
+            productions[(pid, t, q)].append(i)
+        if len(others) > 0:
+            balances[others], valid[others] = super().evaluate_batch(
+                [contracts[_] for _ in others], assume_no_further_negotiations=assume_no_further_negotiations
+                , ensure_storage_for=ensure_storage_for, start_at=start_at)
+        for (pid, t, q), indices in productions.items():
+            with temporary_transaction(simulator):
+                jobs, needs, q_needed = self._schedule_production(
+                    contract=contracts[indices[0]], product=pid, q_needed=q - simulator.available_storage_at(t)[pid]
+                    , t=t, start=start, ensure_storage_for=ensure_storage_for, ignore_failures=ignore_failures)
+                if q_needed > 0:
+                    continue
+                for i in indices:
+                    agreement = contracts[i].agreement
+                    with temporary_transaction(simulator):
+                        if not self._sell_produced(product=pid, quantity=q, price=agreement['unit_price'] * q, t=t
+                                                   , needs=needs, ignore_failures=ignore_failures):
+                            continue
+                        balances[i] = simulator.final_balance
+                    # see find_schedule
+                    valid[i] = not (assume_no_further_negotiations and len(needs) > 0)
+        return balances, valid
+
     def schedule_contracts(self, contracts: Collection[Contract], end: int = None
                            , assume_no_further_negotiations=False
                            , ensure_storage_for: int = 0
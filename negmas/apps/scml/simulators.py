@@ -1,12 +1,14 @@
+import bisect
 import math
 import sys
 from abc import ABC, abstractmethod
 from collections import defaultdict
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Any
 import numpy as np
 from dataclasses import dataclass, field
 from contextlib import contextmanager
 from .common import ManufacturingProfile, Job, Factory, NO_PRODUCTION
+from .helpers import zero_runs
 
 __all__ = [
     'FactorySimulator',
@@ -48,6 +50,8 @@ class FactorySimulator(ABC):
         self._profiles = profiles
         self._n_products = n_products
         self._reserved_storage = np.zeros(shape=(n_products, n_steps))
+        # init() runs the constructor again so keep counting from the last version
+        self._version = getattr(self, '_version', -1) + 1
 
     def _as_array(self, storage: Dict[int, int]):
         return storage_as_array(storage=storage, n_products=self._n_products)
@@ -77,6 +81,12 @@ class FactorySimulator(ABC):
     def n_lines(self):
         """Number of lines"""
 
+    @property
+    def version(self) -> int:
+        """A counter that increases whenever a change to the simulated state is committed (i.e. every change except
+        those done after a bookmark and rolled back). Can be used to cache values computed from the state."""
+        return self._version
+
     @property
     @abstractmethod
     def final_balance(self) -> float:
@@ -130,6 +140,27 @@ class FactorySimulator(ABC):
     def line_schedules_at(self, t: int) -> np.array:
         return self.line_schedules_to(t)[:, -1]
 
+    def free_slot(self, line: int, length: int, start: int, end: int, strategy: str = 'latest') -> Optional[int]:
+        """
+        Finds a run of free (not producing) steps on a line
+
+        Args:
+            line: The line
+            length: The minimum number of free steps needed
+            start: The first step that can be used
+            end: The end of the steps that can be used (exclusive)
+            strategy: Which run to use among those with enough free steps in [start, end). Possible values are
+                      earliest, latest, shortest, longest (ties are resolved in favor of earlier runs)
+
+        Returns:
+            The first step of the slot (`length` steps before the end of the run for the latest strategy) or None if
+            no run within [start, end) has enough free steps
+        """
+        end = min(end, self.n_steps)
+        if end <= start:
+            return None
+        return _FreeSlots(self.line_schedules_to(end - 1)[line:line + 1]).find(0, length, start, end, strategy)
+
     def total_storage_to(self, t: int) -> np.array:
         return self.storage_to(t).sum(axis=0)
 
@@ -327,6 +358,7 @@ class FactorySimulator(ABC):
 
         """
         self._reserved_storage[product, t] += quantity
+        self._version += 1
         return True
 
     # ------------------
@@ -382,6 +414,86 @@ class FactorySimulator(ABC):
         """
 
 
+class _FreeSlots:
+    """Keeps the maximal runs of free (`NO_PRODUCTION`) steps of every line sorted by time.
+
+    Args:
+        line_schedules: The schedules of all lines (n_lines * n_steps). The index must be refreshed (see `refresh`)
+                        whenever this array is modified.
+    """
+
+    def __init__(self, line_schedules: np.array):
+        self._schedules = line_schedules
+        self._starts: List[List[int]] = []
+        self._ends: List[List[int]] = []
+        for line in range(line_schedules.shape[0]):
+            runs = self._runs(line, 0, line_schedules.shape[1])
+            self._starts.append([_[0] for _ in runs])
+            self._ends.append([_[1] for _ in runs])
+
+    def _runs(self, line: int, start: int, end: int) -> List[Tuple[int, int]]:
+        if start >= end:
+            return []
+        return [(int(s) + start, int(e) + start)
+                for s, e in zero_runs((self._schedules[line, start:end] != NO_PRODUCTION).astype(int))]
+
+    def refresh(self, line: int, start: int, end: int) -> None:
+        """Updates the free runs of a line after steps [start, end) of its schedule were modified"""
+        end = min(end, self._schedules.shape[1])
+        starts, ends = self._starts[line], self._ends[line]
+        # runs overlapping or touching the modified steps
+        first, last = bisect.bisect_left(ends, start), bisect.bisect_right(starts, end)
+        pieces = []
+        for s, e in zip(starts[first:last], ends[first:last]):
+            if s < start:
+                pieces.append((s, start))
+            if e > end:
+                pieces.append((end, e))
+        pieces += self._runs(line, start, end)
+        pieces.sort()
+        merged_starts, merged_ends = [], []
+        for s, e in pieces:
+            if merged_ends and merged_ends[-1] >= s:
+                merged_ends[-1] = max(merged_ends[-1], e)
+            else:
+                merged_starts.append(s)
+                merged_ends.append(e)
+        starts[first:last], ends[first:last] = merged_starts, merged_ends
+
+    def find(self, line: int, length: int, start: int, end: int, strategy: str = 'latest') -> Optional[int]:
+        """Finds the start of a free slot of the given length within [start, end) (see `FactorySimulator.free_slot`)"""
+        starts, ends = self._starts[line], self._ends[line]
+        first, last = bisect.bisect_right(ends, start), bisect.bisect_left(starts, end)
+        if strategy == 'earliest':
+            candidates = range(first, last)
+        elif strategy == 'latest':
+            candidates = range(last - 1, first - 1, -1)
+        elif strategy in ('shortest', 'longest'):
+            best, best_length = None, None
+            for i in range(first, last):
+                s, e = max(starts[i], start), min(ends[i], end)
+                if e - s < length:
+                    continue
+                if best is None or (e - s < best_length if strategy == 'shortest' else e - s > best_length):
+                    best, best_length = s, e - s
+            return best
+        else:
+            raise ValueError(f'Unknown production strategy {strategy}')
+        for i in candidates:
+            s, e = max(starts[i], start), min(ends[i], end)
+            if e - s >= length:
+                return s if strategy == 'earliest' else e - length
+        return None
+
+    def changed(self, index: Tuple[Any, Any]) -> None:
+        """Refreshes the runs after `line_schedules[index]` was modified where index is either (line, slice of steps)
+        or (slice of lines, step)"""
+        lines, steps = index
+        start, end = (steps.start, steps.stop) if isinstance(steps, slice) else (steps, steps + 1)
+        for line in (range(self._schedules.shape[0]) if isinstance(lines, slice) else [lines]):
+            self.refresh(line, start, end)
+
+
 @dataclass
 class _Bookmark:
     id: int
@@ -439,6 +551,7 @@ class SlowFactorySimulator(FactorySimulator):
                                  f'{actual} is running')
             self._line_schedules[i, t] = actual 
         self.fix_before(t + 1)
+        self._version += 1
         self._saved_states[t].append(_State(t=t, storage=storage.copy(), wallet=wallet, loans=loans
                                             , line_schedules=line_schedules.copy()))
 
@@ -448,6 +561,8 @@ class SlowFactorySimulator(FactorySimulator):
         self._bookmarks, self._bookmarked_at = self._bookmarks[:-1], self._bookmarked_at[:-1]
         self._active_bookmark = self._bookmarks[-1] if len(self._bookmarks) > 0 else None
         self._active_bookmarked_at = self._bookmarked_at[-1] if len(self._bookmarked_at) > 0 else -1
+        # changes are not tracked well enough to know whether anything was rolled back
+        self._version += 1
         return True
 
     def bookmark(self) -> int:
@@ -628,6 +743,8 @@ class SlowFactorySimulator(FactorySimulator):
         self._loans_updates[t] += total
         if self._active_bookmark:
             self._active_bookmark.loans_updates[t] += total
+        else:
+            self._version += 1
         return True
 
     def pay(self, payment: float, t: int, ignore_money_shortage: bool = True) -> bool:
@@ -636,6 +753,8 @@ class SlowFactorySimulator(FactorySimulator):
         self._payment_updates[t] += payment
         if self._active_bookmark:
             self._active_bookmark.payment_updates[t] += payment
+        else:
+            self._version += 1
         return True
 
     def transport_to(self, product: int, quantity: int, t: int, ignore_inventory_shortage: bool = True, ignore_space_shortage: bool = True) -> bool:
@@ -646,6 +765,8 @@ class SlowFactorySimulator(FactorySimulator):
         if self._active_bookmark:
             s = self._active_bookmark.storage_updates[t]
             s[product] += quantity
+        else:
+            self._version += 1
         return True
 
     def schedule(self, job: Job, ignore_inventory_shortage=True, ignore_money_shortage=True, ignore_space_shortage=True
@@ -656,6 +777,8 @@ class SlowFactorySimulator(FactorySimulator):
         self._jobs[t].append((job, override, ignore_inventory_shortage, ignore_money_shortage, ignore_space_shortage))
         if self._active_bookmark:
             self._active_bookmark.jobs[t].append(len(self._jobs[t]))
+        else:
+            self._version += 1
         return True
 
     def buy(self, product: int, quantity: int, price: int, t: int
@@ -665,6 +788,8 @@ class SlowFactorySimulator(FactorySimulator):
         self._buy_contracts[t].append((product, quantity, price))
         if self._active_bookmark:
             self._active_bookmark.buy_contracts[t].append(len(self._buy_contracts[t]))
+        else:
+            self._version += 1
         return True
 
     def sell(self, product: int, quantity: int, price: int, t: int, ignore_money_shortage: bool = True, ignore_inventory_shortage: bool = True) -> bool:
@@ -673,6 +798,8 @@ class SlowFactorySimulator(FactorySimulator):
         self._sell_contracts[t].append((product, quantity, price))
         if self._active_bookmark:
             self._active_bookmark.sell_contracts[t].append(len(self._sell_contracts[t]))
+        else:
+            self._version += 1
         return True
 
     @property
@@ -681,31 +808,23 @@ class SlowFactorySimulator(FactorySimulator):
 
 
 @dataclass
-class _FullBookmark:
+class _JournalBookmark:
     id: int
-    wallet: np.array
-    loans: np.array
-    storage: np.array
-    line_schedules: np.array
-    has_jobs: np.array
+    log_length: int
+    """The length of the undo log when the bookmark was set"""
 
 
-class FastFactorySimulator(FactorySimulator):
+class _JournaledFactorySimulator(FactorySimulator):
+    """The parts shared by factory simulators that keep their line schedules in arrays and journal their bookmarks.
 
-    def _as_array(self, storage: Dict[int, int]) -> np.array:
-        a = np.zeros(self._n_products)
-        for k, v in storage.items():
-            a[k] = v
-        return a
+    Subclasses keep the wallet, loans and storage and implement the storage hooks used by `schedule`. Undo log entries
+    are (target, index, value) tuples undone by `_undo`.
+    """
 
     def __init__(self, initial_wallet: float, initial_storage: Dict[int, int], n_steps: int, n_products: int
                  , profiles: List[ManufacturingProfile], max_storage: Optional[int]):
         super().__init__(initial_wallet=initial_wallet, initial_storage=initial_storage, n_steps=n_steps
                          , n_products=n_products, profiles=profiles, max_storage=max_storage)
-        self._wallet = np.ones(n_steps) * initial_wallet
-        self._loans = np.zeros(n_steps)
-        self._storage = np.repeat(self._as_array(initial_storage).reshape((n_products, 1)), n_steps, axis=1)
-        self._total_storage = self._storage.sum(axis=0)
         factory = Factory(initial_storage=initial_storage, initial_wallet=initial_wallet, profiles=profiles
                           , max_storage=max_storage)
         self._profiles = factory.profiles
@@ -713,12 +832,43 @@ class FastFactorySimulator(FactorySimulator):
         self._line_schedules = np.ones(shape=(self._n_lines, self._n_steps)) * NO_PRODUCTION
         self._has_jobs = np.zeros(shape=(self._n_lines, self._n_steps), dtype=bool)
         self._fixed_before = 0
-        self._bookmarks: List[_FullBookmark] = []
-        self._active_bookmark: Optional[_FullBookmark] = None
+        self._free_slots = _FreeSlots(self._line_schedules)
+        self._bookmarks: List[_JournalBookmark] = []
+        self._active_bookmark: Optional[_JournalBookmark] = None
+        self._undo_log: List[Tuple[Any, Any, Any]] = []
 
     def init(self, *args, **kwargs):
         self.__init__(*args, **kwargs)
 
+    def _journal(self, array: np.array, index: Any) -> None:
+        """Records the current values of `array[index]` in the undo log if there is an active bookmark"""
+        if self._active_bookmark is not None:
+            self._undo_log.append((array, index, array[index].copy()))
+        else:
+            self._version += 1
+
+    def _undo(self, target: Any, index: Any, value: Any) -> None:
+        """Undoes an entry of the undo log"""
+        target[index] = value
+        if target is self._line_schedules:
+            self._free_slots.changed(index)
+
+    @abstractmethod
+    def _min_wallet(self, t: int) -> float:
+        """Minimum balance of the wallet at or after t"""
+
+    @abstractmethod
+    def _min_storage(self, product: int, t: int) -> float:
+        """Minimum storage of the product at or after t"""
+
+    @abstractmethod
+    def _max_total_storage(self, t: int) -> float:
+        """Maximum total storage at or after t"""
+
+    @abstractmethod
+    def _add_storage(self, product: int, quantity: int, t: int) -> None:
+        """Adds the quantity to the storage of the product (and the total storage) at and after t"""
+
     @property
     def fixed_before(self):
         return self._fixed_before
@@ -731,21 +881,134 @@ class FastFactorySimulator(FactorySimulator):
     def final_balance(self) -> float:
         return self._wallet[-1] - self._loans[-1]
 
+    def line_schedules_to(self, t: int) -> np.array:
+        return self._line_schedules[:, : t + 1]
+
+    def free_slot(self, line: int, length: int, start: int, end: int, strategy: str = 'latest') -> Optional[int]:
+        return self._free_slots.find(line, length, start, min(end, self._n_steps), strategy)
+
+    def schedule(self, job: Job, ignore_inventory_shortage=True, ignore_money_shortage=True, ignore_space_shortage=True
+                 , override=True) -> bool:
+        t, job_override = job.time, job.override
+        if t < self._fixed_before:
+            raise ValueError(f'Cannot run operations in the past (t={t}, fixed before {self._fixed_before})')
+        if job_override:
+            raise NotImplementedError(f'{self.__class__.__name__} does not support scheduling jobs with overriding')
+        # job_line = job.line # only useful for stop/pause/resume that are not supported
+        profile = self._profiles[job.profile]
+        inputs, outputs, length, cost = profile.process.inputs, profile.process.outputs, profile.n_steps, profile.cost
+        line = profile.line
+
+        # confirm that there is no other jobs already scheduled at this exact time:
+        if self._has_jobs[line, t]:
+            if override:
+                raise NotImplementedError(f'{self.__class__.__name__} does not support scheduling more than a single '
+                                          f'job at any time-step/line')
+            return False
+
+        # confirm that the line is not busy. If it was busy, and we are not overriding, fail.
+        if not job_override and np.any(self._line_schedules[line, t:t + length] != NO_PRODUCTION):
+            return False
+
+        # confirm that there is enough money to start production
+        if (not ignore_money_shortage) and self._min_wallet(t) < cost:
+            return False
+        # bookmark to be able to rollback at any error
+        if job.action == 'run':
+            with transaction(self) as bookmark:
+                if not self.pay(cost, t):
+                    self.rollback(bookmark)
+                    return False
+                self._journal(self._line_schedules, (line, slice(t, t + length)))
+                self._line_schedules[line, t:t + length] = profile.process.id
+                self._free_slots.refresh(line, t, t + length)
+                for i in inputs:
+                    it = int(math.floor(i.step * length) + t)
+                    p, q = i.product, i.quantity
+                    if (not ignore_inventory_shortage) and self._min_storage(p, it) < q:
+                        self.rollback(bookmark)
+                        return False
+                    self._add_storage(p, -q, it)
+                for o in outputs:
+                    ot = int(math.ceil(o.step * length) + t)
+                    p, q = o.product, o.quantity
+                    if (not ignore_space_shortage) and self._max_total_storage(ot) + q > self.max_storage:
+                        self.rollback(bookmark)
+                        return False
+                    self._add_storage(p, q, ot)
+            return True
+        raise NotImplementedError(f'{self.__class__.__name__} does not support scheduling {job.action} jobs')
+
+    def fix_before(self, t: int) -> bool:
+        self._fixed_before = t
+        return True
+
+    def delete_bookmark(self, bookmark_id: int) -> bool:
+        if self._active_bookmark is None or self._active_bookmark.id != bookmark_id:
+            raise ValueError(f'there is no active bookmark to delete')
+        self._bookmarks.pop()
+        self._active_bookmark = self._bookmarks[-1] if len(self._bookmarks) > 0 else None
+        if self._active_bookmark is None:
+            # nothing can be rolled back anymore
+            if len(self._undo_log) > 0:
+                self._version += 1
+            self._undo_log = []
+        return True
+
+    def bookmark(self) -> int:
+        bookmark = _JournalBookmark(id=len(self._bookmarks), log_length=len(self._undo_log))
+        self._bookmarks.append(bookmark)
+        self._active_bookmark = bookmark
+        return bookmark.id
+
+    def rollback(self, bookmark_id: int) -> bool:
+        if self._active_bookmark is None or self._active_bookmark.id != bookmark_id:
+            raise ValueError(f'there is no active bookmark to rollback')
+        log, n = self._undo_log, self._active_bookmark.log_length
+        while len(log) > n:
+            self._undo(*log.pop())
+        return True
+
+
+class FastFactorySimulator(_JournaledFactorySimulator):
+    """A factory simulator that keeps the full history of the factory in arrays
+
+    Remarks:
+
+        - Bookmarks are journaled: while a bookmark is active, every operation records the array slices it is about to
+          modify in an undo log and rolling back restores them in reverse order. Setting a bookmark is O(1) and the
+          cost of a rollback is proportional to the changes made after it (not to the size of the factory history).
+          Bookmarks can be nested.
+    """
+
+    def _as_array(self, storage: Dict[int, int]) -> np.array:
+        a = np.zeros(self._n_products)
+        for k, v in storage.items():
+            a[k] = v
+        return a
+
+    def __init__(self, initial_wallet: float, initial_storage: Dict[int, int], n_steps: int, n_products: int
+                 , profiles: List[ManufacturingProfile], max_storage: Optional[int]):
+        super().__init__(initial_wallet=initial_wallet, initial_storage=initial_storage, n_steps=n_steps
+                         , n_products=n_products, profiles=profiles, max_storage=max_storage)
+        self._wallet = np.ones(n_steps) * initial_wallet
+        self._loans = np.zeros(n_steps)
+        self._storage = np.repeat(self._as_array(initial_storage).reshape((n_products, 1)), n_steps, axis=1)
+        self._total_storage = self._storage.sum(axis=0)
+
     def wallet_to(self, t: int) -> np.array:
         return self._wallet[:t + 1]
 
     def storage_to(self, t: int) -> np.array:
         return self._storage[:, :t + 1]
 
-    def line_schedules_to(self, t: int) -> np.array:
-        return self._line_schedules[:, : t + 1]
-
     def loans_to(self, t: int) -> np.array:
         return self._loans[: t + 1]
 
     def add_loan(self, total: float, t: int) -> bool:
         if t < self._fixed_before:
             raise ValueError(f'Cannot run operations in the past (t={t}, fixed before {self._fixed_before})')
+        self._journal(self._loans, slice(t, None))
         self._loans[t:] += total
         return True
 
@@ -753,6 +1016,7 @@ class FastFactorySimulator(FactorySimulator):
         # @todo add minimum balance
         if t < self._fixed_before:
             raise ValueError(f'Cannot run operations in the past (t={t}, fixed before {self._fixed_before})')
+        self._journal(self._wallet, slice(t, None))
         b = self._wallet[t:]
         b -= payment
         if b.min() < 0:
@@ -764,6 +1028,7 @@ class FastFactorySimulator(FactorySimulator):
         # @todo add minimum storage
         if t < self._fixed_before:
             raise ValueError(f'Cannot run operations in the past (t={t}, fixed before {self._fixed_before})')
+        self._journal_storage(product, t)
         s, total = self._storage[product, t:].view(), self._total_storage[t:]
         s += quantity
         total += quantity
@@ -777,6 +1042,8 @@ class FastFactorySimulator(FactorySimulator):
             , ignore_money_shortage: bool = True, ignore_space_shortage: bool = True) -> bool:
         if t < self._fixed_before:
             raise ValueError(f'Cannot run operations in the past (t={t}, fixed before {self._fixed_before})')
+        self._journal_storage(product, t)
+        self._journal(self._wallet, slice(t, None))
         s, total = self._storage[product, t:].view(), self._total_storage[t:]
         s += quantity
         total += quantity
@@ -792,6 +1059,8 @@ class FastFactorySimulator(FactorySimulator):
     def sell(self, product: int, quantity: int, price: int, t: int, ignore_money_shortage: bool = True, ignore_inventory_shortage: bool = True) -> bool:
         if t < self._fixed_before:
             raise ValueError(f'Cannot run operations in the past (t={t}, fixed before {self._fixed_before})')
+        self._journal_storage(product, t)
+        self._journal(self._wallet, slice(t, None))
         s, total = self._storage[product, t:].view(), self._total_storage[t:]
         s -= quantity
         total -= quantity
@@ -804,94 +1073,36 @@ class FastFactorySimulator(FactorySimulator):
             return False
         return True
 
-    def schedule(self, job: Job, ignore_inventory_shortage=True, ignore_money_shortage=True, ignore_space_shortage=True
-                 , override=True) -> bool:
-        t, job_override = job.time, job.override
-        if t < self._fixed_before:
-            raise ValueError(f'Cannot run operations in the past (t={t}, fixed before {self._fixed_before})')
-        if job_override:
-            raise NotImplementedError(f'{self.__class__.__name__} does not support scheduling jobs with overriding')
-        # job_line = job.line # only useful for stop/pause/resume that are not supported
-        profile = self._profiles[job.profile]
-        inputs, outputs, length, cost = profile.process.inputs, profile.process.outputs, profile.n_steps, profile.cost
-        line = profile.line
+    def _journal_storage(self, product: int, t: int) -> None:
+        self._journal(self._storage, (product, slice(t, None)))
+        self._journal(self._total_storage, slice(t, None))
 
-        # confirm that there is no other jobs already scheduled at this exact time:
-        if self._has_jobs[line, t]:
-            if override:
-                raise NotImplementedError(f'{self.__class__.__name__} does not support scheduling more than a single '
-                                          f'job at any time-step/line')
-            return False
-
-        # confirm that the line is not busy. If it was busy, and we are not overriding, fail.
-        if not job_override and np.any(self._line_schedules[line, t:t + length] != NO_PRODUCTION):
-            return False
-
-        # confirm that there is enough money to start production
-        if (not ignore_money_shortage) and np.any(self._wallet[t:] < cost):
-            return False
-        # bookmark to be able to rollback at any error
-        if job.action == 'run':
-            with transaction(self) as bookmark:
-                if not self.pay(cost, t):
-                    self.rollback(bookmark)
-                    return False
-                self._line_schedules[line, t:t + length] = profile.process.id
-                for i in inputs:
-                    it = int(math.floor(i.step * length) + t)
-                    p, q = i.product, i.quantity
-                    if (not ignore_inventory_shortage) and np.any(self._storage[p, it:] < q):
-                        self.rollback(bookmark)
-                        return False
-                    s, total = self._storage[p, it:].view(), self._total_storage[it:]
-                    s -= q
-                    total -= q
-                for o in outputs:
-                    ot = int(math.ceil(o.step * length) + t)
-                    p, q = o.product, o.quantity
-                    if (not ignore_space_shortage) and np.any(self._total_storage[ot:] + q > self.max_storage):
-                        self.rollback(bookmark)
-                        return False
-                    s, total = self._storage[p, ot:].view(), self._total_storage[ot:]
-                    s += q
-                    total += q
-            return True
-        raise NotImplementedError(f'{self.__class__.__name__} does not support scheduling {job.action} jobs')
-
-    def fix_before(self, t: int) -> bool:
-        self._fixed_before = t
-        return True
+    def _min_wallet(self, t: int) -> float:
+        return self._wallet[t:].min(initial=np.inf)
 
-    def delete_bookmark(self, bookmark_id: int) -> bool:
-        if self._active_bookmark is None or self._active_bookmark.id != bookmark_id:
-            raise ValueError(f'there is no active bookmark to delete')
-        self._bookmarks = self._bookmarks[:-1]
-        self._active_bookmark = self._bookmarks[-1] if len(self._bookmarks) > 0 else None
-        return True
+    def _min_storage(self, product: int, t: int) -> float:
+        return self._storage[product, t:].min(initial=np.inf)
 
-    def bookmark(self) -> int:
-        bookmark = _FullBookmark(id=len(self._bookmarks), wallet=self._wallet.copy(), loans=self._loans.copy()
-                                 , storage=self._storage.copy(), line_schedules=self._line_schedules.copy()
-                                 , has_jobs=self._has_jobs.copy())
-        self._bookmarks.append(bookmark)
-        self._active_bookmark = bookmark
-        return bookmark.id
+    def _max_total_storage(self, t: int) -> float:
+        return self._total_storage[t:].max(initial=-np.inf)
 
-    def rollback(self, bookmark_id: int) -> bool:
-        if self._active_bookmark is None or self._active_bookmark.id != bookmark_id:
-            raise ValueError(f'there is no active bookmark to rollback')
-        b = self._active_bookmark
-        self._wallet, self._loans, self._storage = b.wallet, b.loans, b.storage
-        self._line_schedules, self._has_jobs = b.line_schedules, b.has_jobs
-        self._total_storage = self._storage.sum(axis=0)
-        return True
+    def _add_storage(self, product: int, quantity: int, t: int) -> None:
+        self._journal_storage(product, t)
+        s, total = self._storage[product, t:].view(), self._total_storage[t:]
+        s += quantity
+        total += quantity
 
     def set_state(self, t: int, storage: np.array, wallet: float, loans: float, line_schedules: np.array) -> None:
+        self._journal(self._storage, (slice(None), slice(t, None)))
+        self._journal(self._wallet, slice(t, None))
+        self._journal(self._loans, slice(t, None))
+        self._journal(self._line_schedules, (slice(None), t))
         self._storage[:, t:] += storage.reshape(self._n_products, 1) - self._storage[:, t].reshape(self._n_products, 1)
         self._wallet[t:] += wallet - self._wallet[t]
         self._loans[t:] += loans - self._loans[t]
 
         self._line_schedules[:, t] = line_schedules
+        self._free_slots.changed((slice(None), t))
 
         # @todo enable this again to confirm that simulation is correct. may be I set_state before the job is run on the simulator
         # expected_schedules = self._line_schedules[:, t]
@@ -183,6 +183,9 @@ def anac2019_tournament(competitors: Sequence[Union[str, Type[FactoryManager]]]
                         , name: str = None
                         , verbose: bool = False
                         , configs_only=False
+                        , results_store: str = 'sqlite'
+                        , resume: bool = False
+                        , stats_format: Optional[str] = None
                         , **kwargs
                         ) -> Union[TournamentResults, PathLike]:
     """
@@ -210,6 +213,10 @@ def anac2019_tournament(competitors: Sequence[Union[str, Type[FactoryManager]]]
         processing
         verbose: Verbosity
         configs_only: If true, a config file for each
+        results_store: The backend used to store scores as soon as every world run finishes ('sqlite' or 'parquet')
+        resume: If true, an interrupted tournament with the same `name` is continued
+        stats_format: The format of the statistics of world runs ('csv', 'parquet' or 'feather'). If not given,
+        'parquet' is used if pyarrow is installed and 'csv' otherwise
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -226,5 +233,6 @@ def anac2019_tournament(competitors: Sequence[Union[str, Type[FactoryManager]]]
                       , parallelism=parallelism, scheduler_ip=scheduler_ip, scheduler_port=scheduler_port
                       , tournament_progress_callback=tournament_progress_callback
                       , world_progress_callback=world_progress_callback, name=name, verbose=verbose
-                      , configs_only=configs_only
+                      , configs_only=configs_only, results_store=results_store, resume=resume
+                      , stats_format=stats_format
                       , world_generator=anac2019_world, score_calculator=balance_calculator, **kwargs)
@@ -9,7 +9,7 @@ from typing import Optional, Callable, Type, Sequence, Dict, Tuple, Iterable, An
 import numpy as np
 
 from negmas import MechanismInfo
-from negmas.events import Event, EventSource
+from negmas.events import Event, EventSource, EventSink
 from negmas.helpers import snake_case, instantiate, unique_name
 from negmas.outcomes import Issue
 from negmas.situated import AgentWorldInterface, World, Breach, Action, BreachProcessing, Contract, Agent
@@ -64,6 +64,12 @@ class SCMLAWI(AgentWorldInterface):
         self.agent: SCMLAgent
         return self._world.buy_insurance(contract=contract, agent=self.agent)
 
+    def route_cfps(self) -> None:
+        """Sends new CFPs for the current `interesting_products` of the agent to it (called when they are set)"""
+        self._world: SCMLWorld
+        self.agent: SCMLAgent
+        self._world._route_cfps(self.agent)
+
     @property
     def products(self):
         """Products in the world"""
@@ -78,6 +84,20 @@ class SCMLAWI(AgentWorldInterface):
         implements = ['jnegmas.apps.scml.awi.PySCMLAWI']
 
 
+class _CFPForwarder(EventSink):
+    """Informs an agent of new CFPs published by others (registered on the bulletin board for the products the agent
+    is interested in)"""
+
+    def __init__(self, agent: SCMLAgent, products: Set[int]):
+        self.agent = agent
+        self.products = products
+
+    def on_event(self, event: Event, sender: 'EventSource') -> None:
+        cfp = event.data['value']
+        if cfp.publisher != self.agent.id:
+            self.agent.on_new_cfp(cfp)
+
+
 class SCMLWorld(World):
     """The `World` class running a simulation of supply chain management."""
 
@@ -121,6 +141,7 @@ class SCMLWorld(World):
                  , transportation_delay: int = 1
                  , transfer_delay: int = 0
                  , start_negotiations_immediately=False
+                 , batch_negotiations=False
                  , catalog_profit=0.15
                  , avg_process_cost_is_public=True
                  , catalog_prices_are_public=True
@@ -162,6 +183,7 @@ class SCMLWorld(World):
             default_signing_delay:
             transportation_delay:
             loan_installments:
+            batch_negotiations: If true, running negotiations are stepped together using a `SAOBatchRunner`
             strip_annotations: If true, annotations for all negotiations will be stripped from any information other
             than the following: partners, seller, buyer, cfp
             log_file_name:
@@ -174,6 +196,7 @@ class SCMLWorld(World):
                          , log_file_name=log_file_name, awi_type='negmas.apps.scml.SCMLAWI'
                          , default_signing_delay=default_signing_delay
                          , start_negotiations_immediately=start_negotiations_immediately
+                         , batch_negotiations=batch_negotiations
                          , name=name)
         if balance_at_max_interest is None:
             balance_at_max_interest = initial_wallet_balances
@@ -182,6 +205,18 @@ class SCMLWorld(World):
         self.bulletin_board.register_listener(event_type='new_record', listener=self)
         self.bulletin_board.register_listener(event_type='will_remove_record', listener=self)
         self.bulletin_board.add_section("cfps")
+        # new CFPs are routed by product to the agents interested in it (see _CFPForwarder and _route_cfps)
+        self.bulletin_board.route_events('cfps', 'product')
+        self._cfp_forwarders: Dict[str, _CFPForwarder] = {}
+        self.bulletin_board.set_expiry('cfps', 'max_time')
+        # CFPs are queried many times per step by every agent, see CFP.satisfies for the query keys
+        self.bulletin_board.add_index('cfps', 'product', query_keys={
+            'product': 'value', 'product_id': 'value', 'product_index': 'value'
+            , 'products': 'values', 'product_ids': 'values', 'product_indices': 'values'})
+        self.bulletin_board.add_index('cfps', 'publisher', query_keys={'publisher': 'value', 'publishers': 'values'})
+        self.bulletin_board.add_index('cfps', 'is_buy')
+        for attribute in ('time', 'unit_price', 'quantity'):
+            self.bulletin_board.add_index('cfps', attribute, kind='range')
         self.bulletin_board.add_section("products")
         self.bulletin_board.add_section("processes")
         self.bulletin_board.add_section("raw_materials")
@@ -244,6 +279,11 @@ class SCMLWorld(World):
             factories.append(factory)
             self.f2a[factory.id] = agent
             self.a2f[agent.id] = factory
+        self._production = ProductionEngine(self.factories)
+        self._stats_agents = list(itertools.chain(self.miners, self.consumers, self.factory_managers))
+        self._stats_factories = [self.a2f[_.id] for _ in self._stats_agents]
+        self._stats.add_group('balance', names=[_.name for _ in self._stats_agents])
+        self._stats.add_group('storage', names=[_.name for _ in self._stats_agents], dtype=np.int64)
 
         self.bank = DefaultBank(minimum_balance=minimum_balance, interest_rate=interest_rate, interest_max=interest_max
                                 , balance_at_max_interest=balance_at_max_interest, installment_interest=installment_interest
@@ -255,6 +295,8 @@ class SCMLWorld(World):
 
         for agent in itertools.chain(self.miners, self.consumers, self.factory_managers):  # type: ignore
             agent.init()
+        for agent in itertools.chain(self.miners, self.factory_managers, self.consumers):  # type: ignore
+            self._route_cfps(agent)
         self.n_new_cfps = 0
         self._transport: Dict[int, List[Tuple[SCMLAgent, int, int]]] = defaultdict(list)
         self._transfer: Dict[int, List[Tuple[SCMLAgent, float]]] = defaultdict(list)
@@ -263,6 +305,18 @@ class SCMLWorld(World):
         self._n_production_failures = 0
         # self.standing_jobs: Dict[int, List[Tuple[Factory, Job]]] = defaultdict(list)
 
+    def _route_cfps(self, agent: SCMLAgent) -> None:
+        """Registers the agent to receive new CFPs for its current interesting products (called whenever they are set)"""
+        products = set(agent.interesting_products)
+        forwarder = self._cfp_forwarders.get(agent.id, None)
+        if forwarder is not None:
+            if forwarder.products == products:
+                return
+            self.bulletin_board.unregister_listener(event_type='new_record', listener=forwarder)
+        forwarder = self._cfp_forwarders[agent.id] = _CFPForwarder(agent, products)
+        self.bulletin_board.register_listener(event_type='new_record', listener=forwarder
+                                              , keys=[('cfps', _) for _ in products])
+
     def join(self, x: 'Agent', simulation_priority: int = 0):
         """Add an agent to the world.
 
@@ -828,9 +882,8 @@ class SCMLWorld(World):
 
         # run factories
         # -------------
-        for factory in self.factories:
+        for factory, reports in zip(self.factories, self._production.step()):
             manager = self.f2a[factory.id]
-            reports = factory.step()
             self.logdebug(f'Factory {factory.id}: money={factory.wallet}'
                           f', storage={str(dict(factory.storage))}'
                           f', loans={factory.loans}')
@@ -858,49 +911,33 @@ class SCMLWorld(World):
 
         # remove expired CFPs
         # -------------------
-        cfps = self.bulletin_board.query(section='cfps', query=None)
-        if cfps is not None:
-            # new_cfps = dict()
-            toremove = []
-            for key, cfp in cfps.items():
-                # we remove CFP with a max_time less than *or equal* to current step as all processing for current step
-                # should already be complete by now
-                if cfp.max_time <= self.current_step:
-                    toremove.append(key)
-                # new_cfps[key] = cfp
-            for key in toremove:
-                self.bulletin_board.remove(section='cfps', query=key, query_keys=True)
-            # noinspection PyProtectedMember
-            # self.bulletin_board._data['cfps'] = new_cfps
+        # we remove CFP with a max_time less than *or equal* to current step as all processing for current step
+        # should already be complete by now
+        self.bulletin_board.remove_expired(section='cfps', time=self.current_step)
 
     def _pre_step_stats(self):
-        # noinspection PyProtectedMember
-        cfps = self.bulletin_board._data['cfps']
-        self._stats['n_cfps_on_board_before'].append(len(cfps) if cfps else 0)
+        self._stats.append('n_cfps_on_board_before', self.bulletin_board.n_records('cfps'))
         self._n_production_failures = 0
         pass
 
     def _post_step_stats(self):
         """Saves relevant stats"""
-        self._stats['n_cfps'].append(self.n_new_cfps)
+        self._stats.append('n_cfps', self.n_new_cfps)
         self.n_new_cfps = 0
-        # noinspection PyProtectedMember
-        cfps = self.bulletin_board._data['cfps']
-        self._stats['n_cfps_on_board_after'].append(len(cfps) if cfps else 0)
-        market_size = 0
-        self._stats[f'_balance_bank'].append(self.bank.wallet)
-        self._stats[f'_balance_society'].append(self.penalties)
-        self._stats[f'_balance_insurance'].append(self.insurance_company.wallet)
-        self._stats[f'_storage_insurance'].append(sum(self.insurance_company.storage.values()))
+        self._stats.append('n_cfps_on_board_after', self.bulletin_board.n_records('cfps'))
+        self._stats.append('_balance_bank', self.bank.wallet)
+        self._stats.append('_balance_society', self.penalties)
+        self._stats.append('_balance_insurance', self.insurance_company.wallet)
+        self._stats.append('_storage_insurance', sum(self.insurance_company.storage.values()))
         internal_market_size = self.bank.wallet + self.penalties + self.insurance_company.wallet
-        for a in itertools.chain(self.miners, self.consumers, self.factory_managers):
-            self._stats[f'balance_{a.name}'].append(self.a2f[a.id].balance)
-            self._stats[f'storage_{a.name}'].append(self.a2f[a.id].total_storage)
-            market_size += self.a2f[a.id].balance
-        self._stats['market_size'].append(market_size)
-        self._stats['production_failures'].append(self._n_production_failures / len(self.factories)
-                                                  if len(self.factories) > 0 else np.nan)
-        self._stats['_market_size_total'].append(market_size + internal_market_size)
+        balances = np.array([_.balance for _ in self._stats_factories], dtype=float)
+        self._stats.append_group('balance', balances)
+        self._stats.append_group('storage', [_.total_storage for _ in self._stats_factories])
+        market_size = balances.sum()
+        self._stats.append('market_size', market_size)
+        self._stats.append('production_failures', self._n_production_failures / len(self.factories)
+                           if len(self.factories) > 0 else np.nan)
+        self._stats.append('_market_size_total', market_size + internal_market_size)
 
     def _execute_contract(self, contract: Contract) -> Set[Breach]:
         super()._execute_contract(contract=contract)
@@ -1258,12 +1295,7 @@ class SCMLWorld(World):
         Returns:
             None
         """
-        if event.type == 'new_record' and event.data['section'] == 'cfps':
-            cfp = event.data['value']
-            for m in itertools.chain(self.miners, self.factory_managers, self.consumers):  # type: ignore
-                if m.id != cfp.publisher and cfp.product in m.interesting_products:
-                    m.on_new_cfp(cfp)
-        elif event.type == 'will_remove_record' and event.data['section'] == 'cfps':
+        if event.type == 'will_remove_record' and event.data['section'] == 'cfps':
             for m in itertools.chain(self.miners, self.factory_managers, self.consumers):  # type: ignore
                 cfp = event.data['value']
                 if m.id != cfp.publisher and cfp.product in m.interesting_products:
@@ -1341,25 +1373,25 @@ class SCMLWorld(World):
     @property
     def business_size(self) -> float:
         """The total business size defined as the total money transferred within the system"""
-        return sum(self.stats["activity_level"])
+        return sum(self._stats.get("activity_level", []))
 
     @property
     def agreement_rate(self) -> float:
         """Fraction of negotiations ending in agreement and leading to signed contracts"""
-        n_negs = sum(self.stats["n_negotiations"])
+        n_negs = sum(self._stats.get("n_negotiations", []))
         n_contracts = len(self._saved_contracts)
         return n_contracts / n_negs if n_negs != 0 else np.nan
 
     @property
     def contract_execution_fraction(self) -> float:
         """Fraction of signed contracts successfully executed"""
-        n_executed = sum(self.stats['n_contracts_executed'])
+        n_executed = sum(self._stats.get('n_contracts_executed', []))
         n_contracts = len(self._saved_contracts)
         return n_executed / n_contracts if n_contracts > 0 else np.nan
 
     @property
     def breach_rate(self) -> float:
         """Fraction of signed contracts that led to breaches"""
-        n_breaches = sum(self.stats['n_breaches'])
+        n_breaches = sum(self._stats.get('n_breaches', []))
         n_contracts = len(self._saved_contracts)
         return n_breaches / n_contracts if n_contracts else np.nan
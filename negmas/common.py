@@ -5,7 +5,7 @@ This module does not import anything from the library except during type checkin
 import typing
 import uuid
 from copy import deepcopy
-from typing import List, Optional, Any, TYPE_CHECKING
+from typing import List, Optional, Any, Sequence, TYPE_CHECKING
 
 from dataclasses import dataclass, field, fields
 
@@ -82,11 +82,15 @@ class MechanismState:
         return self.__hash__() == other.__hash__()
 
     def __copy__(self):
-        return MechanismInfo(**self.__dict__)
+        """A cheap snapshot of the state (used by `Mechanism.state`)"""
+        result = self.__class__.__new__(self.__class__)
+        result.__dict__.update(self.__dict__)
+        return result
 
     def __deepcopy__(self, memodict={}):
-        d = {k: deepcopy(v) for k, v in self.__dict__.items()}
-        return MechanismInfo(**d)
+        result = self.__class__.__new__(self.__class__)
+        result.__dict__.update({k: deepcopy(v, memodict) for k, v in self.__dict__.items()})
+        return result
 
     def __getitem__(self, item):
         """Makes the outcome type behave like a dict"""
@@ -115,8 +119,8 @@ class MechanismInfo:
     """Number of outcomes which may be None indicating infinity"""
     issues: List['Issue']
     """Negotiation issues as a list of `Issue` objects"""
-    outcomes: Optional[List['Outcome']]
-    """A lit of *all possible* outcomes for a negotiation. None if the number of outcomes is uncountable"""
+    outcomes: Optional[Sequence['Outcome']]
+    """A sequence of *all possible* outcomes for a negotiation. None if the number of outcomes is uncountable"""
     time_limit: float
     """The time limit in seconds for this negotiation session. None indicates infinity"""
     n_steps: int
@@ -1,6 +1,7 @@
 """Implements Event management"""
+import heapq
 from collections import defaultdict
-from typing import Any, Dict, Union, Optional, Set
+from typing import Any, Dict, Union, Optional, Set, Callable, Hashable, Iterable
 
 from dataclasses import dataclass
 
@@ -24,22 +25,91 @@ class Event:
 
 
 class EventSource:
-    """An object capable of raising events"""
+    """An object capable of raising events
+
+    Listeners can subscribe to all events of a type or only to some of them by passing a predicate and/or a set of
+    keys to `register_listener`. Keyed subscriptions are indexed by key so that announcing an event only visits the
+    listeners interested in its key (see `set_event_key`).
+    """
 
     def __init__(self):
         super().__init__()
         self.__sinks: Dict[str, list] = defaultdict(list)
+        self.__keyed_sinks: Dict[str, Dict[Hashable, list]] = {}
+        self.__event_keys: Dict[str, Callable[[Event], Hashable]] = {}
+        self.__n_listeners = 0
 
     def announce(self, event: Event):
         """Raises an event and informs all event sinks that are registerd for notifications
         on this event type"""
 
         sinks = self.__sinks.get(event.type, [])
-        for sink in sinks:
-            sink.on_event(event=event, sender=self)
-
-    def register_listener(self, event_type: str, listener: "EventSink"):
-        self.__sinks[event_type].append(listener)
+        keyed = self.__keyed_sinks.get(event.type, None)
+        if keyed:
+            matched = keyed.get(self.__event_keys[event.type](event), None)
+            if matched:
+                # keep the order in which listeners were registered
+                sinks = heapq.merge(sinks, matched) if sinks else matched
+        for _, sink, predicate in sinks:
+            if predicate is None or predicate(event):
+                sink.on_event(event=event, sender=self)
+
+    def set_event_key(self, event_type: str, key: Callable[[Event], Hashable]):
+        """Sets the function used to find the key of events of the given type for routing them to listeners that
+        registered with `keys` (see `register_listener`).
+
+        Args:
+            event_type: The event type
+            key: A function returning the (hashable) key of an event. Events with a key for which no listener
+                 registered reach only the listeners registered without keys.
+
+        """
+        self.__event_keys[event_type] = key
+
+    def register_listener(self, event_type: str, listener: "EventSink"
+                          , predicate: Optional[Callable[[Event], bool]] = None
+                          , keys: Optional[Iterable[Hashable]] = None):
+        """Registers a listener for events of the given type.
+
+        Args:
+            event_type: The event type
+            listener: The event sink to inform
+            predicate: If given, the listener is informed only of events for which it returns True
+            keys: If given, the listener is informed only of events with one of these keys. The key of an event is
+                  found using the function passed to `set_event_key` for its type.
+
+        """
+        entry = (self.__n_listeners, listener, predicate)
+        self.__n_listeners += 1
+        if keys is None:
+            self.__sinks[event_type].append(entry)
+            return
+        if event_type not in self.__event_keys:
+            raise ValueError(f'Cannot register a listener with keys for events of type {event_type} that have no '
+                             f'event key (see set_event_key)')
+        keyed = self.__keyed_sinks.setdefault(event_type, {})
+        for key in set(keys):
+            keyed.setdefault(key, []).append(entry)
+
+    def unregister_listener(self, event_type: str, listener: "EventSink"):
+        """Stops informing a listener of events of the given type (whatever predicate or keys it registered with)
+
+        Args:
+            event_type: The event type
+            listener: The event sink registered using `register_listener`
+
+        """
+        sinks = self.__sinks.get(event_type, None)
+        if sinks:
+            self.__sinks[event_type] = [_ for _ in sinks if _[1] is not listener]
+        keyed = self.__keyed_sinks.get(event_type, None)
+        if keyed:
+            for key in list(keyed.keys()):
+                entries = [_ for _ in keyed[key] if _[1] is not listener]
+                if entries:
+                    keyed[key] = entries
+                else:
+                    del keyed[key]
 
 
 class EventSink:
@@ -8,11 +8,11 @@ import pathlib
 import os
 import random
 import subprocess
+import threading
 import time
 import typing
-from typing import Optional, List, Tuple, Sequence
+from typing import Optional, List, Tuple, Sequence, Dict, Any
 
-import pkg_resources
 from py4j.java_gateway import (
     JavaGateway, CallbackServerParameters, GatewayParameters)
 from py4j.protocol import Py4JNetworkError
@@ -20,6 +20,7 @@ from py4j.protocol import Py4JNetworkError
 from negmas import SAONegotiator, make_discounted_ufun, get_domain_issues
 from negmas import ResponseType, load_genius_domain
 from negmas.common import *
+from negmas.outcomes import Issue
 from negmas.utilities import UtilityFunction
 
 DEFAULT_JAVA_PORT = 25337
@@ -30,7 +31,10 @@ if typing.TYPE_CHECKING:
 
 __all__ = [
     'GeniusNegotiator',  # Most abstract kind of agent
+    'GeniusBridge',
+    'GeniusOutcomeCodec',
     'init_genius_bridge',
+    'init_genius_bridge_pool',
     'genius_bridge_is_running'
 ]
 
@@ -40,6 +44,8 @@ common_gateway: Optional[JavaGateway] = None
 common_port: int = 0
 java_process = None
 python_port: int = 0
+genius_bridges: Dict[int, 'GeniusBridge'] = {}
+"""All genius bridges started by this process (see `init_genius_bridge` and `init_genius_bridge_pool`) by port"""
 
 
 all_agent_based_agents = [
@@ -266,6 +272,60 @@ party_based_negotiators = [
 ]
 
 
+class GeniusBridge:
+    """A connection to a genius bridge (a JVM running NegLoader).
+
+    Args:
+        gateway: The py4j gateway connected to the bridge
+        port: The port the bridge is listening to
+
+    """
+
+    def __init__(self, gateway: JavaGateway, port: int = 0):
+        self.gateway = gateway
+        self.java = gateway.entry_point
+        self.port = port
+        self.n_negotiators = 0
+        """Number of negotiators using this bridge"""
+        self.n_calls = 0
+        """Number of calls made to the bridge"""
+        self._lock = threading.RLock()
+
+    def receive_message(self, agent_uuid: str, from_id: str, action_type: str, bid: str) -> None:
+        """Sends a message to a genius agent"""
+        self.call('receive_message', agent_uuid, from_id, action_type, bid)
+
+    def choose_action(self, agent_uuid: str) -> str:
+        """Asks a genius agent to choose an action"""
+        return self.call('choose_action', agent_uuid)
+
+    def call(self, method: str, *args):
+        """Calls a NegLoader method"""
+        with self._lock:
+            self.n_calls += 1
+            return getattr(self.java, method)(*args)
+
+
+def _start_genius_bridge(path: str, port: int) -> Optional[GeniusBridge]:
+    path = os.path.abspath(os.path.expanduser(path))
+    try:
+        subprocess.Popen(  # ['java', '-jar',  path, '--die-on-exit', f'{port}']
+            f'java -jar {path} --die-on-exit {port}'
+            , shell=True)
+    except:
+        return None
+    time.sleep(0.5)
+    gateway = JavaGateway(gateway_parameters=GatewayParameters(port=port),
+                          callback_server_parameters=CallbackServerParameters(port=0))
+    callback_port = gateway.get_callback_server().get_listening_port()
+    gateway.java_gateway_server.resetCallbackClient(
+        gateway.java_gateway_server.getCallbackClient().getAddress(),
+        callback_port)
+    bridge = GeniusBridge(gateway, port=port)
+    genius_bridges[port] = bridge
+    return bridge
+
+
 def init_genius_bridge(path: str, port: int = 0, force: bool = False) -> bool:
     """Initializes a genius connection
 
@@ -287,28 +347,139 @@ def init_genius_bridge(path: str, port: int = 0, force: bool = False) -> bool:
     if not force and common_gateway is not None and common_port == port:
         print('Java already initialized')
         return True
-    path = os.path.abspath(os.path.expanduser(path))
-    try:
-        subprocess.Popen(  # ['java', '-jar',  path, '--die-on-exit', f'{port}']
-            f'java -jar {path} --die-on-exit {port}'
-            , shell=True)
-    except:
+    bridge = _start_genius_bridge(path, port)
+    if bridge is None:
         return False
-    time.sleep(0.5)
-    gateway = JavaGateway(gateway_parameters=GatewayParameters(port=port),
-                          callback_server_parameters=CallbackServerParameters(port=0))
-    python_port = gateway.get_callback_server().get_listening_port()
-    gateway.java_gateway_server.resetCallbackClient(
-        gateway.java_gateway_server.getCallbackClient().getAddress(),
-        python_port)
-
-    common_gateway = gateway
+    python_port = bridge.gateway.get_callback_server().get_listening_port()
+    common_gateway = bridge.gateway
     common_port = port
     return True
 
 
+def init_genius_bridge_pool(path: str, n_bridges: int, base_port: int = 0, force: bool = False) -> List[int]:
+    """Starts a pool of genius bridges (each running in its own JVM) on consecutive ports.
+
+    `GeniusNegotiator` objects created without a port are spread over the bridges of the pool (each new negotiator
+    connects to the bridge with the least number of running negotiators) which allows genius agents in different
+    negotiations to run in parallel.
+
+    Args:
+        path: The path to a JAR file that runs negloader
+        n_bridges: Number of bridges to start
+        base_port: The port of the first bridge (bridge `i` uses port `base_port + i`)
+        force: Restart bridges that were already started on any of these ports
+
+    Returns:
+        The ports of the bridges that are running
+
+    """
+    base_port = base_port if base_port > 0 else DEFAULT_JAVA_PORT
+    ports = []
+    for port in range(base_port, base_port + n_bridges):
+        if force or port not in genius_bridges:
+            if _start_genius_bridge(path, port) is None:
+                continue
+        ports.append(port)
+    return ports
+
+
+class GeniusOutcomeCodec:
+    """Converts outcomes to and from the strings exchanged with genius bridges.
+
+    Value to string conversion tables are precomputed per issue and the encoding/decoding of recent outcomes is
+    remembered so that an outcome is usually converted once per domain.
+
+    Args:
+        issues: The issues of the domain (with issue and value names kept)
+        max_cached: Maximum number of encoded (and decoded) outcomes to remember. The memory is cleared when it is full
+
+    Remarks:
+        - Decoded values are the values of the domain issues (e.g. integers for integer issues) not the strings sent
+          by the bridge. Values that are not found in the issues are kept as strings.
+
+    Examples:
+
+        >>> codec = GeniusOutcomeCodec([Issue(['a', 'b'], name='x'), Issue(3, name='y')])
+        >>> s = codec.encode(('b', 2))
+        >>> s == f'x{INTERNAL_SEP}b{ENTRY_SEP}y{INTERNAL_SEP}2'
+        True
+        >>> codec.decode(s, keep_issue_names=True)
+        {'x': 'b', 'y': 2}
+        >>> codec.decode(f'y{INTERNAL_SEP}1{ENTRY_SEP}x{INTERNAL_SEP}a', keep_issue_names=False)
+        ('a', 1)
+
+    """
+
+    _domain_codecs: Dict[str, 'GeniusOutcomeCodec'] = {}
+
+    def __init__(self, issues: List[Issue], max_cached: int = 100000):
+        self.issues = issues
+        self.max_cached = max_cached
+        self.issue_names = [_.name for _ in issues]
+        self.issue_index = dict(zip(self.issue_names, range(len(self.issue_names))))
+        self.value2str: List[Dict] = []
+        self.str2value: Dict[str, Dict[str, Any]] = {}
+        for issue in issues:
+            values = list(issue.all) if not issue.is_continuous() else []
+            self.value2str.append({v: str(v) for v in values})
+            self.str2value[issue.name] = {str(v): v for v in values}
+        self._encoded: Dict[Tuple, str] = {}
+        self._decoded: Dict[str, Tuple] = {}
+
+    @classmethod
+    def from_domain(cls, domain_file_name: str) -> 'GeniusOutcomeCodec':
+        """Returns the codec of the given domain file (created once per domain)"""
+        domain_file_name = str(domain_file_name)
+        codec = cls._domain_codecs.get(domain_file_name, None)
+        if codec is None:
+            codec = cls._domain_codecs[domain_file_name] = cls(get_domain_issues(domain_file_name=domain_file_name
+                                                                                 , keep_issue_names=True
+                                                                                 , keep_value_names=True))
+        return codec
+
+    def encode(self, outcome: 'Outcome') -> str:
+        """Converts an outcome to a bid string"""
+        if isinstance(outcome, dict):
+            values = tuple(outcome.get(_, None) for _ in self.issue_names)
+        else:
+            values = tuple(outcome)
+        try:
+            return self._encoded[values]
+        except KeyError:
+            pass
+        except TypeError:
+            return ENTRY_SEP.join(f'{i}{INTERNAL_SEP}{v}' for i, v in zip(self.issue_names, values))
+        if len(self._encoded) >= self.max_cached:
+            self._encoded.clear()
+        encoded = self._encoded[values] = ENTRY_SEP.join(
+            f'{i}{INTERNAL_SEP}{table[v] if v in table else v}'
+            for i, v, table in zip(self.issue_names, values, self.value2str))
+        return encoded
+
+    def decode(self, bid: str, keep_issue_names: bool = True) -> 'Outcome':
+        """Converts a bid string to an outcome (values are converted back to the values of the domain issues)"""
+        values = self._decoded.get(bid, None)
+        if values is None:
+            values = [None] * len(self.issue_names)
+            for entry in bid.split(ENTRY_SEP):
+                name, value = entry.split(INTERNAL_SEP)
+                values[self.issue_index[name]] = self.str2value[name].get(value, value)
+            if len(self._decoded) >= self.max_cached:
+                self._decoded.clear()
+            values = self._decoded[bid] = tuple(values)
+        if keep_issue_names:
+            return dict(zip(self.issue_names, values))
+        return values
+
+
 class GeniusNegotiator(SAONegotiator):
-    """Encapsulates a Genius Negotiator"""
+    """Encapsulates a Genius Negotiator
+
+    Remarks:
+        - When a domain file is given, offers received from genius are converted back to the values of the domain
+          issues (see `GeniusOutcomeCodec`) instead of being returned as strings.
+
+    """
 
     def __init__(self, java_class_name: str
                  , port: int = None
@@ -323,6 +494,8 @@ class GeniusNegotiator(SAONegotiator):
         self.capabilities['propose'] = can_propose
         self.add_capabilities({'genius': True})
         self.java = None
+        self.bridge: Optional[GeniusBridge] = None
+        self._pooled = False
         self.java_class_name = java_class_name
         self.port = port
         self.connected = self._connect(port=self.port, auto_load_java=auto_load_java)
@@ -334,12 +507,13 @@ class GeniusNegotiator(SAONegotiator):
         self._my_last_offer = None
         self.keep_issue_names = keep_issue_names
         self.utility_function, self.discount = None, None
+        self.codec: Optional[GeniusOutcomeCodec] = None
         if domain_file_name is not None:
             # we keep original issues details so that we can create appropriate answers to Java
-            self.issues = get_domain_issues(domain_file_name=domain_file_name, keep_issue_names=True
-                                            , keep_value_names=True)
-            self.issue_names = [_.name for _ in self.issues]
-            self.issue_index = dict(zip(self.issue_names, range(len(self.issue_names))))
+            self.codec = GeniusOutcomeCodec.from_domain(domain_file_name)
+            self.issues = self.codec.issues
+            self.issue_names = self.codec.issue_names
+            self.issue_index = self.codec.issue_index
         if utility_file_name is not None:
             self.utility_function, self.discount = UtilityFunction.from_genius(utility_file_name
                                                                                , keep_issue_names=keep_issue_names
@@ -419,7 +593,7 @@ class GeniusNegotiator(SAONegotiator):
             True
 
         """
-        return self.java.create_agent(self.java_class_name)
+        return self.bridge.call('create_agent', self.java_class_name)
 
     def _connect(self, port: int, auto_load_java: bool = False) -> bool:
         """
@@ -449,24 +623,28 @@ class GeniusNegotiator(SAONegotiator):
             if auto_load_java:
                 if common_gateway is None:
                     init_genius_bridge()
-                gateway = common_gateway
-                self.java = gateway.entry_point
-                port = DEFAULT_PYTHON_PORT
+            if len(genius_bridges) > 0:
+                # spread negotiators over the bridges started by this process
+                self.bridge = min(genius_bridges.values(), key=lambda x: x.n_negotiators)
+                self.bridge.n_negotiators += 1
+                self._pooled = True
+                self.java = self.bridge.java
                 return True
             # port = 25334
         gateway = JavaGateway(python_proxy_port=port)
         if gateway is None:
             self.java = None
             return False
+        self.bridge = GeniusBridge(gateway)
         self.java = gateway.entry_point
         return True
 
     @property
     def java_name(self):
-        return self.java.getName(self.java_uuid)
+        return self.bridge.call('getName', self.java_uuid)
 
     def test(self) -> str:
-        return self.java.test(self.java_class_name)
+        return self.bridge.call('test', self.java_class_name)
 
     def on_negotiation_start(self, state: MechanismState) -> None:
         """Called when the info starts. Connects to the JVM.
@@ -481,8 +659,9 @@ class GeniusNegotiator(SAONegotiator):
         if n_steps * n_seconds > 0:
             # n_seconds take precedence
             n_steps = -1
-        self.java.on_negotiation_start(
-            self.java_uuid  # java_uuid
+        self.bridge.call(
+            'on_negotiation_start'
+            , self.java_uuid  # java_uuid
             , info.n_negotiators  # number of agents
             , n_steps
             , n_seconds
@@ -491,11 +670,18 @@ class GeniusNegotiator(SAONegotiator):
             , self.utility_file_name  # Negotiator file
         )
 
+    def on_negotiation_end(self, state: MechanismState) -> None:
+        """Called when the negotiation ends. Releases this negotiator's place in the bridge pool"""
+        super().on_negotiation_end(state=state)
+        if self._pooled:
+            self._pooled = False
+            self.bridge.n_negotiators -= 1
+
     def propose_(self, state: MechanismState) -> 'Outcome':
         if not self.capabilities['propose']:
             return None
         if self._my_last_offer is None:  # never responded before
-            response, outcome = self.parse(self.java.choose_action(self.java_uuid))
+            response, outcome = self.parse(self.bridge.choose_action(self.java_uuid))
             if outcome is None:
                 return None
             self._my_last_offer = outcome
@@ -507,7 +693,7 @@ class GeniusNegotiator(SAONegotiator):
         return tmp
 
     def respond_(self, state: MechanismState, offer: 'Outcome') -> 'ResponseType':
-        action = self.java.choose_action(self.java_uuid)
+        action = self.bridge.choose_action(self.java_uuid)
         response, self._my_last_offer = self.parse(action)
         return response
 
@@ -524,7 +710,9 @@ class GeniusNegotiator(SAONegotiator):
         id, typ_, bid_str = action.split(FIELD_SEP)
         if typ_ in ('Offer',) and (bid_str is not None and len(bid_str) > 0):
             try:
-                if self.keep_issue_names:
+                if self.codec is not None:
+                    outcome = self.codec.decode(bid_str, keep_issue_names=self.keep_issue_names)
+                elif self.keep_issue_names:
                     outcome = {_[0]: _[1] for _ in [_.split(INTERNAL_SEP) for _ in bid_str.split(ENTRY_SEP)]}
                 else:
                     outcome = tuple(_.split(INTERNAL_SEP)[1] for _ in bid_str.split(ENTRY_SEP))
@@ -541,6 +729,8 @@ class GeniusNegotiator(SAONegotiator):
         return response, outcome
 
     def _outcome2str(self, outcome):
+        if self.codec is not None:
+            return self.codec.encode(outcome)
         output = ''
         if not isinstance(outcome, dict):
             outcome_dict = dict(zip(self.issue_names, outcome))
@@ -564,9 +754,9 @@ class GeniusNegotiator(SAONegotiator):
         agent_info = agent_info[0]
         #if agent_info.type == 'genius_negotiator':
         #    return
-        self.java.receive_message(self.java_uuid
-                                  , agent_id, 'Offer'
-                                  , self._outcome2str(offer))
+        self.bridge.receive_message(self.java_uuid
+                                    , agent_id, 'Offer'
+                                    , self._outcome2str(offer))
 
     def on_partner_response(self, state: MechanismState, agent_id: str, outcome: 'Outcome', response: 'ResponseType'):
         if agent_id is self.id:
@@ -586,9 +776,9 @@ class GeniusNegotiator(SAONegotiator):
             resp = 'Reject'
         else:
             return
-        self.java.receive_message(self.java_uuid
-                                  , agent_id
-                                  , resp, bid)
+        self.bridge.receive_message(self.java_uuid
+                                    , agent_id
+                                    , resp, bid)
 
 
 def genius_bridge_is_running() -> bool:
@@ -5,6 +5,7 @@ This set of utlities can be extended but must be backward compatible for at
 least two versions
 """
 import datetime
+import functools
 import importlib
 import json
 import logging
@@ -18,13 +19,10 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     pass
 
-import colorlog
 import numpy as np
 import os
 import random
 import re
-import scipy.stats as stats
-import inflect
 import stringcase
 from enum import Enum
 import yaml
@@ -121,7 +119,8 @@ def create_loggers(
         return logger
     logger.setLevel(logging.DEBUG)
     # create formatter
-    if colored and 'colorlog' in sys.modules and os.isatty(2):
+    if colored and os.isatty(2):
+        import colorlog
         date_format = '%Y-%m-%d %H:%M:%S'
         cformat = '%(log_color)s' + format_str
         formatter = colorlog.ColoredFormatter(
@@ -505,6 +504,7 @@ class Distribution(object):
         **kwargs,
     ) -> None:
         super().__init__()
+        import scipy.stats as stats
         dist = getattr(stats, dtype.lower(), None)
         if dist is None:
             raise ValueError(f'Unknown distribution {dtype}')
@@ -633,7 +633,11 @@ class Distribution(object):
         return float(self).__divmod__(other)
 
 
-_inflect_engine = inflect.engine()
+@functools.lru_cache(maxsize=None)
+def _inflect_engine():
+    """The inflection engine used to find singular forms of config keys (created on first use as it is slow)"""
+    import inflect
+    return inflect.engine()
 
 
 class ConfigReader:
@@ -660,7 +664,7 @@ class ConfigReader:
                 else:
                     myconfig[k] = obj
             elif isinstance(v, Iterable) and not isinstance(v, str):
-                singular = _inflect_engine.singular_noun(k)
+                singular = _inflect_engine().singular_noun(k)
                 if singular is False:
                     singular = k
                 if class_name is None:
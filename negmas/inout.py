@@ -1,13 +1,20 @@
 """Defines import/export functionality
 """
+import concurrent.futures as futures
 import functools
+import hashlib
+import json
 import operator
 import os
 import shutil
-from typing import List, Optional, Tuple, Union, Dict, Callable, Iterable
+import tempfile
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional, Tuple, Union, Dict, Callable, Iterable, Iterator
 
 import numpy as np
-import pkg_resources
 
 from negmas.generics import ivalues
 
@@ -18,16 +25,276 @@ __all__ = [
     'convert_genius_domain',
     'find_domain_and_utility_files',
     'get_domain_issues',
+    'GeniusDomainCache',
+    'GeniusDomainInfo',
+    'GeniusDomainCatalogue',
+    'find_genius_domain_folders',
+    'load_genius_domains',
+    'convert_genius_domains',
 ]
 
 import xml.etree.ElementTree as ET
 from os import listdir
 from negmas import Issue, enumerate_outcomes, make_discounted_ufun
 from negmas import Negotiator
-from negmas import UtilityFunction
+from negmas import UtilityFunction, MappingUtilityFunction, LinearUtilityAggregationFunction
 from negmas import SAOMechanism, AspirationNegotiator
 
 
+class GeniusDomainCache:
+    """A persistent on-disk cache of parsed GENIUS domain and utility files.
+
+    Every entry is keyed by the contents of the parsed file (and, for utility files, of the domain file it is
+    validated against) together with the parsing options so editing a file or changing an option never returns a
+    stale result. An entry is a folder holding a small ``meta.json`` file and one ``.npy`` file per value/utility
+    table which is read back without parsing any XML. Many processes (e.g. tournament workers) can share a single
+    cache folder as entries are written to a temporary folder first then moved in place so a reader never sees a
+    partially written entry.
+
+    Args:
+        path: The folder to keep the cache in. It is created if it does not exist.
+
+    Remarks:
+        - Only issues and utility functions that can be represented as value tables are cached (discrete, integer
+          and real issues, mapping and linear aggregation utility functions defined by tables). Anything else (e.g.
+          hyper-rectangle utility functions or utility functions with real-valued evaluators) is parsed from the
+          XML file every time.
+
+    Examples:
+
+        >>> import pkg_resources
+        >>> import tempfile
+        >>> cache = GeniusDomainCache(tempfile.mkdtemp())
+        >>> domain_file_name = pkg_resources.resource_filename('negmas'
+        ...                                      , resource_name='tests/data/Laptop/Laptop-C-domain.xml')
+        >>> issues, _ = cache.issues(domain_file_name)
+        >>> [_.name for _ in issues]
+        ['Laptop', 'Harddisk', 'External Monitor']
+        >>> issues, _ = cache.issues(domain_file_name, force_single_issue=True, keep_value_names=False)
+        >>> issues[0].values
+        27
+        >>> len(cache)
+        2
+
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def __len__(self):
+        return sum(1 for _ in os.listdir(self.path) if not _.startswith('.'))
+
+    def clear(self) -> None:
+        """Removes all entries of the cache"""
+        for f in os.listdir(self.path):
+            shutil.rmtree(os.path.join(self.path, f), ignore_errors=True)
+
+    @staticmethod
+    def file_hash(file_name: str) -> str:
+        """Returns a hash of the contents of the given file"""
+        with open(file_name, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def _key(self, kind: str, file_hash: str, **options) -> str:
+        options = json.dumps(options, sort_keys=True, default=str)
+        return hashlib.sha1(f'{self.VERSION}:{kind}:{file_hash}:{options}'.encode('utf-8')).hexdigest()
+
+    def _load(self, key: str) -> Optional[Tuple[dict, Callable[[str], np.ndarray]]]:
+        folder = os.path.join(self.path, key)
+        try:
+            with open(os.path.join(folder, 'meta.json'), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta, lambda name: np.load(os.path.join(folder, name + '.npy'), allow_pickle=False)
+
+    def _save(self, key: str, meta: dict, arrays: Dict[str, np.ndarray]) -> None:
+        folder = os.path.join(self.path, key)
+        if os.path.exists(folder):
+            return
+        tmp = tempfile.mkdtemp(prefix=f'.{uuid.uuid4().hex}', dir=self.path)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp, name + '.npy'), array, allow_pickle=False)
+            with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp, folder)
+        except OSError:
+            # another process saved the same entry first (or the cache is read-only)
+            pass
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @staticmethod
+    def _encode_table(keys: list) -> Optional[np.ndarray]:
+        """Encodes a list of (homogeneous) scalars as a numpy array. Returns None if that is not possible"""
+        if len(keys) == 0:
+            return None
+        types = set(type(_) for _ in keys)
+        if types == {str}:
+            array = np.array(keys, dtype=str)
+            # numpy strips trailing null characters from strings
+            return array if array.tolist() == keys else None
+        if types == {int} or types == {float}:
+            return np.array(keys)
+        return None
+
+    def issues(self, file_name: str, force_single_issue=False, keep_value_names=True, keep_issue_names=True
+               , safe_parsing=True, n_discretization: Optional[int] = None, max_n_outcomes: int = 1e6
+               , file_hash: Optional[str] = None):
+        """Loads the issues of a GENIUS domain file through the cache.
+
+        Args:
+            file_name: The domain file name
+            file_hash: The hash of the file contents if already known (see ``file_hash``)
+
+        Returns:
+            The same output as ``Issue.from_genius``
+
+        Remarks:
+            See ``Issue.from_xml_str`` for all the other parameters
+        """
+        options = dict(force_single_issue=force_single_issue, keep_value_names=keep_value_names
+                       , keep_issue_names=keep_issue_names, safe_parsing=safe_parsing
+                       , n_discretization=n_discretization, max_n_outcomes=max_n_outcomes)
+        if file_hash is None:
+            file_hash = self.file_hash(file_name)
+        key = self._key('issues', file_hash, **options)
+        loaded = self._load(key)
+        if loaded is not None:
+            meta, array = loaded
+            if meta['issues'] is None:
+                return None, None
+            issues = []
+            for i, (name, kind, values) in enumerate(meta['issues']):
+                if kind == 'table':
+                    values = array(f'i{i}').tolist()
+                elif kind == 'range':
+                    values = tuple(values)
+                issues.append(Issue(values=values, name=name))
+            return issues, meta['agents']
+        issues, agents = Issue.from_genius(file_name, **options)
+        encoded, arrays = None, {}
+        if issues is not None:
+            encoded = []
+            for i, issue in enumerate(issues):
+                if isinstance(issue.values, int):
+                    encoded.append((issue.name, 'n', issue.values))
+                elif isinstance(issue.values, tuple):
+                    encoded.append((issue.name, 'range', list(issue.values)))
+                else:
+                    table = self._encode_table(list(issue.values))
+                    if table is None:
+                        return issues, agents
+                    encoded.append((issue.name, 'table', None))
+                    arrays[f'i{i}'] = table
+        self._save(key, dict(issues=encoded, agents=agents), arrays)
+        return issues, agents
+
+    def ufun(self, file_name: str, domain_issues: Optional[List[Issue]] = None
+             , domain_file_hash: Optional[str] = None, **kwargs):
+        """Loads a utility function from a GENIUS utility file through the cache.
+
+        Args:
+            file_name: The utility file name
+            domain_issues: The domain issues (passed to ``UtilityFunction.from_genius``)
+            domain_file_hash: The hash of the domain file the issues were read from. If it is not given while
+                              ``domain_issues`` is, the cache is bypassed as the entry key would not be complete.
+            **kwargs: Passed to ``UtilityFunction.from_genius``
+
+        Returns:
+            The same output as ``UtilityFunction.from_genius``
+
+        """
+        if domain_issues is not None and domain_file_hash is None:
+            return UtilityFunction.from_genius(file_name, domain_issues=domain_issues, **kwargs)
+        key = self._key('ufun', self.file_hash(file_name), domain=domain_file_hash, **kwargs)
+        loaded = self._load(key)
+        if loaded is not None:
+            meta, array = loaded
+            if meta['kind'] == 'none':
+                return None, meta['discount']
+            if meta['kind'] == 'mapping':
+                u = MappingUtilityFunction(dict(zip(zip(array('keys').tolist()), array('utils').tolist())))
+            else:
+                u = LinearUtilityAggregationFunction(
+                    issue_utilities={k: dict(zip(array(f'k{i}').tolist(), array(f'u{i}').tolist()))
+                                     for i, k in enumerate(meta['issues'])}
+                    , weights=dict(zip(meta['issues'], meta['weights'])))
+            u.reserved_value = meta['reserved_value']
+            return u, meta['discount']
+        u, discount = UtilityFunction.from_genius(file_name, domain_issues=domain_issues, **kwargs)
+        meta, arrays = dict(discount=discount, kind='none'), {}
+        if u is not None:
+            meta['reserved_value'] = u.reserved_value
+            if isinstance(u, MappingUtilityFunction) and isinstance(u.mapping, dict):
+                if not all(isinstance(_, tuple) and len(_) == 1 for _ in u.mapping.keys()):
+                    return u, discount
+                meta['kind'] = 'mapping'
+                arrays['keys'] = self._encode_table([_[0] for _ in u.mapping.keys()])
+                arrays['utils'] = self._encode_table([float(_) for _ in u.mapping.values()])
+            elif isinstance(u, LinearUtilityAggregationFunction) and isinstance(u.issue_utilities, dict):
+                meta['kind'] = 'linear'
+                meta['issues'], meta['weights'] = list(u.issue_utilities.keys()), []
+                for i, (k, f) in enumerate(u.issue_utilities.items()):
+                    if not isinstance(f, MappingUtilityFunction) or not isinstance(f.mapping, dict) \
+                        or not isinstance(k, (str, int)):
+                        return u, discount
+                    meta['weights'].append(u.weights[k])
+                    arrays[f'k{i}'] = self._encode_table(list(f.mapping.keys()))
+                    arrays[f'u{i}'] = self._encode_table([float(_) for _ in f.mapping.values()])
+            else:
+                return u, discount
+            if any(_ is None for _ in arrays.values()):
+                return u, discount
+        self._save(key, meta, arrays)
+        return u, discount
+
+
+def _as_cache(cache: Optional[Union[str, GeniusDomainCache]]) -> Optional[GeniusDomainCache]:
+    if cache is None or isinstance(cache, GeniusDomainCache):
+        return cache
+    return GeniusDomainCache(cache)
+
+
+def _xml_root_tag(file_name: str) -> str:
+    """Returns the tag of the root element of an XML file without parsing the whole file"""
+    with open(file_name, 'rb') as f:
+        for _, element in ET.iterparse(f, events=('start',)):
+            return element.tag
+    return ''
+
+
+def _read_domain_issues(domain_file_name: str, force_single_issue, max_n_outcomes, n_discretization
+                        , keep_issue_names, keep_value_names, safe_parsing
+                        , cache: Optional[GeniusDomainCache] = None, domain_hash: Optional[str] = None):
+    """Reads the detailed issues (needed to validate utility files) and the issues requested by the caller.
+
+    The domain file is parsed only once when the two coincide.
+    """
+    def read(**kwargs):
+        if cache is not None:
+            return cache.issues(domain_file_name, file_hash=domain_hash, **kwargs)
+        return Issue.from_genius(domain_file_name, **kwargs)
+
+    issues_details, _ = read(force_single_issue=False, keep_issue_names=True, keep_value_names=True
+                             , safe_parsing=safe_parsing, n_discretization=n_discretization)
+    if force_single_issue:
+        issues, _ = read(force_single_issue=force_single_issue, keep_issue_names=keep_issue_names
+                         , keep_value_names=keep_value_names, max_n_outcomes=max_n_outcomes
+                         , n_discretization=n_discretization)
+    elif keep_issue_names and keep_value_names:
+        issues = issues_details
+    else:
+        issues, _ = read(force_single_issue=force_single_issue, keep_issue_names=keep_issue_names
+                         , keep_value_names=keep_value_names, safe_parsing=safe_parsing
+                         , n_discretization=n_discretization)
+    return issues, issues_details
+
+
 def get_domain_issues(domain_file_name: str
                        , force_single_issue=False
                        , max_n_outcomes: int = 1e6
@@ -35,6 +302,7 @@ def get_domain_issues(domain_file_name: str
                        , keep_issue_names=True
                        , keep_value_names=True
                        , safe_parsing=False
+                       , cache: Optional[Union[str, GeniusDomainCache]] = None
                        ) -> Union[Dict[str, Issue], List[Issue]]:
     """
     Returns the issues of a given XML domain (Genius Format)
@@ -47,6 +315,7 @@ def get_domain_issues(domain_file_name: str
         keep_issue_names:
         keep_value_names:
         safe_parsing:
+        cache: A ``GeniusDomainCache`` (or the folder of one) to read parsed issues from
 
     Returns:
         List or Dict of issues
@@ -55,22 +324,14 @@ def get_domain_issues(domain_file_name: str
     issues, issues_details, mechanism = None, None, None
     if domain_file_name is not None:
         domain_file_name = str(domain_file_name)
-        issues_details, _ = Issue.from_genius(domain_file_name, force_single_issue=False
-                                              , keep_issue_names=True, keep_value_names=True, safe_parsing=safe_parsing
-                                              , n_discretization=n_discretization)
-        if force_single_issue:
-            issues, _ = Issue.from_genius(domain_file_name, force_single_issue=force_single_issue
-                                          , keep_issue_names=keep_issue_names
-                                          , keep_value_names=keep_value_names
-                                          , max_n_outcomes=max_n_outcomes
-                                          , n_discretization=n_discretization)
-            if issues is None:
-                return []
-        else:
-            issues, _ = Issue.from_genius(domain_file_name, force_single_issue=force_single_issue
-                                          , keep_issue_names=keep_issue_names, keep_value_names=keep_value_names,
-                                          safe_parsing=safe_parsing
-                                          , n_discretization=n_discretization)
+        issues, issues_details = _read_domain_issues(domain_file_name, force_single_issue=force_single_issue
+                                                     , max_n_outcomes=max_n_outcomes
+                                                     , n_discretization=n_discretization
+                                                     , keep_issue_names=keep_issue_names
+                                                     , keep_value_names=keep_value_names
+                                                     , safe_parsing=safe_parsing, cache=_as_cache(cache))
+        if force_single_issue and issues is None:
+            return []
     return issues if not force_single_issue else [issues]
 
 
@@ -92,6 +353,7 @@ def load_genius_domain(domain_file_name: str
                        , safe_parsing=False
                        , ignore_reserved=False
                        , ignore_discount=False
+                       , cache: Optional[Union[str, GeniusDomainCache]] = None
                        ) \
     -> Tuple[Optional[SAOMechanism], List[dict], Union[Dict[str, Issue], List[Issue]]]:
     """
@@ -115,6 +377,9 @@ def load_genius_domain(domain_file_name: str
         safe_parsing:
         ignore_reserved:
         ignore_discount:
+        cache: A ``GeniusDomainCache`` (or the folder of one) to read parsed issues and utility functions from.
+               Repeated loads of the same files with the same options are read from the cache instead of parsing
+               the XML files.
 
     Returns:
         - mechanism (SAOMechanism): A mechanism for the given issues
@@ -123,41 +388,35 @@ def load_genius_domain(domain_file_name: str
 
     """
     issues, issues_details, mechanism = None, None, None
+    cache = _as_cache(cache)
+    domain_hash = None
     if domain_file_name is not None:
         domain_file_name = str(domain_file_name)
-        issues_details, _ = Issue.from_genius(domain_file_name, force_single_issue=False
-                                              , keep_issue_names=True, keep_value_names=True, safe_parsing=safe_parsing
-                                              , n_discretization=n_discretization)
-        if force_single_issue:
-            issues, _ = Issue.from_genius(domain_file_name, force_single_issue=force_single_issue
-                                          , keep_issue_names=keep_issue_names
-                                          , keep_value_names=keep_value_names
-                                          , max_n_outcomes=max_n_outcomes
-                                          , n_discretization=n_discretization)
-            if issues is None:
-                return None, [], []
-        else:
-            issues, _ = Issue.from_genius(domain_file_name, force_single_issue=force_single_issue
-                                          , keep_issue_names=keep_issue_names, keep_value_names=keep_value_names,
-                                          safe_parsing=safe_parsing
-                                          , n_discretization=n_discretization)
+        if cache is not None:
+            domain_hash = cache.file_hash(domain_file_name)
+        issues, issues_details = _read_domain_issues(domain_file_name, force_single_issue=force_single_issue
+                                                     , max_n_outcomes=max_n_outcomes
+                                                     , n_discretization=n_discretization
+                                                     , keep_issue_names=keep_issue_names
+                                                     , keep_value_names=keep_value_names
+                                                     , safe_parsing=safe_parsing, cache=cache
+                                                     , domain_hash=domain_hash)
+        if force_single_issue and issues is None:
+            return None, [], []
 
     agent_info = []
     if utility_file_names is None:
         utility_file_names = []
     utility_file_names = [str(_) for _ in utility_file_names]
     for ufname in utility_file_names:
-        utility, discount_factor = UtilityFunction.from_genius(file_name=ufname
-                                                               , force_single_issue=force_single_issue
-                                                               , keep_issue_names=keep_issue_names
-                                                               , keep_value_names=keep_value_names
-                                                               , normalize_utility=normalize_utilities
-                                                               , domain_issues=issues_details
-                                                               , safe_parsing=safe_parsing
-                                                               , max_n_outcomes=max_n_outcomes
-                                                               , ignore_discount=ignore_discount
-                                                               , ignore_reserved=ignore_reserved
-                                                               )
+        options = dict(force_single_issue=force_single_issue, keep_issue_names=keep_issue_names
+                       , keep_value_names=keep_value_names, normalize_utility=normalize_utilities
+                       , domain_issues=issues_details, safe_parsing=safe_parsing, max_n_outcomes=max_n_outcomes
+                       , ignore_discount=ignore_discount, ignore_reserved=ignore_reserved)
+        if cache is not None:
+            utility, discount_factor = cache.ufun(ufname, domain_file_hash=domain_hash, **options)
+        else:
+            utility, discount_factor = UtilityFunction.from_genius(file_name=ufname, **options)
         agent_info.append({
             'ufun': utility, 'reserved_value_func': utility.reserved_value if utility is not None else 0.0
             , 'discount_factor': discount_factor
@@ -216,6 +475,7 @@ def load_genius_domain_from_folder(folder_name: str
                                    , safe_parsing=False
                                    , ignore_reserved=False
                                    , ignore_discount=False
+                                   , cache: Optional[Union[str, GeniusDomainCache]] = None
                                    ) \
     -> Tuple[Optional[SAOMechanism], List[dict], Union[Dict[str, Issue], List[Issue]]]:
     """
@@ -238,6 +498,9 @@ def load_genius_domain_from_folder(folder_name: str
         safe_parsing:
         ignore_reserved:
         ignore_discount:
+        cache: A ``GeniusDomainCache`` (or the folder of one) to read parsed issues and utility functions from.
+               Repeated loads of the same files with the same options are read from the cache instead of parsing
+               the XML files.
 
     Returns:
         - mechanism (SAOMechanism): A mechanism for the given issues
@@ -246,6 +509,7 @@ def load_genius_domain_from_folder(folder_name: str
 
     Examples:
 
+        >>> import pkg_resources
         >>> folder_name = pkg_resources.resource_filename('negmas', resource_name='tests/data/10issues')
         >>> mechanism, negotiators, issues = load_genius_domain_from_folder(folder_name
         ...                             , force_single_issue=False, keep_issue_names=False
@@ -304,11 +568,11 @@ def load_genius_domain_from_folder(folder_name: str
         if not f.endswith('.xml') or f.endswith('pareto.xml'):
             continue
         full_name = folder_name + '/' + f
-        root = ET.parse(full_name).getroot()
+        tag = _xml_root_tag(full_name)
 
-        if root.tag == 'negotiation_template':
+        if tag == 'negotiation_template':
             domain_file_name = full_name
-        elif root.tag == 'utility_space':
+        elif tag == 'utility_space':
             utility_file_names.append(full_name)
     return load_genius_domain(domain_file_name=domain_file_name
                               , utility_file_names=utility_file_names
@@ -326,7 +590,8 @@ def load_genius_domain_from_folder(folder_name: str
                               , dynamic_entry=dynamic_entry
                               , safe_parsing=safe_parsing
                               , ignore_reserved=ignore_reserved
-                              , ignore_discount=ignore_discount)
+                              , ignore_discount=ignore_discount
+                              , cache=cache)
 
 
 def find_domain_and_utility_files(folder_name) -> Tuple[str, List[str]]:
@@ -339,11 +604,11 @@ def find_domain_and_utility_files(folder_name) -> Tuple[str, List[str]]:
         if not f.endswith('.xml') or f.endswith('pareto.xml'):
             continue
         full_name = folder_name + '/' + f
-        root = ET.parse(full_name).getroot()
+        tag = _xml_root_tag(full_name)
 
-        if root.tag == 'negotiation_template':
+        if tag == 'negotiation_template':
             domain_file_name = full_name
-        elif root.tag == 'utility_space':
+        elif tag == 'utility_space':
             utility_file_names.append(full_name)
     return domain_file_name, utility_file_names
 
@@ -418,11 +683,11 @@ def convert_genius_domain_from_folder(src_folder_name: str, dst_folder_name: str
         if not f.endswith('.xml') or f.endswith('pareto.xml'):
             continue
         full_name = src_folder_name + '/' + f
-        root = ET.parse(full_name).getroot()
+        tag = _xml_root_tag(full_name)
 
-        if root.tag == 'negotiation_template':
+        if tag == 'negotiation_template':
             domain_file_name = full_name
-        elif root.tag == 'utility_space':
+        elif tag == 'utility_space':
             utility_file_names.append(full_name)
     success = convert_genius_domain(src_domain_file_name=domain_file_name
                                     , dst_domain_file_name=os.path.join(dst_folder_name,
@@ -438,3 +703,207 @@ def convert_genius_domain_from_folder(src_folder_name: str, dst_folder_name: str
             shutil.rmtree(dst_folder_name, ignore_errors=True)
 
     return success
+
+
+@dataclass
+class GeniusDomainInfo:
+    """Information about a GENIUS domain folder collected by ``load_genius_domains`` or ``convert_genius_domains``"""
+    name: str
+    """Domain name (the path of its folder relative to the folder that was scanned)"""
+    folder: str
+    """The folder containing the domain"""
+    domain_file_name: Optional[str] = None
+    """The domain file name"""
+    utility_file_names: List[str] = field(default_factory=list)
+    """Utility file names"""
+    n_issues: int = 0
+    """Number of issues"""
+    n_outcomes: float = 0
+    """Number of outcomes (`-1` for infinity)"""
+    ufun_types: List[str] = field(default_factory=list)
+    """Type names of the utility functions (one per utility file)"""
+    time: float = 0.0
+    """Time (in seconds) it took to load (or convert) the domain"""
+    error: Optional[str] = None
+    """The error that happened while loading (or converting) the domain if any"""
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def load(self, **kwargs) -> Tuple[Optional[SAOMechanism], List[dict], Union[Dict[str, Issue], List[Issue]]]:
+        """Loads the domain. See ``load_genius_domain`` for the parameters and the return value"""
+        return load_genius_domain(domain_file_name=self.domain_file_name, utility_file_names=self.utility_file_names
+                                  , **kwargs)
+
+
+class GeniusDomainCatalogue:
+    """A catalogue of GENIUS domains that can be searched without parsing the domains again.
+
+    Domains are only parsed when explicitly loaded (see ``GeniusDomainInfo.load``). A catalogue can be saved to a json
+    file and read back later.
+
+    Args:
+        domains: The information about each domain
+
+    Examples:
+
+        >>> import pkg_resources
+        >>> catalogue = load_genius_domains(pkg_resources.resource_filename('negmas'
+        ...                                 , resource_name='tests/data/scenarios/anac'), parallel=False)
+        >>> [_.name for _ in catalogue]
+        ['y2010/EnglandZimbabwe', 'y2010/ItexvsCypress', 'y2010/Travel']
+        >>> domain = catalogue['y2010/ItexvsCypress']
+        >>> domain.n_issues, domain.n_outcomes, domain.ufun_types
+        (4, 180, ['LinearUtilityAggregationFunction', 'LinearUtilityAggregationFunction'])
+        >>> [_.name for _ in catalogue.select(lambda d: d.n_outcomes < 1000)]
+        ['y2010/EnglandZimbabwe', 'y2010/ItexvsCypress']
+        >>> mechanism, agent_info, issues = domain.load()
+        >>> len(issues), len(agent_info)
+        (4, 2)
+
+    """
+
+    def __init__(self, domains: Iterable[GeniusDomainInfo] = ()):
+        self.domains = sorted(domains, key=lambda x: x.name)
+        self._index: Optional[Dict[str, GeniusDomainInfo]] = None
+
+    def __len__(self) -> int:
+        return len(self.domains)
+
+    def __iter__(self) -> Iterator[GeniusDomainInfo]:
+        return iter(self.domains)
+
+    def __contains__(self, name: str) -> bool:
+        return self.index.__contains__(name)
+
+    def __getitem__(self, item: Union[int, str]) -> GeniusDomainInfo:
+        if isinstance(item, int):
+            return self.domains[item]
+        return self.index[item]
+
+    @property
+    def index(self) -> Dict[str, GeniusDomainInfo]:
+        """Domain information indexed by domain name"""
+        if self._index is None:
+            self._index = {_.name: _ for _ in self.domains}
+        return self._index
+
+    @property
+    def failures(self) -> List[GeniusDomainInfo]:
+        """Domains that failed to load (or convert)"""
+        return [_ for _ in self.domains if _.failed]
+
+    def select(self, condition: Callable[[GeniusDomainInfo], bool]
+               , include_failures: bool = False) -> List[GeniusDomainInfo]:
+        """Returns all the domains satisfying the given condition"""
+        return [_ for _ in self.domains if (include_failures or not _.failed) and condition(_)]
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        import pandas as pd
+        return pd.DataFrame(data=[asdict(_) for _ in self.domains])
+
+    def save(self, file_name: str) -> None:
+        """Saves the catalogue to a json file"""
+        with open(file_name, 'w') as f:
+            json.dump([asdict(_) for _ in self.domains], f, indent=2)
+
+    @classmethod
+    def load(cls, file_name: str) -> 'GeniusDomainCatalogue':
+        """Loads a catalogue saved using ``save``"""
+        with open(file_name, 'r') as f:
+            return cls(GeniusDomainInfo(**_) for _ in json.load(f))
+
+
+def find_genius_domain_folders(base_folder: str) -> List[str]:
+    """Finds all the folders containing a GENIUS domain under the given folder (recursively)"""
+    folders = []
+    for folder, _, files in os.walk(str(base_folder)):
+        if not any(_.endswith('.xml') for _ in files):
+            continue
+        domain_file_name, _ = find_domain_and_utility_files(folder)
+        if domain_file_name is not None:
+            folders.append(folder)
+    return sorted(folders)
+
+
+def _index_genius_domain(name: str, folder_name: str, dst_folder_name: Optional[str] = None
+                         , **kwargs) -> GeniusDomainInfo:
+    """Loads (or converts then loads) a single domain and collects information about it. Never raises."""
+    info = GeniusDomainInfo(name=name, folder=dst_folder_name if dst_folder_name is not None else folder_name)
+    _start = time.perf_counter()
+    try:
+        if dst_folder_name is not None:
+            if not convert_genius_domain_from_folder(src_folder_name=folder_name, dst_folder_name=dst_folder_name
+                                                     , **kwargs):
+                raise ValueError(f'Cannot convert {folder_name}')
+        info.domain_file_name, info.utility_file_names = find_domain_and_utility_files(info.folder)
+        _, agent_info, issues = load_genius_domain(domain_file_name=info.domain_file_name
+                                                   , utility_file_names=info.utility_file_names
+                                                   , **kwargs)
+        if kwargs.get('force_single_issue', False):
+            issues = issues[0]
+        if issues is None or len(issues) == 0:
+            raise ValueError(f'Cannot load the issues of {folder_name}')
+        info.n_issues = len(issues)
+        info.n_outcomes = Issue.n_outcomes(issues)
+        info.ufun_types = [_['ufun'].__class__.__name__ for _ in agent_info]
+    except Exception as e:
+        info.error = f'{e.__class__.__name__}: {e}\n{traceback.format_exc()}'
+    info.time = time.perf_counter() - _start
+    return info
+
+
+def _index_genius_domains(base_folder: str, dst_base_folder: Optional[str], parallel: bool
+                          , max_workers: Optional[int], **kwargs) -> GeniusDomainCatalogue:
+    base_folder = os.path.abspath(str(base_folder))
+    jobs = []
+    for folder in find_genius_domain_folders(base_folder):
+        name = os.path.relpath(folder, base_folder)
+        if name == '.':
+            name = os.path.basename(base_folder)
+        jobs.append((name, folder, os.path.join(str(dst_base_folder), name) if dst_base_folder is not None else None))
+    if not parallel or max_workers == 1 or len(jobs) < 2:
+        return GeniusDomainCatalogue(_index_genius_domain(*job, **kwargs) for job in jobs)
+    with futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        future_results = [executor.submit(_index_genius_domain, *job, **kwargs) for job in jobs]
+        return GeniusDomainCatalogue(_.result() for _ in futures.as_completed(future_results))
+
+
+def load_genius_domains(base_folder: str, parallel: bool = True, max_workers: Optional[int] = None
+                        , **kwargs) -> GeniusDomainCatalogue:
+    """Loads all GENIUS domains found under the given folder (recursively) using a process pool.
+
+    Args:
+        base_folder: The folder to scan for domains
+        parallel: If true, domains are loaded in parallel by a process pool
+        max_workers: Maximum number of processes to use (`None` for the number of processors)
+        **kwargs: Passed to ``load_genius_domain`` (e.g. pass a ``cache`` to keep the parsed domains around for later
+                  loads)
+
+    Returns:
+        A catalogue of the domains found including load times and failures.
+
+    """
+    return _index_genius_domains(base_folder, None, parallel=parallel, max_workers=max_workers, **kwargs)
+
+
+def convert_genius_domains(src_base_folder: str, dst_base_folder: str, parallel: bool = True
+                           , max_workers: Optional[int] = None, **kwargs) -> GeniusDomainCatalogue:
+    """Converts all GENIUS domains found under the given folder (recursively) using a process pool.
+
+    Every domain is converted into the same relative path under `dst_base_folder`.
+
+    Args:
+        src_base_folder: The folder to scan for domains
+        dst_base_folder: The folder to save converted domains into
+        parallel: If true, domains are converted in parallel by a process pool
+        max_workers: Maximum number of processes to use (`None` for the number of processors)
+        **kwargs: Passed to ``convert_genius_domain``
+
+    Returns:
+        A catalogue of the converted domains including conversion times and failures.
+
+    """
+    return _index_genius_domains(src_base_folder, dst_base_folder, parallel=parallel, max_workers=max_workers
+                                 , **kwargs)
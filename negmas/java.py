@@ -7,7 +7,6 @@ import subprocess
 import time
 from typing import Optional, Dict, Any, Iterable, Callable
 
-import pkg_resources
 from py4j.clientserver import ClientServer, JavaParameters, PythonParameters
 from py4j.java_collections import MapConverter, SetConverter, ListConverter
 from py4j.java_gateway import JavaClass
@@ -122,6 +121,7 @@ class JNegmasGateway:
         if cls.gateway is not None:
             return
         if path is None:
+            import pkg_resources
             path = pkg_resources.resource_filename('negmas', resource_name='external/yasserfarouk.jnegmas.main.jar')
         java_port = java_port if java_port > 0 else cls.DEFAULT_JAVA_PORT
         path = os.path.abspath(os.path.expanduser(path))
@@ -3,19 +3,24 @@
 
 
 """
+import copy
 import itertools
 import math
 import pprint
 import time
+import typing
 import uuid
-from collections import defaultdict
-from typing import Tuple, List, Optional, Any, Iterable, Union, Dict, Set, Type
+import weakref
+from abc import abstractmethod
+from collections import defaultdict, deque
+from typing import Tuple, List, Optional, Any, Iterable, Union, Dict, Set, Type, Callable, Sequence
+from typing import TYPE_CHECKING
 
-import pandas as pd
-from dataclasses import dataclass
+import numpy as np
+from dataclasses import dataclass, fields
 
 from negmas.utilities import UtilityFunction, MappingUtilityFunction, pareto_frontier
-from negmas.outcomes import outcome_is_valid, Issue, Outcome, enumerate_outcomes
+from negmas.outcomes import outcome_is_valid, Issue, Outcome, OutcomeSpace
 from negmas.common import *
 from negmas.common import NegotiatorInfo
 from negmas.events import *
@@ -23,12 +28,19 @@ from negmas.generics import ikeys
 from negmas.helpers import snake_case, LoggerMixin
 from negmas.negotiators import Negotiator
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 __all__ = [
     'Mechanism',
     'MechanismProxy',
     'Protocol',
     'ProtocolProxy',
     'MechanismRoundResult',
+    'MechanismHistory',
+    'NoHistory',
+    'LastKHistory',
+    'ColumnarHistory',
 ]
 
 
@@ -46,6 +58,264 @@ class MechanismRoundResult:
     """Error message"""
 
 
+class MechanismHistory(Sequence):
+    """Base class of all recorders of the history of a mechanism (a sequence of `MechanismState` objects)"""
+
+    @abstractmethod
+    def append(self, state: MechanismState) -> None:
+        """Records the given state"""
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        """Returns the recorded history as a `pd.DataFrame` with one row per recorded state"""
+        import pandas as pd
+        return pd.DataFrame(data=[_.__dict__ for _ in self])
+
+
+class NoHistory(MechanismHistory):
+    """A history recorder that records nothing"""
+
+    def append(self, state: MechanismState) -> None:
+        pass
+
+    def __getitem__(self, item):
+        return [][item]
+
+    def __len__(self):
+        return 0
+
+
+class LastKHistory(MechanismHistory):
+    """A history recorder that keeps only the last `k` states
+
+    Examples:
+        >>> history = LastKHistory(2)
+        >>> for step in range(5):
+        ...     history.append(MechanismState(step=step))
+        >>> len(history), [_.step for _ in history]
+        (2, [3, 4])
+    """
+
+    def __init__(self, k: int):
+        if k < 1:
+            raise ValueError(f'Cannot keep the last {k} states of the history')
+        self._states = deque(maxlen=k)
+
+    def append(self, state: MechanismState) -> None:
+        self._states.append(state)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return list(self._states)[item]
+        return self._states[item]
+
+    def __len__(self):
+        return len(self._states)
+
+
+_MISSING = object()
+
+
+def _column_kind(annotation) -> str:
+    """Decides how a state field is stored in a `ColumnarHistory` given its (resolved) type annotation"""
+    if annotation is bool:
+        return 'b'
+    if annotation is int:
+        return 'i'
+    if annotation is float:
+        return 'f'
+    if annotation == Outcome or annotation == Optional[Outcome]:
+        return 'o'
+    if annotation is str or annotation == Optional[str]:
+        return 'c'
+    return 'x'
+
+
+def _field_types(state_type: Type[MechanismState]) -> Dict[str, Any]:
+    """Returns the type annotations of the fields of a state type with forward references (e.g. 'Outcome') resolved"""
+    try:
+        hints = typing.get_type_hints(state_type, localns={'Outcome': Outcome})
+    except (NameError, TypeError):
+        hints = {}
+    return {f.name: hints.get(f.name, f.type) for f in fields(state_type)}
+
+
+_COLUMN_TYPES = {'b': np.bool_, 'i': np.int64, 'f': np.float64, 'o': np.int64, 'c': np.int32}
+
+
+class ColumnarHistory(MechanismHistory):
+    """A history recorder that stores the states in preallocated numpy columns instead of keeping state objects.
+
+    Args:
+        outcome_index: A function returning the index of an outcome (or None/raising if it cannot be indexed)
+        outcome_at: A function returning the outcome at a given index (the inverse of `outcome_index`)
+        capacity: The initial number of rows allocated (doubled whenever needed)
+
+    Remarks:
+        - Boolean, integer and float fields of the state are stored in arrays of the corresponding type.
+        - Outcomes (e.g. `agreement`, `current_offer`) are stored as their index in the outcome space and strings
+          (e.g. `current_offerer`, `error_details`) as indices into a table of the distinct strings seen.
+        - Values that cannot be encoded this way (e.g. outcomes with no index) are kept as is in a side table.
+        - Indexing (or iterating) the history recreates the recorded states. Use `to_dataframe` to get all of them
+          at once.
+
+    Examples:
+        >>> history = ColumnarHistory(outcome_index=lambda x: x[0], outcome_at=lambda i: (i,))
+        >>> for step in range(3):
+        ...     history.append(MechanismState(step=step, started=True, agreement=(step,) if step == 2 else None))
+        >>> len(history), history[-1].step, history[-1].agreement, history[0].agreement
+        (3, 2, (2,), None)
+        >>> history.to_dataframe()[['step', 'agreement']].values.tolist()
+        [[0, None], [1, None], [2, (2,)]]
+        >>> history.to_dataframe(decode=False)['agreement'].tolist()
+        [-1, -1, 2]
+    """
+
+    def __init__(self, outcome_index: Optional[Callable[['Outcome'], Optional[int]]] = None
+                 , outcome_at: Optional[Callable[[int], 'Outcome']] = None, capacity: int = 64):
+        self._outcome_index = outcome_index
+        self._outcome_at = outcome_at
+        self._capacity = max(1, capacity)
+        self._n = 0
+        self._state_type = None
+        self._kinds: Dict[str, str] = {}
+        self._columns: Dict[str, Union[np.ndarray, List[Any]]] = {}
+        self._strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        self._overflow: Dict[int, Dict[str, Any]] = defaultdict(dict)
+
+    def _init_columns(self, state: MechanismState) -> None:
+        self._state_type = type(state)
+        self._kinds = {k: _column_kind(t) for k, t in _field_types(type(state)).items()}
+        self._columns = {k: [] if kind == 'x' else np.zeros(self._capacity, dtype=_COLUMN_TYPES[kind])
+                         for k, kind in self._kinds.items()}
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        for k, column in self._columns.items():
+            if isinstance(column, np.ndarray):
+                grown = np.zeros(self._capacity, dtype=column.dtype)
+                grown[:self._n] = column
+                self._columns[k] = grown
+
+    def _encode(self, kind: str, value: Any):
+        """Returns the code of the given value in a column of the given kind or `_MISSING` if it cannot be coded"""
+        # values that would not be decoded exactly (e.g. a float in an int column) are left to the side table
+        if kind == 'b':
+            return value if isinstance(value, (bool, np.bool_)) else _MISSING
+        if kind == 'i':
+            return value if isinstance(value, (int, np.integer)) and not isinstance(value, bool) else _MISSING
+        if kind == 'f':
+            return value if isinstance(value, (float, np.floating)) else _MISSING
+        if value is None:
+            return -1
+        if kind == 'c':
+            if not isinstance(value, str):
+                return _MISSING
+            code = self._string_codes.get(value, None)
+            if code is None:
+                code = self._string_codes[value] = len(self._strings)
+                self._strings.append(value)
+            return code
+        if self._outcome_index is None:
+            return _MISSING
+        try:
+            code = self._outcome_index(value)
+        except (KeyError, ValueError, TypeError):
+            return _MISSING
+        return _MISSING if code is None else code
+
+    def append(self, state: MechanismState) -> None:
+        if self._state_type is None:
+            self._init_columns(state)
+        if self._n >= self._capacity:
+            self._grow()
+        row = self._n
+        values = state.__dict__
+        for k, kind in self._kinds.items():
+            # fields missing from the state are recorded as `_MISSING` to keep all columns aligned
+            value = values.get(k, _MISSING)
+            if kind == 'x':
+                self._columns[k].append(value)
+                continue
+            code = _MISSING if value is _MISSING else self._encode(kind, value)
+            if code is _MISSING:
+                self._overflow[row][k] = value
+                code = -2 if kind in 'oc' else 0
+            self._columns[k][row] = code
+        for k, value in values.items():
+            if k not in self._kinds:
+                self._overflow[row][k] = value
+        self._n += 1
+
+    def _decode(self, kind: str, code) -> Any:
+        if kind == 'b':
+            return bool(code)
+        if kind == 'i':
+            return int(code)
+        if kind == 'f':
+            return float(code)
+        if code < 0:
+            return None
+        return self._strings[code] if kind == 'c' else self._outcome_at(int(code))
+
+    def _row(self, row: int) -> MechanismState:
+        state = self._state_type.__new__(self._state_type)
+        values = {k: self._columns[k][row] if kind == 'x' else self._decode(kind, self._columns[k][row])
+                  for k, kind in self._kinds.items()}
+        values.update(self._overflow.get(row, {}))
+        state.__dict__.update({k: v for k, v in values.items() if v is not _MISSING})
+        return state
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._row(_) for _ in range(self._n)[item]]
+        return self._row(range(self._n)[item])
+
+    def __len__(self):
+        return self._n
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns the raw (encoded) values of the given field for all recorded states"""
+        column = self._columns[name]
+        if not isinstance(column, list):
+            return column[:self._n]
+        values = np.empty(len(column), dtype=object)
+        for i, value in enumerate(column):
+            values[i] = None if value is _MISSING else value
+        return values
+
+    def to_dataframe(self, decode: bool = True) -> 'pd.DataFrame':
+        """Returns the history as a `pd.DataFrame`
+
+        Args:
+            decode: If False, outcomes and strings are returned as their codes (-1 for None, -2 for values kept
+                    in the side table) instead of being decoded.
+        """
+        data = {k: self.column(k) for k in self._kinds.keys()}
+        if decode:
+            for k, kind in self._kinds.items():
+                if kind == 'c':
+                    strings = np.array(self._strings + [None, None], dtype=object)
+                    data[k] = strings[data[k]]
+                elif kind == 'o':
+                    data[k] = [None if _ < 0 else self._outcome_at(int(_)) for _ in data[k]]
+            for row, values in self._overflow.items():
+                for k, v in values.items():
+                    if k not in data:
+                        data[k] = [None] * self._n
+                    if not isinstance(data[k], list):
+                        data[k] = list(data[k])
+                    data[k][row] = None if v is _MISSING else v
+        import pandas as pd
+        return pd.DataFrame(data=data)
+
+
+def _state_field(name: str) -> property:
+    """Creates a property that stores a mechanism attribute directly in a field of its current state"""
+    return property(lambda self: getattr(self._current_state, name)
+                    , lambda self, value: setattr(self._current_state, name, value))
+
+
 # noinspection PyAttributeOutsideInit
 class Mechanism(NamedObject, EventSource, LoggerMixin):
     """
@@ -53,9 +323,20 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
 
     Override the `round` function of this class to implement a round of your mechanism
     """
-    all: Dict[str, 'Mechanism'] = {}
+    all: Dict[str, 'Mechanism'] = weakref.WeakValueDictionary()
+    """All mechanisms that are still alive (mechanisms are not kept alive by this registry)"""
     register_all_mechanisms(all)
 
+    # The current state is updated in place whenever any of these attributes is set
+    _running = _state_field('running')
+    _started = _state_field('started')
+    _step = _state_field('step')
+    _broken = _state_field('broken')
+    _timedout = _state_field('timedout')
+    _agreement = _state_field('agreement')
+    _error = _state_field('has_error')
+    _error_details = _state_field('error_details')
+
     def __init__(
         self,
         issues: List['Issue'] = None,
@@ -69,6 +350,7 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
         keep_issue_names=True,
         annotation: Optional[Dict[str, Any]] = None,
         state_factory=MechanismState,
+        history_policy: Union[str, int] = 'full',
         name=None,
     ):
         """
@@ -80,16 +362,19 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
             time_limit: Number of real seconds allowed (None means infinity)
             max_n_agents:  Maximum allowed number of agents
             dynamic_entry: Allow agents to enter/leave negotiations between rounds
-            cache_outcomes: If true, a list of all possible outcomes will be cached
+            cache_outcomes: If true, all possible outcomes will be available through `outcomes` (enumerated lazily)
             max_n_outcomes: The maximum allowed number of outcomes in the cached set
             keep_issue_names: If True, dicts with issue names will be used for outcomes otherwise tuples
             annotation: Arbitrary annotation
             state_factory: A callable that receives an arbitrary set of key-value pairs and return a MechanismState
             descendant object
+            history_policy: How much of the history to keep: 'full' (all states stored in a `ColumnarHistory`),
+                            'none' or an integer k (only the last k states are kept)
             name: Name of the mechanism session. Should be unique. If not given, it will be generated.
         """
         super().__init__(name=name)
         # parameters fixed for all runs
+        __space = None
         if issues is None:
             if outcomes is None:
                 raise ValueError('Not issues or outcomes are given to this mechanism. Cannot be constructed')
@@ -120,7 +405,10 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
                             if n_outcomes > max_n_outcomes:
                                 break
                         else:
-                            outcomes = enumerate_outcomes(__issues, keep_issue_names=keep_issue_names)
+                            # outcomes are not enumerated here. The space is enumerated (once for all mechanisms
+                            # sharing the same issues) only when the full list of outcomes is iterated over
+                            __space = OutcomeSpace.shared(__issues, astype=dict if keep_issue_names else tuple)
+                            outcomes = __space
 
                 except ValueError:
                     pass
@@ -142,13 +430,21 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
         # we have now __issues is a List[Issue] and __outcomes is Optional[List[Outcome]]
 
         # create a couple of ways to access outcomes by indices effeciently
+        self.outcome_space: Optional[OutcomeSpace] = __space
         self.outcome_index = lambda x: None
         self.outcome_indices = []
-        if __outcomes is not None and cache_outcomes:
+        # an outcome index that is fast enough to be used for every recorded state (or None)
+        history_index = None
+        if __space is not None:
+            self.outcome_indices = range(len(__space))
+            self.outcome_index = __space.index
+            history_index = lambda x: __space.index(x) if isinstance(x, __space.astype) else None
+        elif __outcomes is not None and cache_outcomes:
             self.outcome_indices = range(len(__outcomes))
             try:
                 _outcome_index = dict(zip(__outcomes, self.outcome_indices))
                 self.outcome_index = lambda x: _outcome_index[x]
+                history_index = self.outcome_index
             except:
                 self.outcome_index = lambda x: __outcomes.index(x)
 
@@ -165,12 +461,21 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
             , annotation=annotation
         )
 
-        self._history = []
+        if history_policy == 'full':
+            self._history = ColumnarHistory(outcome_index=history_index
+                                            , outcome_at=None if history_index is None else __outcomes.__getitem__)
+        elif history_policy == 'none':
+            self._history = NoHistory()
+        elif isinstance(history_policy, int):
+            self._history = LastKHistory(history_policy)
+        else:
+            raise ValueError(f'Unknown history policy {history_policy}. Use "full", "none" or an integer')
         # if self.info.issues is not None:
         #     self.info.issues = tuple(self.info.issues)
         # if self.info.outcomes is not None:
         #     self.info.outcomes = tuple(self.info.outcomes)
         self._state_factory = state_factory
+        self._current_state = state_factory()
         Mechanism.all[self.id] = self
 
         self._requirements = {}
@@ -240,6 +545,8 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
         """Returns random offers"""
         if self.info.issues is None or len(self.info.issues) == 0:
             raise ValueError('I do not have any issues to generate offers from')
+        if self.outcome_space is not None and self.outcome_space.astype == astype:
+            return self.outcome_space.sample(n_outcomes=n, with_replacement=False, fail_if_not_enough=False)
         return Issue.sample(issues=self.issues, n_outcomes=n, astype=astype, with_replacement=False
                             , fail_if_not_enough=False)
 
@@ -573,18 +880,21 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
         """
         if len(self._agents) < 2:
             if self.info.dynamic_entry:
-                self._history.append(self.state)
-                return self.state
+                state = self.state
+                self._history.append(state)
+                return state
             else:
                 self.info.state.running = False
                 self._agreement, self._broken, self._timedout = None, False, False
-                self._history.append(self.state)
+                state = self.state
+                self._history.append(state)
                 self.on_negotiation_end()
-                return self.state
+                return state
 
         if self._broken or self._timedout or self._agreement is not None:
-            self._history.append(self.state)
-            return self.state
+            state = self.state
+            self._history.append(state)
+            return state
 
         if not self._running:
             self._running = True
@@ -593,10 +903,12 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
             self._started = True
             if self.on_negotiation_start() is False:
                 self._agreement, self._broken, self._timedout = None, False, False
-                self._history.append(self.state)
-                return self.state
+                state = self.state
+                self._history.append(state)
+                return state
+            state = self.state
             for a in self.negotiators:
-                a.on_negotiation_start(state=self.state)
+                a.on_negotiation_start(state=state)
             self.announce(Event(type='negotiation_start', data=None))
         else:
             remaining_steps, remaining_time = self.remaining_steps, self.remaining_time
@@ -605,12 +917,14 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
             ):
                 self._running = False
                 self._agreement, self._broken, self._timedout = None, False, True
-                self._history.append(self.state)
+                state = self.state
+                self._history.append(state)
                 self.on_negotiation_end()
-                return self.state
+                return state
 
+        state = self.state
         for agent in self._agents:
-            agent.on_round_start(state=self.state)
+            agent.on_round_start(state=state)
         result = self.step_()
         self._error, self._error_details = result.error, result.error_details
         if self._error:
@@ -619,12 +933,14 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
         if (self._agreement is not None) or self._broken or self._timedout:
             self._running = False
         self._step += 1
+        state = self.state
         for agent in self._agents:
-            agent.on_round_end(state=self.state)
+            agent.on_round_end(state=state)
         if not self._running:
             self.on_negotiation_end()
-        self._history.append(self.state)
-        return self.state
+        state = self.state
+        self._history.append(state)
+        return state
 
     def run(self, timeout=None) -> MechanismState:
         if timeout is None:
@@ -667,39 +983,38 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
         return True
 
     @property
-    def history(self):
+    def history(self) -> MechanismHistory:
+        """The states of the mechanism after each step (as allowed by the `history_policy`)"""
         return self._history
 
     @property
     def state(self):
-        """Returns the current state. **Override this property if your mechanism wants to keep extra state**"""
-        current_state = self.extra_state()
-        if current_state is None:
-            current_state = {}
-        else:
-            current_state = dict(current_state)
-        current_state.update({
-            'running': self._running,
-            'step': self._step,
-            'time': self.time,
-            'relative_time': self.relative_time,
-            'broken': self._broken,
-            'timedout': self._timedout,
-            'started': self._started,
-            'agreement': self._agreement,
-            'n_negotiators': len(self.negotiators),
-            'has_error': self._error,
-            'error_details': self._error_details
-        })
-        return self._state_factory(**current_state)
+        """Returns a snapshot of the current state.
+
+        Remarks:
+            - The mechanism keeps a single state object (created by the `state_factory`) that is updated in place.
+              Every access to this property returns a (shallow) copy of it that is not affected by later updates.
+            - Mechanisms that need extra state should either store it directly in `_current_state` (see
+              `SAOMechanism`) or override `extra_state`.
+        """
+        current_state = self._current_state
+        current_state.time = self.time
+        current_state.relative_time = self.relative_time
+        current_state.n_negotiators = len(self.negotiators)
+        extra = self.extra_state()
+        if extra is not None:
+            for k, v in dict(extra).items():
+                setattr(current_state, k, v)
+        return copy.copy(current_state)
 
     def pareto_frontier(self, n_max=None, sort_by_welfare=True, consider_costs=False) \
         -> Tuple[List[Tuple[float]], List['Outcome']]:
         ufuns = self._get_ufuns(consider_costs=consider_costs)
+        outcomes = self.discrete_outcomes(n_max=n_max)
         frontier, indices = pareto_frontier(ufuns=ufuns, n_discretization=None
                                             , sort_by_welfare=sort_by_welfare
-                                            , outcomes=self.discrete_outcomes(n_max=n_max))
-        return frontier, [self.discrete_outcomes(n_max=n_max)[_] for _ in indices]
+                                            , outcomes=outcomes)
+        return frontier, [outcomes[_] for _ in indices]
 
     def __str__(self):
         d = self.__dict__.copy()
@@ -725,7 +1040,7 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
             # has_front = int(len(self.outcomes[0]) <2)
             has_front = 1
             n_agents = len(self.negotiators)
-            history = pd.DataFrame(data=[_.__dict__ for _ in self.history])
+            history = self.history.to_dataframe()
             # history['time'] = [_.time for _ in self.history]
             # history['relative_time'] = [_.relative_time for _ in self.history]
             # history['step'] = [_.step for _ in self.history]
@@ -733,11 +1048,11 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
             ufuns = self._get_ufuns(consider_costs=consider_costs)
             outcomes = self.outcomes
 
-            utils = [tuple(f(o) for f in ufuns) for o in outcomes]
+            utils = list(zip(*(f.eval_all(outcomes) for f in ufuns)))
             agent_names = [a.name for a in self.negotiators]
-            history['offer_index'] = [outcomes.index(_) for _ in history.current_offer]
+            history['offer_index'] = [self.outcome_index(_) for _ in history.current_offer]
             frontier, frontier_outcome = self.pareto_frontier(sort_by_welfare=True)
-            frontier_outcome_indices = [outcomes.index(_) for _ in frontier_outcome]
+            frontier_outcome_indices = [self.outcome_index(_) for _ in frontier_outcome]
             if plot_utils:
                 fig_util = plt.figure()
             if plot_outcomes:
@@ -810,7 +1125,7 @@ class Mechanism(NamedObject, EventSource, LoggerMixin):
                         axu.scatter([ufuns[0](self.state.agreement)], [ufuns[1](self.state.agreement)]
                                 , color='black', marker='*', s=120, label='SCMLAgreement')
                     if plot_outcomes:
-                        axo.scatter([outcomes.index(self.state.agreement)], [outcomes.index(self.state.agreement)]
+                        axo.scatter([self.outcome_index(self.state.agreement)], [self.outcome_index(self.state.agreement)]
                                 , color='black', marker='*', s=120, label='SCMLAgreement')
 
                 if plot_utils:
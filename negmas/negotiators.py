@@ -132,6 +132,11 @@ class Negotiator(NamedObject, Notifiable, ABC):
         """Agent capabilities"""
         return self._capabilities
 
+    @property
+    def _parent(self) -> Optional['ControllerProxy']:
+        """The controller of this negotiator (None if it is not controlled)"""
+        return self.__parent
+
     def add_capabilities(self, capabilities: dict) -> None:
         """Adds named capabilities to the agent.
 
@@ -27,6 +27,7 @@ Examples:
 import itertools
 import math
 import random
+import weakref
 import xml.etree.ElementTree as ET
 from enum import Enum
 from functools import reduce
@@ -35,7 +36,6 @@ from typing import Optional, Collection, List, Generator, Iterable, Sequence, Un
 from typing import Tuple, Mapping, Dict, Any
 
 import numpy as np
-import pkg_resources
 from dataclasses import dataclass, fields
 
 
@@ -61,6 +61,7 @@ __all__ = [
     'outcome_as_dict',
     'outcome_as_tuple',
     'num_outcomes',
+    'OutcomeSpace',
 ]
 
 
@@ -215,6 +216,7 @@ class Issue(NamedObject):
 
                 Examples:
 
+                    >>> import pkg_resources
                     >>> issues, _ = Issue.from_genius(file_name = pkg_resources.resource_filename('negmas'
                     ...                                      , resource_name='tests/data/Laptop/Laptop-C-domain.xml'))
                     >>> Issue.to_genius(issues=issues, file_name = pkg_resources.resource_filename('negmas'
@@ -278,6 +280,7 @@ class Issue(NamedObject):
 
                 Examples:
 
+                    >>> import pkg_resources
                     >>> domain_file_name = pkg_resources.resource_filename('negmas'
                     ...                                      , resource_name='tests/data/Laptop/Laptop-C-domain.xml')
                     >>> issues, _ = Issue.from_xml_str(open(domain_file_name, 'r').read()
@@ -395,13 +398,14 @@ class Issue(NamedObject):
                     info[a] = child.attrib.get(a, info[a])
                 mytype = info['type']
                 if mytype == 'discrete':
-                    issues[issue_key] = []
+                    issues[issue_key], found = [], set()
                     for item in child:
                         if item.tag == 'item':
                             item_indx = int(item.attrib['index']) - 1
                             item_name = item.attrib.get('value', None)
                             item_key = item_name if keep_value_names and item_name is not None else item_indx
-                            if item_key not in issues[issue_key]:  # ignore repeated items
+                            if item_key not in found:  # ignore repeated items
+                                found.add(item_key)
                                 issues[issue_key].append(item_key)
                     if not keep_value_names:
                         issues[issue_key] = len(issues[issue_key])
@@ -477,6 +481,7 @@ class Issue(NamedObject):
 
                 Examples:
 
+                    >>> import pkg_resources
                     >>> issues, _ = Issue.from_genius(file_name = pkg_resources.resource_filename('negmas'
                     ...                                      , resource_name='tests/data/Laptop/Laptop-C-domain.xml'))
                     >>> print([_.name for _ in issues])
@@ -1052,6 +1057,184 @@ def num_outcomes(issues: Collection[Issue]) -> Optional[int]:
     return n
 
 
+class OutcomeSpace(Sequence):
+    """A compact integer-indexed representation of all outcomes of a set of discrete issues.
+
+    Every outcome is identified by its index in the enumeration order of `enumerate_outcomes` (the first issue is the
+    most significant). Conversion between indices and outcomes uses mixed-radix arithmetic so it takes a constant time
+    (for a given number of issues) in both directions and no outcome is stored. Outcomes are only materialized as
+    dicts (or tuples) when they are accessed.
+
+    Args:
+        issues: The issues defining the space. All of them must be discrete
+        astype: The type of the outcomes returned (`dict` or `tuple`)
+
+    Examples:
+        >>> space = OutcomeSpace([Issue(['a', 'b', 'c'], 'type'), Issue(4, 'count')])
+        >>> len(space)
+        12
+        >>> space[5]
+        {'type': 'b', 'count': 1}
+        >>> space.index({'type': 'b', 'count': 1})
+        5
+        >>> space[-1]
+        {'type': 'c', 'count': 3}
+        >>> space.codes[5].tolist()
+        [1, 1]
+        >>> OutcomeSpace(space.issues, astype=tuple)[:3]
+        [('a', 0), ('a', 1), ('a', 2)]
+        >>> list(space) == enumerate_outcomes(space.issues)
+        True
+
+    Remarks:
+        - The `codes` array (one row per outcome and one column per issue holding the index of the value of that
+          issue) is only created the first time it is accessed.
+        - The values of all outcomes are enumerated (and kept as tuples) the first time the whole space is iterated
+          over. Indexing, slicing, `index` and `sample` never enumerate the space.
+        - Outcomes other than tuples are created every time they are accessed so modifying an outcome never changes
+          the space.
+        - Use `OutcomeSpace.shared` to get a space that is shared with everyone else using the same issues.
+
+    """
+
+    _shared: 'weakref.WeakValueDictionary[Any, OutcomeSpace]' = weakref.WeakValueDictionary()
+
+    def __init__(self, issues: Iterable[Issue], astype: Type = dict):
+        self.issues = list(issues)
+        if any(_.is_continuous() for _ in self.issues):
+            raise ValueError('Cannot create an OutcomeSpace with continuous issues')
+        self.astype = astype
+        self.issue_names = [_.name for _ in self.issues]
+        self.issue_values = [list(_.all) for _ in self.issues]
+        self.cardinalities = [len(_) for _ in self.issue_values]
+        self.strides = [reduce(mul, self.cardinalities[i + 1:], 1) for i in range(len(self.issues))]
+        self.n_outcomes = reduce(mul, self.cardinalities, 1) if len(self.issues) > 0 else 0
+        self._value_indices = [dict(zip(_, range(len(_)))) for _ in self.issue_values]
+        self._codes = None
+        self._outcomes: Optional[List[Tuple[Any, ...]]] = None
+
+    @classmethod
+    def shared(cls, issues: Iterable[Issue], astype: Type = dict) -> 'OutcomeSpace':
+        """Returns an outcome space for the given issues that is shared with all other callers using identical issues.
+
+        Examples:
+            >>> OutcomeSpace.shared([Issue(5, 'a')]) is OutcomeSpace.shared([Issue(5, 'a')])
+            True
+            >>> OutcomeSpace.shared([Issue(5, 'a')]) is OutcomeSpace.shared([Issue(5, 'b')])
+            False
+            >>> OutcomeSpace.shared([Issue([1, 2], 'a')]) is OutcomeSpace.shared([Issue(['1', '2'], 'a')])
+            False
+
+        Remarks:
+            - The space is kept alive only as long as someone is using it.
+        """
+        issues = list(issues)
+        key = (tuple((_.name, tuple((type(v), v) for v in _.all)) for _ in issues), astype)
+        space = cls._shared.get(key, None)
+        if space is None:
+            space = cls._shared[key] = cls(issues, astype=astype)
+        return space
+
+    @property
+    def codes(self) -> np.ndarray:
+        """A 2-D array giving the index of the value of every issue (column) for every outcome (row)"""
+        if self._codes is None:
+            dtype = np.min_scalar_type(max(self.cardinalities, default=1))
+            indices = np.arange(self.n_outcomes, dtype=np.int64)[:, None]
+            self._codes = ((indices // np.asarray(self.strides, dtype=np.int64))
+                           % np.asarray(self.cardinalities, dtype=np.int64)).astype(dtype)
+        return self._codes
+
+    def _as_outcome(self, values: Sequence[Any]) -> 'Outcome':
+        if self.astype == tuple:
+            return tuple(values)
+        if self.astype == dict:
+            return dict(zip(self.issue_names, values))
+        return self.astype(**dict(zip(self.issue_names, values)))
+
+    def outcome(self, index: int) -> 'Outcome':
+        """Returns the outcome with the given index"""
+        if index < 0:
+            index += self.n_outcomes
+        if not 0 <= index < self.n_outcomes:
+            raise IndexError(f'Outcome index {index} out of range for {self.n_outcomes} outcomes')
+        if self._outcomes is not None:
+            return self._as_outcome(self._outcomes[index])
+        return self._as_outcome([values[(index // stride) % n] for values, stride, n
+                                 in zip(self.issue_values, self.strides, self.cardinalities)])
+
+    def index(self, outcome: 'Outcome') -> int:
+        """Returns the index of the given outcome. Raises a `ValueError` if it is not in the space"""
+        if isinstance(outcome, OutcomeType):
+            outcome = outcome.asdict()
+        try:
+            if isinstance(outcome, dict):
+                values = [outcome[_] for _ in self.issue_names]
+            else:
+                values = outcome
+                if len(values) != len(self.issues):
+                    raise ValueError(f'{outcome} has {len(values)} values for {len(self.issues)} issues')
+            return sum(indices[v] * stride for v, indices, stride in zip(values, self._value_indices, self.strides))
+        except (KeyError, TypeError):
+            raise ValueError(f'{outcome} is not in the outcome space')
+
+    def sample(self, n_outcomes: int, with_replacement: bool = False, fail_if_not_enough=False) -> List['Outcome']:
+        """Samples outcomes uniformly from the space without enumerating it
+
+        Args:
+            n_outcomes: The number of outcomes required
+            with_replacement: Whether sampling is with replacement (allowing repetition)
+            fail_if_not_enough: If given then an exception is raised if not enough outcomes are available
+
+        Examples:
+            >>> space = OutcomeSpace([Issue(1000, 'a'), Issue(1000, 'b')])
+            >>> samples = space.sample(10)
+            >>> len(samples), len(set(tuple(_.values()) for _ in samples)), all(_ in space for _ in samples)
+            (10, 10, True)
+            >>> len(OutcomeSpace([Issue(3, 'a')]).sample(10))
+            3
+
+        """
+        if with_replacement:
+            indices = [random.randrange(self.n_outcomes) for _ in range(n_outcomes)] if self.n_outcomes > 0 else []
+        elif n_outcomes > self.n_outcomes:
+            if fail_if_not_enough:
+                raise ValueError(f'Cannot sample {n_outcomes} from a total of possible {self.n_outcomes} outcomes')
+            indices = range(self.n_outcomes)
+        else:
+            indices = random.sample(range(self.n_outcomes), n_outcomes)
+        return [self.outcome(_) for _ in indices]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if self._outcomes is not None:
+                return [self._as_outcome(_) for _ in self._outcomes[item]]
+            return [self.outcome(_) for _ in range(*item.indices(self.n_outcomes))]
+        return self.outcome(item)
+
+    def __len__(self):
+        return self.n_outcomes
+
+    def __iter__(self):
+        if self._outcomes is None:
+            self._outcomes = list(itertools.product(*self.issue_values)) if len(self.issues) > 0 else []
+        if self.astype == tuple:
+            return iter(self._outcomes)
+        return (self._as_outcome(_) for _ in self._outcomes)
+
+    def __contains__(self, outcome):
+        try:
+            self.index(outcome)
+        except ValueError:
+            return False
+        return True
+
+    def __str__(self):
+        return f'OutcomeSpace({self.n_outcomes} outcomes of {self.issues})'
+
+    __repr__ = __str__
+
+
 def enumerate_outcomes(issues: Iterable[Issue], keep_issue_names=True) \
     -> Optional[Union[List['Outcome'], Dict[str, 'Outcome']]]:
     """Enumerates all outcomes of this set of issues if possible
@@ -1069,8 +1252,7 @@ def enumerate_outcomes(issues: Iterable[Issue], keep_issue_names=True) \
         return None
     if keep_issue_names:
         issue_names = [_.name for _ in issues]
-        for i, outcome in enumerate(outcomes):
-            outcomes[i] = dict(zip(issue_names, outcome))
+        outcomes = [dict(zip(issue_names, outcome)) for outcome in outcomes]
     return outcomes
 
 
@@ -1,6 +1,9 @@
+import functools
+import math
 import random
+import time
 from abc import abstractmethod
-from typing import Dict, Any, Callable, Type
+from typing import Dict, Any, Callable, Type, Set
 from typing import Sequence, Optional, List, Tuple, Iterable, Union
 
 import numpy as np
@@ -9,14 +12,17 @@ from dataclasses import dataclass
 from negmas.common import *
 from negmas.events import Notification
 from negmas.java import JNegmasGateway, JavaCallerMixin, to_java
-from negmas.mechanisms import MechanismRoundResult, Mechanism
+from negmas.mechanisms import MechanismRoundResult, Mechanism, NoHistory, _state_field
 from negmas.negotiators import Negotiator, AspirationMixin, Controller
 from negmas.outcomes import sample_outcomes, Outcome, outcome_is_valid, ResponseType, outcome_as_dict
-from negmas.utilities import MappingUtilityFunction, normalize, UtilityFunction, UtilityValue, JavaUtilityFunction
+from negmas.utilities import MappingUtilityFunction, normalize, UtilityFunction, UtilityValue, JavaUtilityFunction \
+    , ExpDiscountedUFun, LinDiscountedUFun, ConstUFun, LinearUtilityAggregationFunction \
+    , ComplexWeightedUtilityFunction, ComplexNonlinearUtilityFunction
 
 __all__ = [
     'SAOState',
     'SAOMechanism',
+    'SAOBatchRunner',
     'SAOMechanismProxy',
     'SAOProtocol',
     'SAOProtocolProxy',
@@ -57,6 +63,10 @@ class SAOInfo(MechanismInfo):
 
 
 class SAOMechanism(Mechanism):
+    # The offer and acceptance counters are kept directly in the current `SAOState`
+    _current_offer = _state_field('current_offer')
+    _n_accepting = _state_field('n_acceptances')
+
     def __init__(
         self,
         issues=None,
@@ -70,6 +80,7 @@ class SAOMechanism(Mechanism):
         max_n_outcomes: int = 1000000,
         annotation: Optional[Dict[str, Any]] = None,
         end_negotiation_on_refusal_to_propose=True,
+        history_policy: Union[str, int] = 'full',
         name: Optional[str] = None,
     ):
         super().__init__(
@@ -84,6 +95,7 @@ class SAOMechanism(Mechanism):
             max_n_outcomes=max_n_outcomes,
             annotation=annotation,
             state_factory=SAOState,
+            history_policy=history_policy,
             name=name,
         )
         self._current_offer = None
@@ -100,12 +112,14 @@ class SAOMechanism(Mechanism):
             return False
         return True
 
-    def extra_state(self):
-        return SAOState(
-            current_offer=self._current_offer
-            , current_offerer=self._current_offerer.id if self._current_offerer else None
-            , n_acceptances=self._n_accepting,
-        )
+    @property
+    def _current_offerer(self) -> Optional['Negotiator']:
+        return self.__current_offerer
+
+    @_current_offerer.setter
+    def _current_offerer(self, negotiator: Optional['Negotiator']):
+        self.__current_offerer = negotiator
+        self._current_state.current_offerer = negotiator.id if negotiator else None
 
     def step_(self) -> MechanismRoundResult:
         n_agents = len(self.negotiators)
@@ -115,11 +129,12 @@ class SAOMechanism(Mechanism):
         if self._current_offer is None:
             response = ResponseType.NO_RESPONSE
         elif negotiator is not self._current_offerer:
-            response = negotiator.respond_(state=self.state, offer=self._current_offer)
+            state = self.state
+            response = negotiator.respond_(state=state, offer=self._current_offer)
             for other in self.negotiators:
                 if other is negotiator:
                     continue
-                other.on_partner_response(state=self.state, agent_id=negotiator.id, outcome=self._current_offer
+                other.on_partner_response(state=state, agent_id=negotiator.id, outcome=self._current_offer
                                           , response=response)
         else:
             response = ResponseType.NO_RESPONSE
@@ -434,6 +449,7 @@ class SAONegotiator(Negotiator):
         self.my_last_proposal: Optional['Outcome'] = None
         self.my_last_proposal_utility: float = None
         self.rational_proposal = rational_proposal
+        self._on_leaving_fast_path: Optional[Callable[[], None]] = None
         self.add_capabilities(
             {
                 'respond': True,
@@ -442,7 +458,15 @@ class SAONegotiator(Negotiator):
             }
         )
 
+    @property
+    def _ending_negotiation(self) -> bool:
+        """True if the negotiator was asked to end the negotiation (it will refuse to propose and end it)"""
+        return self.__end_negotiation
+
     def on_notification(self, notification: Notification, notifier: str):
+        if notification.type in ('end_negotiation', 'ufun_modified') and self._on_leaving_fast_path is not None:
+            # the negotiator is being run by the fast path of a `SAOBatchRunner` which cannot handle these changes
+            self._on_leaving_fast_path()
         if notification.type == 'end_negotiation':
             self.__end_negotiation = True
         elif notification.type == 'propose' and notifier == self.mechanism_id:
@@ -685,7 +709,11 @@ class AspirationNegotiator(SAONegotiator, AspirationMixin):
                  , dynamic_ufun=True, randomize_offer=False, can_propose=True, assume_normalized=True):
         super().__init__(name=name, assume_normalized=assume_normalized, parent=parent)
         self.aspiration_init(max_aspiration=max_aspiration, aspiration_type=aspiration_type)
-        self.ordered_outcomes = []
+        self._outcomes: List['Outcome'] = []
+        self._utils = np.zeros(0)
+        self._order = np.zeros(0, dtype=np.int64)
+        self._neg_sorted_utils = np.zeros(0)
+        self._ordered_outcomes = []
         self.dynamic_ufun = dynamic_ufun
         self.randomize_offer = randomize_offer
         self._max_aspiration = self.max_aspiration
@@ -713,19 +741,73 @@ class AspirationNegotiator(SAONegotiator, AspirationMixin):
         else:
             return self.utility_function
 
-    def _update_ordered_outcomes(self):
+    @property
+    def ordered_outcomes(self) -> List[Tuple[Optional[float], 'Outcome']]:
+        """All outcomes with their utilities sorted descendingly (outcomes with unknown utilities come last)"""
+        if self._ordered_outcomes is None:
+            utils = (None if np.isnan(_) else float(_) for _ in -self._neg_sorted_utils)
+            self._ordered_outcomes = list(zip(utils, (self._outcomes[_] for _ in self._order)))
+        return self._ordered_outcomes
+
+    def _update_ordered_outcomes(self, changed: Optional[Iterable['Outcome']] = None):
+        """Updates the utility index of outcomes.
+
+        Args:
+            changed: The outcomes with modified utilities. If None, all outcomes are reevaluated.
+
+        Remarks:
+            - The index keeps the negated utilities in ascending order (unknown utilities last) together with the
+              order of outcomes so that the outcome at a given aspiration level can be found by a binary search.
+            - Ties are broken by the order of outcomes in the mechanism whether the index is updated fully or
+              incrementally.
+        """
+        self._ordered_outcomes = None
+        if changed is not None and self.utility_function is not None and len(self._outcomes) > 0:
+            indices = [self.mechanism_info.outcome_index(_) for _ in changed]
+            if all(_ is not None and 0 <= _ < len(self._outcomes) for _ in indices):
+                self._rerank(np.unique(np.asarray(indices, dtype=np.int64)))
+                return
         outcomes = self.mechanism_info.discrete_outcomes()
         if not self.assume_normalized:
             self.utility_function = normalize(self.utility_function, outcomes=outcomes, infeasible_cutoff=-1e-6)
-        self.ordered_outcomes = sorted([(self.ufun(outcome), outcome) for outcome in outcomes]
-                                       , key=lambda x: x[0], reverse=True)
+        self._outcomes = outcomes
+        if self.utility_function is None:
+            self._utils = np.full(len(outcomes), np.nan)
+        else:
+            self._utils = np.asarray(self.utility_function.eval_all(outcomes), dtype=float)
+        # a stable sort of negated utilities puts outcomes with unknown utilities last
+        self._order = np.argsort(-self._utils, kind='stable')
+        self._neg_sorted_utils = -self._utils[self._order]
+
+    def _rerank(self, indices: np.ndarray) -> None:
+        """Reevaluates the utilities of the outcomes at the given indices and moves them to their new ranks"""
+        if len(indices) == 0:
+            return
+        utils = np.asarray(self.utility_function.eval_all([self._outcomes[_] for _ in indices]), dtype=float)
+        self._utils[indices] = utils
+        keep = ~np.isin(self._order, indices)
+        order, neg_sorted = self._order[keep], self._neg_sorted_utils[keep]
+        # insert in the order the full sort would have put them: by utility then by outcome index
+        inserted = np.lexsort((indices, -utils))
+        indices, utils = indices[inserted], utils[inserted]
+        lo = np.searchsorted(neg_sorted, -utils, side='left')
+        hi = np.searchsorted(neg_sorted, -utils, side='right')
+        positions = np.array([l + np.searchsorted(order[l:h], i) for l, h, i in zip(lo, hi, indices)], dtype=np.int64)
+        self._order = np.insert(order, positions, indices)
+        self._neg_sorted_utils = np.insert(neg_sorted, positions, -utils)
 
     def on_notification(self, notification: Notification, notifier: str):
+        """Updates the utility index when the ufun is modified.
+
+        Remarks:
+            - The data of a 'ufun_modified' notification can be a list of the outcomes whose utilities changed in
+              which case only these outcomes are re-ranked.
+        """
         super().on_notification(notification, notifier)
         if notification.type == 'ufun_modified':
             if self.dynamic_ufun:
                 self.__ufun_modified = True
-                self._update_ordered_outcomes()
+                self._update_ordered_outcomes(changed=notification.data)
 
     def on_negotiation_start(self, state: MechanismState):
         self.__ufun_modified = False
@@ -746,20 +828,22 @@ class AspirationNegotiator(SAONegotiator, AspirationMixin):
         asp = self.aspiration(state.relative_time)
         if asp < self.reserved_value:
             return None
-        for i, (u, o) in enumerate(self.ordered_outcomes):
-            if u is None:
-                continue
-            if u < asp:
-                if u < self.reserved_value:
-                    return None
-                if i == 0:
-                    return self.ordered_outcomes[i][1]
-                if self.randomize_offer:
-                    return random.sample(self.ordered_outcomes[:i], 1)[0][1]
-                return self.ordered_outcomes[i - 1][1]
+        neg_sorted, n = self._neg_sorted_utils, len(self._order)
+        if n == 0:
+            raise IndexError('No outcomes to propose')
+        # the first outcome with a known utility below the aspiration level (nan utilities are sorted last)
+        i = int(np.searchsorted(neg_sorted, -asp, side='right')) if not math.isnan(asp) else n
+        if i < n and not np.isnan(neg_sorted[i]):
+            if -neg_sorted[i] < self.reserved_value:
+                return None
+            if i == 0:
+                return self._outcomes[self._order[0]]
+            if self.randomize_offer:
+                return self._outcomes[self._order[random.sample(range(i), 1)[0]]]
+            return self._outcomes[self._order[i - 1]]
         if self.randomize_offer:
-            return random.sample(self.ordered_outcomes, 1)[0][1]
-        return self.ordered_outcomes[-1][1]
+            return self._outcomes[self._order[random.sample(range(n), 1)[0]]]
+        return self._outcomes[self._order[-1]]
 
 
 class NiceNegotiator(SAONegotiator, RandomProposalMixin):
@@ -1083,6 +1167,614 @@ class SAOController(Controller):
         return self.call(negotiator, 'respond_', state=state,  offer=offer)
 
 
+# Response codes and strategy kinds used by the array-based fast path of `SAOBatchRunner`
+_ACCEPT, _REJECT, _END, _NO_RESPONSE = 0, 1, 2, 3
+_ASPIRATION, _TOUGH, _ONLY_BEST, _LIMITED, _TIT_FOR_TAT = range(5)
+
+# slot fields that are offsets into a flat array (shifted when negotiations are added to the fast path)
+_SLOT_OFFSETS = {'uoff': 'utils', 'sstart': 'neg_sorted', 'send': 'neg_sorted', 'wstart': 'wheel', 'wend': 'wheel'}
+_ROW_TYPES = {'n': np.int64, 'base': np.int64, 'cur': np.int64, 'offer': np.int64, 'offerer': np.int64
+    , 'nacc': np.int64, 'step': np.int64, 'n_steps': np.float64, 'time_limit': np.float64, 'start': np.float64
+    , 'refusal_ends': np.bool_, 'agreement': np.int64, 'broken': np.bool_, 'timedout': np.bool_, 'done': np.bool_}
+_SLOT_TYPES = {'kind': np.int8, 'rv': np.float64, 'none_u': np.float64, 'rational': np.bool_, 'uoff': np.int64
+    , 'prop_pos': np.int64, 'prop_cur': np.int64, 'max_asp': np.float64, 'e': np.float64, 'pmin': np.float64
+    , 'sstart': np.int64, 'send': np.int64, 'best': np.int64, 'wstart': np.int64, 'wend': np.int64
+    , 'p_none': np.float64, 'p_end': np.float64, 'p0': np.int64, 'p1': np.int64, 'nrec': np.int64
+    , 'recv_u': np.float64, 'last_prop': np.int64, 'last_u': np.float64, 'live': np.bool_}
+_FLAT_TYPES = {'utils': np.float64, 'prob': np.float64, 'neg_sorted': np.float64, 'sorted_order': np.int64
+    , 'wheel': np.float64, 'wheel_outcomes': np.int64}
+# negotiator callbacks called every round by `Mechanism.step` (the fast path requires them to be the no-op defaults)
+_ROUND_CALLBACKS = ('on_round_start', 'on_round_end')
+
+
+def _random(n: int) -> np.ndarray:
+    """Draws `n` uniform numbers from the `random` module which the negotiators use when stepped normally"""
+    return np.fromiter((random.random() for _ in range(n)), dtype=np.float64, count=n)
+
+
+def _static_ufun(ufun: UtilityFunction) -> bool:
+    """Whether the values of a utility function can only change when it is modified explicitly (i.e. with a
+    'ufun_modified' notification).
+
+    Remarks:
+        - Ufuns defined through arbitrary callables may depend on the state of their owner and are evaluated live.
+    """
+    if isinstance(ufun, ConstUFun):
+        return True
+    if isinstance(ufun, MappingUtilityFunction):
+        return not callable(ufun.mapping)
+    if isinstance(ufun, LinearUtilityAggregationFunction):
+        values = ufun.issue_utilities.values() if isinstance(ufun.issue_utilities, dict) else ufun.issue_utilities
+        return all(isinstance(_, UtilityFunction) and _static_ufun(_) for _ in values)
+    if isinstance(ufun, (ComplexWeightedUtilityFunction, ComplexNonlinearUtilityFunction)):
+        return all(_static_ufun(_) for _ in ufun.ufuns)
+    return False
+
+
+def _first_greater(a: np.ndarray, starts: np.ndarray, ends: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Vectorized binary search returning, for every segment ``[starts[i], ends[i])`` of `a` (ascending within each
+    segment), the first index at which ``a > x[i]`` (or ``ends[i]`` if there is none)
+
+    Examples:
+        >>> a = np.array([1.0, 2.0, 3.0, 0.0, 5.0])
+        >>> _first_greater(a, np.array([0, 0, 3, 3]), np.array([3, 3, 5, 3]), np.array([1.5, 3.0, -1.0, 0.0])).tolist()
+        [1, 3, 3, 3]
+    """
+    lo, hi = starts.copy(), ends.copy()
+    active = lo < hi
+    while active.any():
+        mid = (lo + hi) // 2
+        right = active & (a[np.where(active, mid, 0)] <= x)
+        lo = np.where(right, mid + 1, lo)
+        hi = np.where(active & ~right, mid, hi)
+        active = lo < hi
+    return lo
+
+
+class SAOBatchRunner:
+    """Runs many `SAOMechanism` s in lockstep. Every call to `step` runs a single round of every running negotiation.
+
+    Args:
+        mechanisms: The mechanisms to run (more can be added later using `add`)
+        fast_path: If False, all negotiations are stepped one by one through `Mechanism.step`
+
+    Remarks:
+        - After its first round, a negotiation in which all negotiators are built-in negotiators with vectorizable
+          strategies (`AspirationNegotiator`, `ToughNegotiator`, `OnlyBestNegotiator`, `SimpleTitForTatNegotiator`,
+          `LimitedOutcomesNegotiator` and `LimitedOutcomesAcceptor` that are not subclassed or controlled) over a
+          finite set of outcomes is moved to a fast path that keeps its state (current offer, offerer, number of
+          acceptances, step) in arrays and advances all such negotiations together with numpy operations.
+        - Negotiations that keep a history (see the `history_policy` of `Mechanism`) and negotiators with callbacks
+          called every round (`on_round_start`, `on_round_end`) overridden (even on the instance) are never moved
+          to the fast path.
+        - Any other negotiation is stepped as usual (in random order) by calling its `step` method. A negotiation that
+          cannot be moved to the fast path is remembered and never compiled again (unless it left the fast path).
+        - The fast path evaluates the utility function of every negotiator once for all outcomes when the negotiation
+          joins it and assumes that utility functions do not change and negotiators do not join/leave afterwards.
+        - Random choices on both paths are drawn from the `random` module so seeding it makes runs repeatable.
+        - The state of the `SAOMechanism` is updated (and `on_negotiation_end` is called) when the negotiation ends.
+          Call `sync` to update the state of negotiations still running in the fast path.
+
+    Examples:
+        >>> from negmas import Issue, MappingUtilityFunction
+        >>> mechanisms = []
+        >>> for _ in range(3):
+        ...     m = SAOMechanism(issues=[Issue(10, 'price')], n_steps=20, history_policy='none')
+        ...     _ = m.add(AspirationNegotiator(), ufun=MappingUtilityFunction(lambda x: x['price'] / 9.0))
+        ...     _ = m.add(AspirationNegotiator(), ufun=MappingUtilityFunction(lambda x: 1.0 - x['price'] / 9.0))
+        ...     mechanisms.append(m)
+        >>> runner = SAOBatchRunner(mechanisms)
+        >>> runner.run()
+        >>> [m.agreement for m in mechanisms]
+        [{'price': 5}, {'price': 5}, {'price': 5}]
+    """
+
+    def __init__(self, mechanisms: Iterable['SAOMechanism'] = (), fast_path: bool = True):
+        self.fast_path = fast_path
+        self._slow: List['SAOMechanism'] = []
+        self._uncompiled: Set[str] = set()
+        self._reset()
+        for mechanism in mechanisms:
+            self.add(mechanism)
+
+    def add(self, mechanism: 'SAOMechanism') -> None:
+        """Adds a negotiation to the runner"""
+        self._slow.append(mechanism)
+
+    @property
+    def mechanisms(self) -> List['SAOMechanism']:
+        """All negotiations that are still being run"""
+        rows = np.flatnonzero(~self._rows['done'])
+        return self._slow + [self._fast[_] for _ in rows]
+
+    def __len__(self):
+        return len(self._slow) + int((~self._rows['done']).sum())
+
+    def run(self, n_steps: Optional[int] = None) -> None:
+        """Runs all negotiations until they end (or for the given number of rounds)"""
+        current = 0
+        while len(self) > 0 and (n_steps is None or current < n_steps):
+            self.step()
+            current += 1
+
+    def step(self) -> List['SAOMechanism']:
+        """Runs one round of every running negotiation
+
+        Returns:
+            The negotiations that ended during this round
+        """
+        ended, still_slow, fast = [], [], []
+        random.shuffle(self._slow)
+        for mechanism in self._slow:
+            mechanism.step()
+            if not mechanism.running:
+                self._uncompiled.discard(mechanism.id)
+                ended.append(mechanism)
+                continue
+            compiled = None
+            if self.fast_path and mechanism.id not in self._uncompiled:
+                compiled = self._compile(mechanism)
+            if compiled is None:
+                self._uncompiled.add(mechanism.id)
+                still_slow.append(mechanism)
+            else:
+                fast.append((mechanism, compiled))
+        self._slow = still_slow
+        ended += self._step_fast()
+        if fast:
+            self._activate(fast)
+        return ended
+
+    # -------------------------
+    # compiling the fast path
+    # -------------------------
+
+    def _compile(self, mechanism: 'SAOMechanism') -> Optional[Tuple[List['Outcome'], Dict[str, Any]
+        , Dict[str, List[Any]], Dict[str, List[np.ndarray]]]]:
+        """Converts a running negotiation to the array form used by the fast path (None if that is not possible)"""
+        if type(mechanism) is not SAOMechanism or mechanism.info.outcomes is None \
+            or not isinstance(mechanism._history, NoHistory):
+            return None
+        negotiators = mechanism.negotiators
+        n = len(negotiators)
+        if n < 2:
+            return None
+        outcomes = list(mechanism.info.outcomes)
+
+        def index_of(outcome) -> Optional[int]:
+            if outcome is None:
+                return -1
+            try:
+                i = mechanism.outcome_index(outcome)
+            except (KeyError, ValueError, TypeError):
+                return None
+            if i is None or not isinstance(outcomes[i], type(outcome)):
+                return None
+            return i
+
+        offer = index_of(mechanism._current_offer)
+        if offer is None:
+            return None
+        offerer = -1
+        if mechanism._current_offerer is not None:
+            offerer = [i for i, _ in enumerate(negotiators) if _ is mechanism._current_offerer]
+            if len(offerer) != 1:
+                return None
+            offerer = offerer[0]
+        can_propose = [_.capabilities.get('propose', False) for _ in negotiators]
+        prop_pos, prop_cur = [], []
+        for p in range(n):
+            # the search for a proposer done by `SAOMechanism.step_` after negotiator p responds
+            current, started_at, q = (p + 1) % n, (p + 1) % n, p
+            while not can_propose[q]:
+                q = current
+                current = (current + 1) % n
+                if current == started_at:
+                    return None
+            prop_pos.append(q)
+            prop_cur.append(current)
+        rows = dict(n=n, cur=mechanism._current_negotiator, offer=offer, offerer=offerer
+                    , nacc=mechanism._n_accepting, step=mechanism._step
+                    , n_steps=mechanism.info.n_steps if mechanism.info.n_steps is not None else float('inf')
+                    , time_limit=mechanism.info.time_limit if mechanism.info.time_limit is not None else float('inf')
+                    , start=mechanism._start_time, refusal_ends=mechanism.end_negotiation_on_refusal_to_propose
+                    , agreement=-1, broken=False, timedout=False, done=False)
+        slots = {k: [] for k in _SLOT_TYPES.keys()}
+        flat = {k: [] for k in _FLAT_TYPES.keys()}
+        sizes = {k: 0 for k in _FLAT_TYPES.keys()}
+
+        def add_flat(name, values):
+            start = sizes[name]
+            flat[name].append(np.asarray(values, dtype=_FLAT_TYPES[name]))
+            sizes[name] += len(values)
+            return start, sizes[name]
+
+        has_time = mechanism.info.n_steps is not None or mechanism.info.time_limit is not None
+        positions = {id(_): i for i, _ in enumerate(outcomes)}
+        for position, negotiator in enumerate(negotiators):
+            slot = self._compile_negotiator(negotiator, outcomes, positions, index_of, has_time)
+            if slot is None:
+                return None
+            slot, utils, prob, ordered, wheel = slot
+            slot['uoff'], _ = add_flat('utils', utils)
+            add_flat('prob', prob)
+            slot['sstart'], slot['send'] = add_flat('neg_sorted', -utils[ordered] if ordered is not None else [])
+            add_flat('sorted_order', ordered if ordered is not None else [])
+            wheel_outcomes, wheel_values = wheel if wheel is not None else ([], [])
+            slot['wstart'], slot['wend'] = add_flat('wheel', wheel_values)
+            add_flat('wheel_outcomes', wheel_outcomes)
+            slot['prop_pos'], slot['prop_cur'] = prop_pos[position], prop_cur[position]
+            last_prop = index_of(negotiator.my_last_proposal)
+            slot['last_prop'] = -1 if last_prop is None else last_prop
+            slot['last_u'] = negotiator.my_last_proposal_utility if negotiator.my_last_proposal_utility is not None \
+                else float('nan')
+            for k in _SLOT_TYPES.keys():
+                slots[k].append(slot.get(k, 0))
+        return outcomes, rows, slots, flat
+
+    def _compile_negotiator(self, negotiator: 'SAONegotiator', outcomes: List['Outcome'], positions: Dict[int, int]
+                            , index_of, has_time):
+        """Returns the fast-path representation of a negotiator (None if it cannot be used in the fast path)"""
+        kind = _BATCH_KINDS.get(type(negotiator), None)
+        if kind is None or negotiator._parent is not None or hasattr(negotiator, 'opponent_model') \
+            or negotiator._ending_negotiation:
+            return None
+        if any(_ in negotiator.__dict__ or getattr(type(negotiator), _) is not getattr(Negotiator, _)
+               for _ in _ROUND_CALLBACKS):
+            return None
+        ufun = negotiator.utility_function
+        if not isinstance(ufun, UtilityFunction) or isinstance(ufun, (ExpDiscountedUFun, LinDiscountedUFun)):
+            return None
+        rv = negotiator.reserved_value
+        if rv is None:
+            return None
+        prob = np.zeros(len(outcomes))
+        utils, ordered, wheel = None, None, None
+        live = not _static_ufun(ufun)
+        if live and kind in (_TOUGH, _ONLY_BEST) and negotiator.dynamic_ufun:
+            # these negotiators would recompute what they offer and accept whenever their ufun changes
+            return None
+        slot = dict(kind=kind, rv=rv, rational=negotiator.rational_proposal, none_u=float('nan'), best=-1
+                    , p0=-1, p1=-1, live=live)
+        if kind in (_ASPIRATION, _TIT_FOR_TAT):
+            # both keep the outcomes sorted by utility (descending) and must not see unknown utilities
+            if negotiator.randomize_offer or negotiator.ordered_outcomes is None \
+                or len(negotiator.ordered_outcomes) != len(outcomes) \
+                or any(u is None for u, _ in negotiator.ordered_outcomes):
+                return None
+            # the utilities were already evaluated by the negotiator for the same outcome objects
+            try:
+                ordered = np.fromiter((positions[id(o)] for _, o in negotiator.ordered_outcomes), dtype=np.int64
+                                      , count=len(outcomes))
+            except KeyError:
+                # or for equal outcomes (outcome spaces create new outcomes every time they are iterated)
+                ordered = [index_of(o) for _, o in negotiator.ordered_outcomes]
+                if any(_ is None or _ < 0 for _ in ordered):
+                    return None
+                ordered = np.asarray(ordered, dtype=np.int64)
+            utils = np.empty(len(outcomes))
+            utils[ordered] = [u for u, _ in negotiator.ordered_outcomes]
+        else:
+            utils = ufun.eval_all(outcomes)
+        if kind == _ASPIRATION:
+            if not has_time:
+                return None
+            slot.update(max_asp=negotiator.max_aspiration, e=negotiator.e
+                        , pmin=rv if negotiator.above_reserved and rv is not None else 0.0)
+        elif kind == _TIT_FOR_TAT:
+            if negotiator.proposed_utility is not None:
+                return None
+            none_u = negotiator.ufun(None)
+            if none_u is None:
+                return None
+            # `propose_` gives the best outcome before receiving any offers and a fixed concession afterwards
+            if isinstance(negotiator.initial_concession, str) and negotiator.initial_concession == 'min':
+                asp = None
+                for u, o in negotiator.ordered_outcomes:
+                    if asp is not None and u < asp:
+                        break
+                    asp = u
+            else:
+                asp = negotiator.ordered_outcomes[0][0] * (1 - negotiator.initial_concession)
+            after = negotiator._outcome_at_utility(asp=asp, n=1) if asp is not None else None
+            p0 = index_of(negotiator.ordered_outcomes[0][1])
+            p1 = p0 if asp is None else (index_of(after[0]) if after is not None else None)
+            if p0 is None or p1 is None:
+                return None
+            slot.update(none_u=float(none_u), p0=p0, p1=p1, nrec=len(negotiator.received_utilities))
+        elif kind == _TOUGH:
+            best = index_of(negotiator.best_outcome)
+            if best is None or best < 0:
+                return None
+            slot['best'] = best
+        elif kind == _ONLY_BEST:
+            if negotiator.best_first:
+                return None
+            acceptable = [index_of(_) for _ in negotiator.acceptable_outcomes]
+            if any(_ is None or _ < 0 for _ in acceptable) or len(negotiator.wheel) != len(acceptable):
+                return None
+            prob[acceptable] = 1.0
+            values = np.asarray(negotiator.wheel, dtype=float) if negotiator.probabilisit_offering \
+                else np.full(len(acceptable), -np.inf)
+            wheel = (acceptable, values)
+        else:
+            probabilities = negotiator.acceptance_probabilities
+            if negotiator.acceptable_outcomes is None or isinstance(probabilities, float) \
+                or len(probabilities) < len(negotiator.acceptable_outcomes):
+                return None
+            issues = negotiator.mechanism_info.issues
+            # `respond_` uses the probability of the first acceptable outcome equal to the offer
+            for o, p in reversed(list(zip(negotiator.acceptable_outcomes, probabilities))):
+                i = index_of(o)
+                if i is not None and i >= 0:
+                    prob[i] = p if outcome_is_valid(o, issues) else 0.0
+            slot.update(p_none=negotiator.p_no_response, p_end=negotiator.p_ending)
+            if negotiator.capabilities.get('propose', False):
+                if negotiator.offerable_outcomes is None:
+                    return None
+                offerable = [index_of(_) for _ in negotiator.offerable_outcomes]
+                if any(_ is None or _ < 0 for _ in offerable):
+                    return None
+                wheel = (offerable, np.full(len(offerable), -np.inf))
+        return slot, utils, prob, ordered, wheel
+
+    def _activate(self, compiled: List[Tuple['SAOMechanism', Tuple[Any, ...]]]) -> None:
+        """Moves compiled negotiations (see `_compile`) to the fast path"""
+        if len(self._fast) > 0 and self._rows['done'].all():
+            # no negotiation is running in the fast path: start again instead of growing the arrays forever
+            self._reset()
+        n_slots = len(self._slots['kind'])
+        sizes = {k: len(v) for k, v in self._flat.items()}
+        rows, slots, flat = {k: [] for k in _ROW_TYPES}, {k: [self._slots[k]] for k in _SLOT_TYPES}, \
+                            {k: [self._flat[k]] for k in _FLAT_TYPES}
+        for mechanism, (outcomes, mrows, mslots, mflat) in compiled:
+            mrows['base'] = n_slots
+            n_slots += len(mslots['kind'])
+            for k, v in mslots.items():
+                v = np.asarray(v, dtype=_SLOT_TYPES[k])
+                if k in _SLOT_OFFSETS:
+                    v = v + sizes[_SLOT_OFFSETS[k]]
+                slots[k].append(v)
+            for k, v in mflat.items():
+                flat[k] += v
+                sizes[k] += sum(len(_) for _ in v)
+            for k, v in mrows.items():
+                rows[k].append(v)
+            # negotiations leave the fast path as soon as a ufun is modified or a negotiator is asked to end
+            for negotiator in mechanism.negotiators:
+                negotiator._on_leaving_fast_path = functools.partial(self._leave_fast_path, len(self._fast))
+            self._fast.append(mechanism)
+            self._fast_outcomes.append(outcomes)
+            self._negotiators += [(_, outcomes) for _ in mechanism.negotiators]
+        self._slots = {k: np.concatenate(v) for k, v in slots.items()}
+        self._flat = {k: np.concatenate(v) for k, v in flat.items()}
+        self._rows = {k: np.concatenate((self._rows[k], np.asarray(rows[k], dtype=_ROW_TYPES[k])))
+                      for k in _ROW_TYPES}
+
+    # -------------------------
+    # running the fast path
+    # -------------------------
+
+    def _step_fast(self) -> List['SAOMechanism']:
+        """Runs a round of all negotiations in the fast path and returns the ones that ended"""
+        r = self._rows
+        active = np.flatnonzero(~r['done'])
+        if len(active) == 0:
+            return []
+        now = time.monotonic()
+        elapsed = now - r['start'][active]
+        # timeouts are detected at the beginning of the round exactly as in `Mechanism.step`
+        timedout = (r['n_steps'][active] - r['step'][active] <= 0) | (r['time_limit'][active] - elapsed <= 0)
+        r['timedout'][active[timedout]] = True
+        r['agreement'][active[timedout]] = -1
+        finished = [active[timedout]]
+        active, elapsed = active[~timedout], elapsed[~timedout]
+        if len(active):
+            relative_step = np.where(np.isinf(r['n_steps'][active]), -1.0
+                                     , (r['step'][active] + 1) / r['n_steps'][active])
+            relative_time = np.where(np.isinf(r['time_limit'][active]), -1.0, elapsed / r['time_limit'][active])
+            finished.append(self._round(active, np.maximum(relative_step, relative_time)))
+        ended = np.concatenate(finished)
+        r['done'][ended] = True
+        return [self._sync(_) for _ in ended]
+
+    def _round(self, rows: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """Runs one round of `SAOMechanism.step_` for the given rows and returns the rows that ended"""
+        r, s = self._rows, self._slots
+        n, position = r['n'][rows], r['cur'][rows]
+        slot = r['base'][rows] + position
+        r['cur'][rows] = (position + 1) % n
+        offer, offerer = r['offer'][rows], r['offerer'][rows]
+        response = np.full(len(rows), _NO_RESPONSE)
+        responding = (offer >= 0) & (position != offerer)
+        if responding.any():
+            response[responding] = self._respond(slot[responding], offer[responding], t[responding])
+        ending = response == _END
+        r['offerer'][rows[ending]] = position[ending]
+        r['offer'][rows[ending]] = -1
+        accepting = response == _ACCEPT
+        r['nacc'][rows[accepting]] += 1
+        agreed = accepting & (r['nacc'][rows] == n)
+        r['agreement'][rows[agreed]] = offer[agreed]
+        proposing = ~(ending | accepting)
+        broken = ending
+        if proposing.any():
+            prows, pslot = rows[proposing], slot[proposing]
+            proposer = r['base'][prows] + s['prop_pos'][pslot]
+            r['cur'][prows] = s['prop_cur'][pslot]
+            proposal = self._propose(proposer, t[proposing])
+            refused = proposal < 0
+            broken = broken.copy()
+            broken[np.flatnonzero(proposing)[refused]] = r['refusal_ends'][prows[refused]]
+            offered = prows[~refused]
+            r['offer'][offered] = proposal[~refused]
+            r['offerer'][offered] = s['prop_pos'][pslot[~refused]]
+            r['nacc'][offered] = 1
+        r['broken'][rows[broken]] = True
+        r['step'][rows] += 1
+        return rows[agreed | broken]
+
+    def _aspiration(self, slots: np.ndarray, t: np.ndarray) -> np.ndarray:
+        s = self._slots
+        e, pmin = s['e'][slots], s['pmin'][slots]
+        with np.errstate(invalid='ignore'):
+            return np.where(e < 1e-7, 0.0, pmin + (s['max_asp'][slots] - pmin) * (1.0 - np.power(t, e)))
+
+    def _utilities(self, slots: np.ndarray, outcomes: np.ndarray) -> np.ndarray:
+        """The utilities of the given outcomes (-1 for None) for the negotiators at the given slots"""
+        s = self._slots
+        u = np.where(outcomes >= 0, self._flat['utils'][s['uoff'][slots] + np.maximum(outcomes, 0)]
+                     , s['none_u'][slots])
+        for j in np.flatnonzero(s['live'][slots]):
+            negotiator, options = self._negotiators[slots[j]]
+            v = negotiator.ufun(options[outcomes[j]] if outcomes[j] >= 0 else None)
+            u[j] = float(v) if v is not None else float('nan')
+        return u
+
+    def _respond(self, slots: np.ndarray, offer: np.ndarray, t: np.ndarray) -> np.ndarray:
+        s, f = self._slots, self._flat
+        kind = s['kind'][slots]
+        u = self._utilities(slots, offer)
+        response = np.full(len(slots), _REJECT)
+        k = kind == _ASPIRATION
+        if k.any():
+            asp, rv, uk = self._aspiration(slots[k], t[k]), s['rv'][slots[k]], u[k]
+            response[k] = np.where((uk >= asp) & (uk >= rv), _ACCEPT, np.where(asp < rv, _END, _REJECT))
+        k = kind == _TOUGH
+        response[k] = np.where(offer[k] == s['best'][slots[k]], _ACCEPT, _REJECT)
+        k = kind == _ONLY_BEST
+        response[k] = np.where(f['prob'][s['uoff'][slots[k]] + offer[k]] > 0, _ACCEPT, _REJECT)
+        k = kind == _LIMITED
+        if k.any():
+            draw, accept = _random(k.sum()), _random(k.sum())
+            prob = f['prob'][s['uoff'][slots[k]] + offer[k]]
+            response[k] = np.where(draw < s['p_none'][slots[k]], _NO_RESPONSE
+                                   , np.where(draw < s['p_end'][slots[k]], _END
+                                              , np.where(accept < prob, _ACCEPT, _REJECT)))
+        k = kind == _TIT_FOR_TAT
+        if k.any():
+            # `respond_` compares the offer with what the negotiator would have proposed
+            mine = self._propose(slots[k], t[k])
+            mine_u = self._utilities(slots[k], mine)
+            s['nrec'][slots[k]] += 1
+            s['recv_u'][slots[k]] = u[k]
+            response[k] = np.where(u[k] >= mine_u, _ACCEPT, _REJECT)
+        return response
+
+    def _propose(self, slots: np.ndarray, t: np.ndarray) -> np.ndarray:
+        s, f = self._slots, self._flat
+        kind = s['kind'][slots]
+        proposal = np.full(len(slots), -1)
+        k = kind == _ASPIRATION
+        if k.any():
+            ks = slots[k]
+            asp, rv = self._aspiration(ks, t[k]), s['rv'][ks]
+            start, end = s['sstart'][ks], s['send'][ks]
+            # the first outcome with a utility below the aspiration level (none if the aspiration is nan)
+            i = np.where(np.isnan(asp), end, _first_greater(f['neg_sorted'], start, end, -asp))
+            found = i < end
+            below_rv = found & (-f['neg_sorted'][np.minimum(i, end - 1)] < rv)
+            chosen = np.where(~found, end - 1, np.where(i == start, start, i - 1))
+            proposal[k] = np.where((asp < rv) | below_rv, -1, f['sorted_order'][chosen])
+        k = kind == _TOUGH
+        proposal[k] = s['best'][slots[k]]
+        k = (kind == _ONLY_BEST) | (kind == _LIMITED)
+        if k.any():
+            ks = slots[k]
+            start, end = s['wstart'][ks], s['wend'][ks]
+            i = _first_greater(f['wheel'], start, end, _random(len(ks)))
+            uniform = start + np.floor(_random(len(ks)) * (end - start)).astype(np.int64)
+            i = np.where(i < end, i, uniform)
+            proposal[k] = np.where(end > start, f['wheel_outcomes'][np.minimum(i, len(f['wheel_outcomes']) - 1)], -1)
+        k = kind == _TIT_FOR_TAT
+        proposal[k] = np.where(s['nrec'][slots[k]] == 0, s['p0'][slots[k]], s['p1'][slots[k]])
+        # `SAONegotiator.propose` never proposes outcomes below the reserved value
+        u = self._utilities(slots, proposal)
+        with np.errstate(invalid='ignore'):
+            proposal[(proposal >= 0) & s['rational'][slots] & (u < s['rv'][slots])] = -1
+        known = (proposal >= 0) & ~np.isnan(u) & s['rational'][slots]
+        s['last_prop'][slots[known]] = proposal[known]
+        s['last_u'][slots[known]] = u[known]
+        return proposal
+
+    def release(self) -> None:
+        """Moves all negotiations out of the fast path, writing their current state back to their mechanisms.
+
+        Remarks:
+            - Call this before stepping negotiations of this runner directly (e.g. after `run` with `n_steps`).
+        """
+        for row in np.flatnonzero(~self._rows['done']):
+            self._leave_fast_path(row)
+        self._reset()
+
+    def sync(self) -> None:
+        """Writes the current state of all negotiations in the fast path to their mechanisms (they stay there)"""
+        for row in np.flatnonzero(~self._rows['done']):
+            self._write_back(row)
+
+    def _reset(self) -> None:
+        """Empties the fast path"""
+        self._rows: Dict[str, np.ndarray] = {k: np.zeros(0, dtype=t) for k, t in _ROW_TYPES.items()}
+        self._slots: Dict[str, np.ndarray] = {k: np.zeros(0, dtype=t) for k, t in _SLOT_TYPES.items()}
+        self._flat: Dict[str, np.ndarray] = {k: np.zeros(0, dtype=t) for k, t in _FLAT_TYPES.items()}
+        self._fast: List['SAOMechanism'] = []
+        self._fast_outcomes: List[List['Outcome']] = []
+        self._negotiators: List['SAONegotiator'] = []
+
+    def _leave_fast_path(self, row: int) -> None:
+        """Called when a negotiation in the fast path can no longer be run there (e.g. a ufun was modified).
+
+        The negotiation is moved back to the slow path which steps it through `SAOMechanism.step`
+        """
+        if self._rows['done'][row]:
+            return
+        self._rows['done'][row] = True
+        self._slow.append(self._sync(row, ended=False))
+
+    def _write_back(self, row: int) -> None:
+        """Copies the state of a negotiation in the fast path back to its mechanism"""
+        r, s = self._rows, self._slots
+        mechanism, outcomes = self._fast[row], self._fast_outcomes[row]
+        negotiators = mechanism.negotiators
+        base = r['base'][row]
+        for i, negotiator in enumerate(negotiators):
+            if s['last_prop'][base + i] >= 0:
+                negotiator.my_last_proposal = outcomes[s['last_prop'][base + i]]
+                negotiator.my_last_proposal_utility = float(s['last_u'][base + i])
+            if s['kind'][base + i] == _TIT_FOR_TAT:
+                # the negotiator only keeps the first two received utilities
+                while len(negotiator.received_utilities) < min(2, s['nrec'][base + i]):
+                    negotiator.received_utilities.append(float(s['recv_u'][base + i]))
+        mechanism._step = int(r['step'][row])
+        mechanism._current_negotiator = int(r['cur'][row])
+        mechanism._current_offer = outcomes[r['offer'][row]] if r['offer'][row] >= 0 else None
+        mechanism._current_offerer = negotiators[r['offerer'][row]] if r['offerer'][row] >= 0 else None
+        mechanism._n_accepting = int(r['nacc'][row])
+
+    def _sync(self, row: int, ended: bool = True) -> 'SAOMechanism':
+        """Copies the state of a negotiation leaving the fast path back to its mechanism"""
+        r = self._rows
+        self._write_back(row)
+        mechanism, outcomes = self._fast[row], self._fast_outcomes[row]
+        for negotiator in mechanism.negotiators:
+            negotiator._on_leaving_fast_path = None
+        self._fast[row], self._fast_outcomes[row] = None, None
+        if not ended:
+            return mechanism
+        mechanism._agreement = outcomes[r['agreement'][row]] if r['agreement'][row] >= 0 else None
+        mechanism._broken, mechanism._timedout = bool(r['broken'][row]), bool(r['timedout'][row])
+        mechanism._running = False
+        mechanism._history.append(mechanism.state)
+        mechanism.on_negotiation_end()
+        return mechanism
+
+
+_BATCH_KINDS = {AspirationNegotiator: _ASPIRATION, ToughNegotiator: _TOUGH, OnlyBestNegotiator: _ONLY_BEST
+    , LimitedOutcomesNegotiator: _LIMITED, LimitedOutcomesAcceptor: _LIMITED
+    , SimpleTitForTatNegotiator: _TIT_FOR_TAT}
+"""The built-in negotiators supported by the fast path of `SAOBatchRunner`"""
+
+
 SAOMechanismProxy = SAOMechanism
 """A proxy to a `SAOMechanism` object"""
 
@@ -77,6 +77,8 @@ def cli():
               help='Default location to save logs (A folder will be created under it)')
 @click.option('--verbose', default=0, help='verbosity level (from 0 == silent to 1 == world progress)')
 @click.option('--configs-only/--run', default=False, help='configs_only')
+@click.option('--resume/--restart', default=False, help='Resume an interrupted tournament with the same name and log '
+                                                        'location (only world runs with no stored scores are run)')
 @click.option('--reveal-names/--hidden-names', default=False, help='Reveal agent names (should be used only for '
                                                                    'debugging)')
 @click.option('--ip', default='127.0.0.1', help='The IP address for a dask scheduler to run the distributed tournament.'
@@ -84,7 +86,7 @@ def cli():
 @click.option('--port', default=8786, help='The IP port number a dask scheduler to run the distributed tournament.'
                                            ' Effective only if --distributed')
 def tournament(name, steps, parallel, distributed, ttype, timeout, log, competitors, verbose, configs_only,
-               reveal_names, ip, port, runs, max_runs, randomize):
+               reveal_names, ip, port, runs, max_runs, randomize, resume):
     if timeout <= 0:
         timeout = None
     if name == 'random':
@@ -101,7 +103,7 @@ def tournament(name, steps, parallel, distributed, ttype, timeout, log, competit
                              , world_progress_callback=print_world_progress if verbose > 1 and not distributed else None
                              , name=name, verbose=verbose > 0, n_runs_per_config=runs, max_n_runs=max_runs
                              , world_generator=anac2019_world, score_calculator=balance_calculator
-                             , configs_only=configs_only, randomize=randomize
+                             , configs_only=configs_only, randomize=randomize, resume=resume
                              , n_steps=steps)
     else:
         print('Only anac2019 tournament type is supported')
@@ -235,8 +237,9 @@ def scml(steps, levels, neg_speedup, negotiator, agents, horizon, min_consumptio
         data = data.loc[:, ['seller_type', 'buyer_type', 'seller_name', 'buyer_name', 'delivery_time', 'unit_price'
                                , 'quantity', 'product_name', 'n_neg_steps', 'signed_at', 'concluded_at', 'cfp']]
         print_and_log(tabulate(data, headers='keys', tablefmt='psql'))
-        n_executed = sum(world.stats['n_contracts_executed'])
-        n_negs = sum(world.stats["n_negotiations"])
+        stats = world.stats
+        n_executed = sum(stats['n_contracts_executed'])
+        n_negs = sum(stats["n_negotiations"])
         n_contracts = len(world.saved_contracts)
         winners = [f'{_.name} gaining {world.a2f[_.id].balance / world.a2f[_.id].initial_balance - 1.0:0.0%}'
                    for _ in world.winners]
@@ -258,6 +261,44 @@ def scml(steps, levels, neg_speedup, negotiator, agents, horizon, min_consumptio
         print(f'FAILED at step {world.current_step} of {world.n_steps}\n')
 
 
+@cli.command(help='Load (or convert) all genius domains under a folder and catalogue them')
+@click.argument('path', type=click.Path(exists=True, file_okay=False))
+@click.option('--convert-to', '-c', default=None, help='If given, domains are converted into this folder (keeping the '
+                                                       'folder structure) before being catalogued')
+@click.option('--catalogue', default=None, help='A json file to save the catalogue to')
+@click.option('--cache', default=None, help='A folder to cache the parsed domains in')
+@click.option('--workers', '-w', default=0, help='Number of processes to use (0 for the number of processors)')
+@click.option('--parallel/--serial', default=True, help='Load/convert domains in parallel')
+@click.option('--force-single-issue/--keep-issues', default=False, help='Combine all issues into a single issue')
+@click.option('--keep-issue-names/--no-issue-names', default=True, help='Keep issue names')
+@click.option('--keep-value-names/--no-value-names', default=True, help='Keep value names')
+@click.option('--normalize/--no-normalize', default=True, help='Normalize utility functions')
+@click.option('--max-outcomes', default=1000000, help='Maximum number of outcomes for a single-issue domain')
+@click.option('--discretization', default=0, help='Number of values to discretize real issues into (0 for no '
+                                                  'discretization)')
+def domains(path, convert_to, catalogue, cache, workers, parallel, force_single_issue, keep_issue_names
+            , keep_value_names, normalize, max_outcomes, discretization):
+    kwargs = dict(force_single_issue=force_single_issue, keep_issue_names=keep_issue_names
+                  , keep_value_names=keep_value_names, normalize_utilities=normalize, max_n_outcomes=max_outcomes
+                  , n_discretization=discretization if discretization > 0 else None)
+    workers = workers if workers > 0 else None
+    start = perf_counter()
+    if convert_to is not None:
+        results = negmas.convert_genius_domains(path, convert_to, parallel=parallel, max_workers=workers, **kwargs)
+    else:
+        results = negmas.load_genius_domains(path, parallel=parallel, max_workers=workers, cache=cache, **kwargs)
+    elapsed = perf_counter() - start
+    print(tabulate([(_.name, _.n_issues, _.n_outcomes, ', '.join(sorted(set(_.ufun_types)))
+                     , f'{_.time:0.3f}s', 'FAILED' if _.failed else 'OK') for _ in results]
+                   , headers=['Domain', 'Issues', 'Outcomes', 'UFuns', 'Time', 'Status'], tablefmt='psql'))
+    for failure in results.failures:
+        print(f'{failure.name} FAILED:\n{failure.error}')
+    print(f'{len(results) - len(results.failures)} of {len(results)} domains succeeded in {humanize_time(elapsed)}')
+    if catalogue is not None:
+        results.save(catalogue)
+        print(f'Catalogue saved to {catalogue}')
+
+
 @cli.command(help='Start the bridge to genius (to use GeniusNegotiator)')
 @click.option('--path', '-p', default=external_path, help='Path to genius-8.0.4.jar with embedded NegLoader')
 @click.option('--port', '-r', default=0, help='Port to run the NegLoader on. Pass 0 for the default value')
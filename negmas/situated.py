@@ -25,6 +25,8 @@ Simulation steps:
     #. update custom stats (call `_post_step_stats`)
 
 """
+import heapq
+import importlib.util
 import json
 import os
 import random
@@ -33,13 +35,14 @@ import time
 import uuid
 from abc import ABC, abstractmethod
 from collections import defaultdict, namedtuple
+from collections.abc import Mapping
 from enum import Enum
 from pathlib import Path
 from typing import Dict
-from typing import Optional, List, Any, Tuple, Callable, Union, Iterable, Set, Iterator, Collection
+from typing import Optional, List, Any, Tuple, Callable, Union, Iterable, Set, Iterator, Collection, Hashable
+from urllib.parse import quote, unquote
 
 import numpy as np
-import pandas as pd
 import yaml
 from dataclasses import dataclass, field
 
@@ -50,6 +53,7 @@ from negmas.helpers import ConfigReader, LoggerMixin, instantiate, get_class, un
 from negmas.mechanisms import MechanismProxy, Mechanism
 from negmas.negotiators import NegotiatorProxy
 from negmas.outcomes import OutcomeType, Issue
+from negmas.sao import SAOBatchRunner
 
 __all__ = [
     'Action',  # An action that an `Agent` can execute in the `World`.
@@ -64,6 +68,13 @@ __all__ = [
     'AgentWorldInterface',  # the interface though which an agent can interact with the world
     'NegotiationInfo',
     'RenegotiationRequest',
+    'StatsRecorder',
+    'StatsView',
+    'StatsWriter',
+    'CSVStatsWriter',
+    'ColumnarStatsWriter',
+    'StatsReader',
+    'default_stats_format',
     'save_stats',
 ]
 
@@ -203,17 +214,223 @@ class Entity(NamedObject):
         return snake_case(self.__class__.__name__)
 
 
+def _record_attribute(value: Any, attribute: str) -> Any:
+    if isinstance(value, dict):
+        return value.get(attribute, None)
+    return getattr(value, attribute, None)
+
+
+class _HashIndex:
+    """Indexes the records of a bulletin board section by the (hashable) value of an attribute.
+
+    Args:
+        attribute: The attribute of the records to index
+        query_keys: Query keys answered by this index mapping each to either 'value' (the query gives a single
+                    value of the attribute) or 'values' (the query gives a collection of acceptable values)
+    """
+
+    def __init__(self, attribute: str, query_keys: Optional[Dict[str, str]] = None):
+        self.attribute = attribute
+        self.query_keys = query_keys if query_keys is not None else {attribute: 'value'}
+        self._keys: Dict[Any, Set[str]] = defaultdict(set)
+        self._unindexed: Set[str] = set()
+
+    def add(self, key: str, value: Any) -> None:
+        v = _record_attribute(value, self.attribute)
+        try:
+            self._keys[v].add(key)
+        except TypeError:
+            self._unindexed.add(key)
+
+    def remove(self, key: str, value: Any) -> None:
+        v = _record_attribute(value, self.attribute)
+        try:
+            keys = self._keys.get(v, None)
+        except TypeError:
+            self._unindexed.discard(key)
+            return
+        if keys is not None:
+            keys.discard(key)
+            if len(keys) == 0:
+                del self._keys[v]
+
+    def candidates(self, query_key: str, query_value: Any) -> Optional[Set[str]]:
+        """Returns a superset of the keys of records that may satisfy the query (None if the index cannot help)"""
+        try:
+            if self.query_keys[query_key] == 'value':
+                return self._keys.get(query_value, set()) | self._unindexed
+            return set().union(*(self._keys.get(_, ()) for _ in query_value)) | self._unindexed
+        except TypeError:
+            return None
+
+
+class _IntervalNode:
+    """A node of the treap used by `_RangeIndex` (ordered by (low, key) and keeping the maximum high of its subtree)"""
+
+    __slots__ = ('order', 'key', 'low', 'high', 'max_high', 'priority', 'left', 'right')
+
+    def __init__(self, key: str, low: float, high: float, priority: float):
+        self.order = (low, key)
+        self.key, self.low, self.high, self.max_high, self.priority = key, low, high, high, priority
+        self.left: Optional['_IntervalNode'] = None
+        self.right: Optional['_IntervalNode'] = None
+
+    def update(self) -> '_IntervalNode':
+        m = self.high
+        if self.left is not None and self.left.max_high > m:
+            m = self.left.max_high
+        if self.right is not None and self.right.max_high > m:
+            m = self.right.max_high
+        self.max_high = m
+        return self
+
+
+def _interval_split(node: Optional[_IntervalNode], order: Tuple[float, str]
+                    ) -> Tuple[Optional[_IntervalNode], Optional[_IntervalNode]]:
+    """Splits a treap into the nodes before the given order and the rest"""
+    if node is None:
+        return None, None
+    if node.order < order:
+        node.right, rest = _interval_split(node.right, order)
+        return node.update(), rest
+    before, node.left = _interval_split(node.left, order)
+    return before, node.update()
+
+
+def _interval_merge(first: Optional[_IntervalNode], second: Optional[_IntervalNode]) -> Optional[_IntervalNode]:
+    """Merges two treaps given that all nodes of the first come before all nodes of the second"""
+    if first is None:
+        return second
+    if second is None:
+        return first
+    if first.priority > second.priority:
+        first.right = _interval_merge(first.right, second)
+        return first.update()
+    second.left = _interval_merge(first, second.left)
+    return second.update()
+
+
+def _interval_insert(node: Optional[_IntervalNode], new: _IntervalNode) -> _IntervalNode:
+    if node is None:
+        return new
+    if new.priority > node.priority:
+        new.left, new.right = _interval_split(node, new.order)
+        return new.update()
+    if new.order < node.order:
+        node.left = _interval_insert(node.left, new)
+    else:
+        node.right = _interval_insert(node.right, new)
+    return node.update()
+
+
+def _interval_remove(node: Optional[_IntervalNode], order: Tuple[float, str]) -> Optional[_IntervalNode]:
+    if node is None:
+        return None
+    if node.order == order:
+        return _interval_merge(node.left, node.right)
+    if order < node.order:
+        node.left = _interval_remove(node.left, order)
+    else:
+        node.right = _interval_remove(node.right, order)
+    return node.update()
+
+
+class _RangeIndex:
+    """Indexes the records of a bulletin board section by the range of a numeric attribute.
+
+    The attribute (and the query) can be a number, a (min, max) tuple or a list of numbers. Records are candidates for
+    a query if their range overlaps the range of the query.
+
+    Ranges are kept in an interval treap (ordered by their lower bound and keeping the largest upper bound of every
+    subtree) so adding and removing records takes logarithmic expected time and queries only visit subtrees that can
+    contain overlapping ranges.
+    """
+
+    def __init__(self, attribute: str, query_keys: Optional[Dict[str, str]] = None):
+        self.attribute = attribute
+        self.query_keys = query_keys if query_keys is not None else {attribute: 'range'}
+        self._root: Optional[_IntervalNode] = None
+        self._bounds: Dict[str, Tuple[float, float]] = {}
+        self._unindexed: Set[str] = set()
+        # a private generator so that indexing does not change the random state of the simulation
+        self._random = random.Random(0)
+
+    @staticmethod
+    def bounds(v: Any) -> Optional[Tuple[float, float]]:
+        try:
+            if isinstance(v, tuple):
+                low, high = v[0], v[1]
+            elif isinstance(v, Iterable) and not isinstance(v, str):
+                low, high = min(v), max(v)
+            else:
+                low = high = v
+            return low + 0, high + 0
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    def add(self, key: str, value: Any) -> None:
+        b = self.bounds(_record_attribute(value, self.attribute))
+        if b is None:
+            self._unindexed.add(key)
+            return
+        self._bounds[key] = b
+        self._root = _interval_insert(self._root, _IntervalNode(key, b[0], b[1], self._random.random()))
+
+    def remove(self, key: str, value: Any) -> None:
+        b = self._bounds.pop(key, None)
+        if b is None:
+            self._unindexed.discard(key)
+            return
+        self._root = _interval_remove(self._root, (b[0], key))
+
+    def candidates(self, query_key: str, query_value: Any) -> Optional[Set[str]]:
+        """Returns a superset of the keys of records that may satisfy the query (None if the index cannot help)"""
+        b = self.bounds(query_value)
+        if b is None:
+            return None
+        low, high = b
+        found = set(self._unindexed)
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_high < low:
+                continue
+            stack.append(node.left)
+            if node.low <= high:
+                if node.high >= low:
+                    found.add(node.key)
+                stack.append(node.right)
+        return found
+
+
 class BulletinBoard(Entity, EventSource, ConfigReader):
     """The bulletin-board which carries all public information. It consists of sections each with a dictionary of records.
 
+    Sections can have secondary indexes (see `add_index`) which are used to answer dict queries without scanning all
+    the records of the section.
+
+    `new_record` events are keyed by section name (or by section and an attribute of the record, see `route_events`)
+    so listeners can subscribe to some sections only by passing `keys` to `register_listener`.
+
     """
 
     def __getstate__(self):
-        return self.name, self._data
+        return self.name, self._data, self._index_definitions, self._expiry_attributes, self._event_routes
 
     def __setstate__(self, state):
-        name, self._data = state
+        name, self._data, index_definitions, expiry_attributes, event_routes = state
         super().__init__(name=name)
+        self._event_routes = event_routes
+        self.set_event_key('new_record', self._record_event_key)
+        self._indexes, self._order, self._index_definitions, self._n_recorded = {}, {}, [], 0
+        self._expiry_attributes, self._expiry = {}, {}
+        for section, sec in self._data.items():
+            self._order[section] = dict(zip(sec.keys(), range(self._n_recorded, self._n_recorded + len(sec))))
+            self._n_recorded += len(sec)
+        for definition in index_definitions:
+            self.add_index(*definition)
+        for section, attribute in expiry_attributes.items():
+            self.set_expiry(section, attribute)
 
     def __init__(self, name: str = None):
         """
@@ -224,6 +441,14 @@ class BulletinBoard(Entity, EventSource, ConfigReader):
         """
         super().__init__(name=name)
         self._data: Dict[str, Dict[str, Any]] = {}
+        self._indexes: Dict[str, List[Union[_HashIndex, _RangeIndex]]] = {}
+        self._order: Dict[str, Dict[str, int]] = {}
+        self._n_recorded = 0
+        self._index_definitions: List[Tuple[str, str, str, Optional[Dict[str, str]]]] = []
+        self._expiry_attributes: Dict[str, str] = {}
+        self._expiry: Dict[str, List[Tuple[Any, int, str]]] = {}
+        self._event_routes: Dict[str, str] = {}
+        self.set_event_key('new_record', self._record_event_key)
 
     def add_section(self, name: str) -> None:
         """
@@ -236,6 +461,133 @@ class BulletinBoard(Entity, EventSource, ConfigReader):
 
         """
         self._data[name] = {}
+        self._order[name] = {}
+        if name in self._expiry:
+            self._expiry[name] = []
+        if name in self._indexes:
+            self._indexes[name] = [type(_)(_.attribute, _.query_keys) for _ in self._indexes[name]]
+
+    def add_index(self, section: str, attribute: str, kind: str = 'hash'
+                  , query_keys: Optional[Dict[str, str]] = None) -> None:
+        """
+        Adds a secondary index on an attribute of the records of a section.
+
+        Args:
+            section: Section name
+            attribute: The attribute (or dict key) of the records to index
+            kind: 'hash' to index the exact values of the attribute or 'range' to index its range (for numbers, lists
+                  of numbers and (min, max) tuples)
+            query_keys: The query keys that are answered by the index. For hash indexes, every query key is mapped to
+                        'value' if the query specifies a single value or 'values' if it specifies a collection of
+                        values. By default the index answers queries on the attribute itself.
+
+        Remarks:
+
+            - Indexes only select candidate records. Every candidate is still checked using `satisfies` so adding an
+              index never changes query results as long as records satisfying a query have attribute values
+              matching it as described above.
+
+        """
+        index = (_HashIndex if kind == 'hash' else _RangeIndex)(attribute, query_keys)
+        for key, value in self._data.get(section, {}).items():
+            index.add(key, value)
+        self._indexes.setdefault(section, []).append(index)
+        self._index_definitions.append((section, attribute, kind, query_keys))
+
+    def set_expiry(self, section: str, attribute: str) -> None:
+        """
+        Keeps the records of a section in a queue ordered by the given attribute (or dict key) giving the time after
+        which they expire. See `remove_expired`.
+
+        Args:
+            section: Section name
+            attribute: The attribute of records giving their expiry time
+
+        """
+        self._expiry_attributes[section] = attribute
+        self._expiry[section] = queue = []
+        for key, value in self._data.get(section, {}).items():
+            queue.append((_record_attribute(value, attribute), self._order[section][key], key))
+        heapq.heapify(queue)
+
+    def remove_expired(self, section: str, time: Any) -> int:
+        """
+        Removes all records of a section that expire at or before the given time.
+
+        Only expired records are visited (the section must have an expiry attribute set using `set_expiry`).
+
+        Args:
+            section: Section name
+            time: Records with an expiry time less than or equal to this time are removed
+
+        Returns:
+            The number of records removed
+        """
+        queue, attribute, sec = self._expiry[section], self._expiry_attributes[section], self._data[section]
+        n_removed = 0
+        while queue and queue[0][0] <= time:
+            _, _, key = heapq.heappop(queue)
+            # the record may have been removed or replaced (with another expiry time) since it was queued
+            value = sec.get(key, None)
+            if value is None or _record_attribute(value, attribute) > time:
+                continue
+            n_removed += int(self.remove(section, key=key))
+        return n_removed
+
+    def route_events(self, section: str, attribute: str) -> None:
+        """
+        Keys the `new_record` events of a section by the tuple (section, value of the given attribute of the record)
+        instead of the section name alone.
+
+        Args:
+            section: Section name
+            attribute: The attribute (or dict key) of the records used for routing
+
+        Examples:
+
+            >>> board = BulletinBoard()
+            >>> board.add_section('cfps')
+            >>> board.route_events('cfps', 'product')
+            >>> class Sink(EventSink):
+            ...     def on_event(self, event, sender):
+            ...         print(event.data['key'])
+            >>> board.register_listener('new_record', Sink(), keys=[('cfps', 1)])
+            >>> board.record('cfps', {'product': 0}, key='a')
+            >>> board.record('cfps', {'product': 1}, key='b')
+            b
+
+        """
+        self._event_routes[section] = attribute
+
+    def _record_event_key(self, event: Event) -> Hashable:
+        section = event.data['section']
+        attribute = self._event_routes.get(section, None)
+        if attribute is None:
+            return section
+        return section, _record_attribute(event.data['value'], attribute)
+
+    def n_records(self, section: str) -> int:
+        """Returns the number of records in a section"""
+        sec = self._data.get(section, None)
+        return len(sec) if sec else 0
+
+    def _candidates(self, section: str, query: Any) -> Optional[Set[str]]:
+        """Finds the candidate keys for a query using the indexes of the section (None if no index can be used)"""
+        indexes = self._indexes.get(section, None)
+        if not indexes or not isinstance(query, dict):
+            return None
+        candidates = None
+        for k, v in query.items():
+            for index in indexes:
+                if k not in index.query_keys:
+                    continue
+                keys = index.candidates(k, v)
+                if keys is None:
+                    continue
+                candidates = keys if candidates is None else candidates & keys
+                if len(candidates) == 0:
+                    return candidates
+        return candidates
 
     def query(self, section: Optional[Union[str, List[str]]], query: Any, query_keys=False) -> Optional[Dict[str, Any]]:
         """
@@ -279,6 +631,12 @@ class BulletinBoard(Entity, EventSource, ConfigReader):
             return sec
         if query_keys:
             return {k: v for k, v in sec.items() if re.match(str(query), k) is not None}
+        candidates = self._candidates(section, query)
+        if candidates is not None:
+            # keep the order of records in the section
+            order = self._order[section]
+            return {k: sec[k] for k in sorted(candidates, key=order.__getitem__)
+                    if BulletinBoard.satisfies(sec[k], query)}
         return {k: v for k, v in sec.items() if BulletinBoard.satisfies(v, query)}
 
     @classmethod
@@ -329,9 +687,29 @@ class BulletinBoard(Entity, EventSource, ConfigReader):
                 skey = str(uuid.uuid4())
         else:
             skey = key
-        self._data[section][skey] = value
+        sec = self._data[section]
+        indexes = self._indexes.get(section, ())
+        if skey in sec:
+            for index in indexes:
+                index.remove(skey, sec[skey])
+        else:
+            self._order[section][skey] = self._n_recorded
+            self._n_recorded += 1
+        sec[skey] = value
+        for index in indexes:
+            index.add(skey, value)
+        if section in self._expiry:
+            heapq.heappush(self._expiry[section], (_record_attribute(value, self._expiry_attributes[section])
+                                                   , self._order[section][skey], skey))
         self.announce(Event('new_record', data={'section': section, 'key': skey, 'value': value}))
 
+    def _delete(self, section: str, key: str) -> None:
+        sec = self._data[section]
+        for index in self._indexes.get(section, ()):
+            index.remove(key, sec[key])
+        del sec[key]
+        del self._order[section][key]
+
     def remove(self, section: Optional[Union[List[str], str]], *
                , query: Optional[Any] = None, key: str = None, query_keys: bool = False
                , value: Any = None) -> bool:
@@ -366,7 +744,7 @@ class BulletinBoard(Entity, EventSource, ConfigReader):
         if key is not None:
             try:
                 self.announce(Event('will_remove_record', data={'section': sec, 'key': key, 'value': sec[key]}))
-                del sec[key]
+                self._delete(section, key)
                 return True
             except KeyError:
                 return False
@@ -377,12 +755,13 @@ class BulletinBoard(Entity, EventSource, ConfigReader):
         if query_keys:
             keys = [k for k, v in sec.items() if re.match(str(query), k) is not None]
         else:
-            keys = [k for k, v in sec.items() if v.satisfies(query)]
+            candidates = self._candidates(section, query)
+            keys = [k for k, v in sec.items() if (candidates is None or k in candidates) and v.satisfies(query)]
         if len(keys) == 0:
             return False
         for k in keys:
             self.announce(Event('will_remove_record', data={'section': sec, 'key': k, 'value': sec[k]}))
-            del sec[k]
+            self._delete(section, k)
         return True
 
 
@@ -390,6 +769,185 @@ BulletinBoardProxy = BulletinBoard
 """A proxy to the bulletin board"""
 
 
+class StatsRecorder(Mapping):
+    """Records the statistics of a world run in preallocated numpy columns.
+
+    Every key gets a column with one row per `append` that is allocated for the expected number of steps up front (and
+    grows if needed). Metrics recorded for each member of a fixed group of names (e.g. agents) are kept in a single
+    2-D column per key (see `add_group`) instead of a column per name.
+
+    The recorder is a mapping from keys (with group columns expanded into `key_name` keys) to views of the recorded
+    part of every column.
+
+    Args:
+        n_steps: The expected number of rows per column
+
+    Examples:
+
+        >>> stats = StatsRecorder(n_steps=3)
+        >>> stats.append('n_contracts', 2)
+        >>> stats.append('n_contracts', 5)
+        >>> stats.add_group('balance', names=['a', 'b'])
+        >>> stats.append_group('balance', [10.0, 20.0])
+        >>> stats.append_group('balance', [11.0, 19.0])
+        >>> list(stats.keys())
+        ['n_contracts', 'balance_a', 'balance_b']
+        >>> stats.to_dict()['balance_b']
+        [20.0, 19.0]
+        >>> stats.as_dataframe().loc[1, 'balance_a']
+        11.0
+
+    """
+
+    def __init__(self, n_steps: Optional[int] = None):
+        self._capacity = max(1, n_steps if n_steps is not None else 1)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._lengths: Dict[str, int] = {}
+        self._groups: Dict[str, List[str]] = {}
+        self._keys: Dict[str, Tuple[str, Optional[int]]] = {}
+
+    _dtypes = (np.bool_, np.int64, np.float64, object)
+    """Column types from the narrowest to the widest"""
+
+    @classmethod
+    def _dtype_of(cls, value: Any):
+        if isinstance(value, (bool, np.bool_)):
+            return np.bool_
+        if isinstance(value, (int, np.integer)):
+            return np.int64
+        if isinstance(value, (float, np.floating)):
+            return np.float64
+        return object
+
+    def _column_for(self, key: str, value: Any, length: int) -> np.ndarray:
+        """Returns the column of the key after making sure it can take the given value at the given row"""
+        column = self._columns[key]
+        dtype = self._dtype_of(value)
+        if column.dtype != dtype and self._dtypes.index(dtype) > self._dtypes.index(column.dtype.type):
+            # bools are promoted to ints, ints to floats and anything to objects
+            column = column.astype(dtype)
+        if length >= len(column):
+            column = np.concatenate((column, np.zeros_like(column)))
+        self._columns[key] = column
+        return column
+
+    def append(self, key: str, value: Any) -> None:
+        """Appends a value to the column of the given key creating it if needed"""
+        if key not in self._columns:
+            self._columns[key] = np.zeros(self._capacity, dtype=self._dtype_of(value))
+            self._lengths[key] = 0
+            self._keys[key] = (key, None)
+        length = self._lengths[key]
+        self._column_for(key, value, length)[length] = value
+        self._lengths[key] = length + 1
+
+    def add_group(self, key: str, names: Iterable[str], dtype=np.float64) -> None:
+        """
+        Adds a 2-D column for a metric recorded for each of the given names
+
+        Args:
+            key: The metric. Values of name `x` are available under the key `{key}_{x}`
+            names: The names (e.g. agent names) for which the metric is recorded
+            dtype: The type of the metric
+
+        """
+        names = list(names)
+        self._columns[key] = np.zeros((self._capacity, len(names)), dtype=dtype)
+        self._lengths[key] = 0
+        self._groups[key] = names
+        for i, name in enumerate(names):
+            self._keys[f'{key}_{name}'] = (key, i)
+
+    def append_group(self, key: str, values: Union[np.ndarray, Iterable[Any]]) -> None:
+        """Appends a row to the 2-D column of the given group key (see `add_group`) with one value per name"""
+        length = self._lengths[key]
+        column = self._columns[key]
+        if length >= len(column):
+            column = self._columns[key] = np.concatenate((column, np.zeros_like(column)))
+        column[length, :] = values
+        self._lengths[key] = length + 1
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        column, i = self._keys[key]
+        if i is None:
+            values = self._columns[column][:self._lengths[column]]
+        else:
+            values = self._columns[column][:self._lengths[column], i]
+        values.flags.writeable = False
+        return values
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        """Returns the recorded values as a dict of lists (with group columns expanded)"""
+        return {key: self[key].tolist() for key in self._keys}
+
+    def as_dataframe(self):
+        """
+        Returns a `pandas.DataFrame` with a row per step and a column per key (with group columns expanded).
+
+        Remarks:
+            - The data frame is a view on the recorded values (pandas permitting). Columns with less rows than the
+              longest one are padded with NaN and are copied.
+        """
+        import pandas as pd
+        n_rows = max(self._lengths.values()) if len(self._lengths) > 0 else 0
+        data = {}
+        for key in self._keys:
+            values = self[key]
+            if len(values) < n_rows:
+                values = np.concatenate((values.astype(float if values.dtype != object else object)
+                                         , np.full(n_rows - len(values), np.nan)))
+            data[key] = values
+        return pd.DataFrame(data, copy=False)
+
+
+class StatsView(Mapping):
+    """A read-only view of the statistics recorded by a `StatsRecorder` (see `World.stats`).
+
+    Every key maps to a read-only numpy array of its recorded values. Keys that were never recorded map to an empty
+    array (but are not contained in the view).
+
+    Args:
+        recorder: The recorder viewed
+    """
+
+    def __init__(self, recorder: StatsRecorder):
+        self._recorder = recorder
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        if key not in self._recorder:
+            return _EMPTY_STATS
+        return self._recorder[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._recorder
+
+    def get(self, key, default=None):
+        return self._recorder.get(key, default)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._recorder)
+
+    def __len__(self) -> int:
+        return len(self._recorder)
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        """Returns the recorded values as a dict of lists (see `StatsRecorder.to_dict`)"""
+        return self._recorder.to_dict()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.to_dict()!r})'
+
+
+_EMPTY_STATS = np.zeros(0)
+_EMPTY_STATS.flags.writeable = False
+
+
 def safe_min(a, b):
     """Returns min(a, b) assuming None is less than anything."""
     if a is None:
@@ -466,6 +1024,9 @@ class MechanismFactory:
         mechanism_params['issues'] = issues
         mechanism_params['annotation'] = annotation
         mechanism_params['name'] = '-'.join(_.id for _ in partners)
+        if self.world.batch_negotiations:
+            # negotiations that keep a history are never moved to the fast path of the `SAOBatchRunner`
+            mechanism_params.setdefault('history_policy', 'none')
         if mechanism_name is None:
             mechanism_name = 'negmas.sao.SAOMechanism'
         try:
@@ -755,6 +1316,7 @@ class World(EventSink, EventSource, ConfigReader, LoggerMixin, ABC):
                  , save_negotiations: bool = True
                  , save_resolved_breaches: bool = True
                  , save_unresolved_breaches: bool = True
+                 , batch_negotiations: bool = False
                  , name=None
                  ):
         """
@@ -766,6 +1328,8 @@ class World(EventSink, EventSource, ConfigReader, LoggerMixin, ABC):
             negotiation_speed: The number of negotiation steps per simulation step. None means infinite
             neg_n_steps: Maximum number of steps allowed for a negotiation.
             neg_time_limit: Real-time limit on each single negotiation
+            batch_negotiations: If true, running negotiations are stepped together using a `SAOBatchRunner` (and keep no
+                                history unless the `history_policy` is given in the mechanism parameters)
             name: Name of the simulator
         """
         LoggerMixin.__init__(self, file_name=log_file_name, screen_log=screen_log)
@@ -784,6 +1348,9 @@ class World(EventSink, EventSource, ConfigReader, LoggerMixin, ABC):
         self.save_unresolved_breaches = save_unresolved_breaches
         self.current_step = 0
         self.negotiation_speed = negotiation_speed
+        self.batch_negotiations = batch_negotiations
+        self._batch_runner = SAOBatchRunner() if batch_negotiations else None
+        self._batched: Set[str] = set()
         self.default_signing_delay = default_signing_delay
         self.time_limit = time_limit
         self.neg_n_steps = neg_n_steps
@@ -795,7 +1362,7 @@ class World(EventSink, EventSource, ConfigReader, LoggerMixin, ABC):
         self.awi_type = get_class(awi_type, scope=globals())
         self.name = name if name is not None else unique_name(base=self.__class__.__name__, add_time=True
                                                               , rand_digits=5)
-        self._stats: Dict[str, List[Any]] = defaultdict(list)
+        self._stats = StatsRecorder(n_steps=n_steps)
         self.__n_negotiations = 0
         self.__n_contracts_signed = 0
         self.__n_contracts_concluded = 0
@@ -891,8 +1458,19 @@ class World(EventSink, EventSource, ConfigReader, LoggerMixin, ABC):
         return list(self._saved_negotiations.values())
 
     @property
-    def stats(self) -> Dict[str, Any]:
-        return self._stats
+    def stats(self) -> StatsView:
+        """The statistics of the world as a read-only mapping from keys to numpy arrays with a value per step.
+
+        Remarks:
+            - Nothing is copied. Statistics that were never recorded are empty arrays.
+            - Use `stats.to_dict()` to get the statistics as a dict of lists and `stats_df` for a `pandas.DataFrame`.
+        """
+        return StatsView(self._stats)
+
+    @property
+    def stats_df(self):
+        """The statistics of the world as a `pandas.DataFrame` with a row per step (see `StatsRecorder.as_dataframe`)"""
+        return self._stats.as_dataframe()
 
     def step(self) -> bool:
         """A single simulation step"""
@@ -901,8 +1479,42 @@ class World(EventSink, EventSource, ConfigReader, LoggerMixin, ABC):
             return False
         self.loginfo(f'{len(self._negotiations)} Negotiations/{len(self._entities)} _entities')
 
+        def _end_negotiation(puuid: str, mechanism: Mechanism) -> None:
+            negotiation = self._negotiations.get(puuid, None)
+            if mechanism.agreement is None:
+                self._register_failed_negotiation(mechanism.info, negotiation)
+            else:
+                self._register_contract(mechanism.info, negotiation)
+            if negotiation:
+                del self._negotiations[mechanism.uuid]
+
+        def _run_negotiations_in_batch(n_steps: Optional[int] = None):
+            """ Runs all bending negotiations in lockstep using a `SAOBatchRunner` """
+            # the runner keeps negotiations that did not end (and what it failed to compile) between world steps
+            runner = self._batch_runner
+            self._batched.intersection_update(self._negotiations.keys())
+            current_step = 0
+            while True:
+                # negotiations may be registered while others are running
+                for puuid, negotiation in list(self._negotiations.items()):
+                    if negotiation is not None and puuid not in self._batched:
+                        self._batched.add(puuid)
+                        runner.add(negotiation.mechanism)
+                if len(runner) == 0:
+                    break
+                for mechanism in runner.step():
+                    if mechanism.agreement is not None or mechanism.state.broken:
+                        _end_negotiation(mechanism.uuid, mechanism)
+                current_step += 1
+                if n_steps is not None and current_step >= n_steps:
+                    break
+            runner.sync()
+
         def _run_negotiations(n_steps: Optional[int] = None):
             """ Runs all bending negotiations """
+            if self.batch_negotiations:
+                _run_negotiations_in_batch(n_steps)
+                return
             mechanisms = list((k, _.mechanism) for k, _ in self._negotiations.items() if _ is not None)
             current_step = 0
             while len(mechanisms) > 0:
@@ -911,13 +1523,7 @@ class World(EventSink, EventSource, ConfigReader, LoggerMixin, ABC):
                     result = mechanism.step()
                     agreement, is_broken = result.agreement, result.broken
                     if agreement is not None or is_broken:  # or not mechanism.running:
-                        negotiation = self._negotiations.get(puuid, None)
-                        if agreement is None:
-                            self._register_failed_negotiation(mechanism.info, negotiation)
-                        else:
-                            self._register_contract(mechanism.info, negotiation)
-                        if negotiation:
-                            del self._negotiations[mechanism.uuid]
+                        _end_negotiation(puuid, mechanism)
                 mechanisms = list((k, _.mechanism) for k, _ in self._negotiations.items() if _ is not None)
                 current_step += 1
                 if n_steps is not None and current_step >= n_steps:
@@ -931,7 +1537,7 @@ class World(EventSink, EventSource, ConfigReader, LoggerMixin, ABC):
         activity_level = 0
 
         self._pre_step_stats()
-        self._stats['n_registered_negotiations_before'].append(len(self._negotiations))
+        self._stats.append('n_registered_negotiations_before', len(self._negotiations))
 
         # sign contacts that are to be signed in this step
         # ------------------------------------------------
@@ -1012,16 +1618,16 @@ class World(EventSink, EventSource, ConfigReader, LoggerMixin, ABC):
         # update stats
         # ------------
         n_total_contracts = n_new_contract_executions + n_new_breaches
-        self._stats['n_contracts_executed'].append(n_new_contract_executions)
-        self._stats['n_contracts_cancelled'].append(n_cancelled)
-        self._stats['n_breaches'].append(n_new_breaches)
-        self._stats['breach_level'].append(n_new_breaches / n_total_contracts
-                                           if n_total_contracts > 0 else np.nan)
-        self._stats['n_contracts_signed'].append(self.__n_contracts_signed)
-        self._stats['n_contracts_concluded'].append(self.__n_contracts_concluded)
-        self._stats['n_negotiations'].append(self.__n_negotiations)
-        self._stats['n_registered_negotiations_after'].append(len(self._negotiations))
-        self._stats['activity_level'].append(activity_level)
+        self._stats.append('n_contracts_executed', n_new_contract_executions)
+        self._stats.append('n_contracts_cancelled', n_cancelled)
+        self._stats.append('n_breaches', n_new_breaches)
+        self._stats.append('breach_level', n_new_breaches / n_total_contracts
+                           if n_total_contracts > 0 else np.nan)
+        self._stats.append('n_contracts_signed', self.__n_contracts_signed)
+        self._stats.append('n_contracts_concluded', self.__n_contracts_concluded)
+        self._stats.append('n_negotiations', self.__n_negotiations)
+        self._stats.append('n_registered_negotiations_after', len(self._negotiations))
+        self._stats.append('activity_level', activity_level)
         self._post_step_stats()
         self.__n_negotiations = 0
         self.__n_contracts_signed = 0
@@ -1690,13 +2296,270 @@ class Agent(ActiveEntity, EventSink, ConfigReader, Notifier, ABC):
         """
 
 
-def save_stats(world: World, log_dir: str, params: Dict[str, Any] = None):
+class StatsWriter(ABC):
+    """Writes the statistics of a world run (see `save_stats`)"""
+
+    @abstractmethod
+    def write(self, world: World, log_dir: Path) -> None:
+        """Writes the statistics of the given world
+
+        Args:
+            world: The world (after it is run)
+            log_dir: The folder of the world run
+        """
+
+
+class CSVStatsWriter(StatsWriter):
+    """Writes the statistics of a world as a json file and a set of csv files in its log folder"""
+
+    contract_columns = ['seller_type', 'buyer_type', 'seller_name', 'buyer_name', 'delivery_time', 'unit_price'
+        , 'quantity', 'product_name', 'n_neg_steps', 'signed_at', 'concluded_at', 'cfp']
+    """The columns of the contracts saved in `signed_contracts.csv`, `cancelled_contracts.csv` and `all_contracts.csv`"""
+
+    def write(self, world: World, log_dir: Path) -> None:
+        import pandas as pd
+        with open(log_dir / 'stats.json', 'w') as f:
+            json.dump(world.stats.to_dict(), f, indent=4, sort_keys=True)
+
+        try:
+            world.stats_df.to_csv(str(log_dir / 'stats.csv'), index_label='index')
+        except:
+            pass
+        if len(world.saved_negotiations) > 0:
+            data = pd.DataFrame(world.saved_negotiations)
+            data.to_csv(str(log_dir / 'negotiations.csv'), index_label='index')
+        else:
+            with open(log_dir / 'negotiations.csv', 'w') as f:
+                f.write('')
+
+        if len(world.saved_breaches) > 0:
+            data = pd.DataFrame(world.saved_breaches)
+            data.to_csv(str(log_dir / 'breaches.csv'), index_label='index')
+        else:
+            with open(log_dir / 'breaches.csv', 'w') as f:
+                f.write('')
+
+        if len(world.signed_contracts) > 0:
+            data = pd.DataFrame(world.signed_contracts)
+            data = data.sort_values(['delivery_time'])
+            data = data.loc[:, self.contract_columns]
+            data.to_csv(str(log_dir / 'signed_contracts.csv'), index_label='index')
+        else:
+            with open(log_dir / 'signed_contracts.csv', 'w') as f:
+                f.write('')
+
+        if len(world.cancelled_contracts) > 0:
+            data = pd.DataFrame(world.cancelled_contracts)
+            data = data.sort_values(['delivery_time'])
+            data = data.loc[:, self.contract_columns]
+            data.to_csv(str(log_dir / 'cancelled_contracts.csv'), index_label='index')
+        else:
+            with open(log_dir / 'cancelled_contracts.csv', 'w') as f:
+                f.write('')
+
+        if len(world.saved_contracts) > 0:
+            data = pd.DataFrame(world.saved_contracts)
+            data = data.sort_values(['delivery_time'])
+            data.to_csv(str(log_dir / 'contracts_full_info.csv'), index_label='index')
+            data = data.loc[:, self.contract_columns]
+            data.to_csv(str(log_dir / 'all_contracts.csv'), index_label='index')
+        else:
+            with open(log_dir / 'contracts_full_info.csv', 'w') as f:
+                f.write('')
+            with open(log_dir / 'all_contracts.csv', 'w') as f:
+                f.write('')
+
+
+class ColumnarStatsWriter(StatsWriter):
+    """Writes the statistics of a world as compressed Parquet or Feather tables.
+
+    Every world run is saved as four tables: `stats` (a row per step), `negotiations`, `breaches` and `contracts`
+    (all saved contracts with a `signed` column, sorted by delivery time). Empty tables are not written. Values that
+    are not numbers, strings or booleans (e.g. lists of partners or CFPs) are saved as strings as in the csv files.
+
+    Args:
+        format: 'parquet' (requires pyarrow or fastparquet) or 'feather' (requires pyarrow)
+        compression: The compression codec. The default of the backend is used if not given
+        dataset: If given, the tables of all world runs are appended to a shared dataset in this folder with a file
+                 per world run in a sub-folder per table, a `world` column giving the world name and a `run` column
+                 giving a unique id of the world run (world runs can share a name). Otherwise, the tables are saved in
+                 the log folder of every world run
+
+    See Also:
+        `StatsReader`
+    """
+
+    tables = ('stats', 'negotiations', 'breaches', 'contracts')
+    """The tables written for every world run"""
+
+    def __init__(self, format: str = 'parquet', compression: Optional[str] = None
+                 , dataset: Optional[Union[str, os.PathLike]] = None):
+        if format not in ('parquet', 'feather'):
+            raise ValueError(f'Unknown stats format {format}')
+        self.format = format
+        self.compression = compression
+        self.dataset = Path(dataset) if dataset is not None else None
+
+    @classmethod
+    def _columnar(cls, data: 'pd.DataFrame') -> 'pd.DataFrame':
+        """Converts columns with values that cannot be saved in columnar formats to strings"""
+        for column in data.columns:
+            if data[column].dtype != object:
+                continue
+            if not all(_ is None or isinstance(_, (str, bool)) for _ in data[column].values):
+                data[column] = [str(_) if _ is not None else None for _ in data[column].values]
+        return data
+
+    def _save(self, data: 'pd.DataFrame', f_name: Path) -> None:
+        data = self._columnar(data.reset_index(drop=True))
+        kwargs = {'compression': self.compression} if self.compression is not None else {}
+        # the file is moved only after it is completely written so that partial files are never read
+        tmp_name = f_name.with_suffix('.tmp')
+        if self.format == 'parquet':
+            data.to_parquet(str(tmp_name), index=False, **kwargs)
+        else:
+            data.to_feather(str(tmp_name), **kwargs)
+        os.replace(str(tmp_name), str(f_name))
+
+    def write(self, world: World, log_dir: Path) -> None:
+        import pandas as pd
+        run_id = uuid.uuid4().hex
+        stats = world.stats_df
+        stats.insert(0, 'step', np.arange(len(stats)))
+        contracts = pd.DataFrame(world.saved_contracts)
+        if len(contracts) > 0:
+            contracts = contracts.sort_values(['delivery_time'], kind='stable')
+        tables = {'stats': stats, 'negotiations': pd.DataFrame(world.saved_negotiations)
+            , 'breaches': pd.DataFrame(world.saved_breaches), 'contracts': contracts}
+        for table, data in tables.items():
+            if len(data) == 0:
+                continue
+            if self.dataset is None:
+                self._save(data, log_dir / f'{table}.{self.format}')
+                continue
+            data.insert(0, 'world', world.name)
+            data.insert(1, 'run', run_id)
+            folder = self.dataset / table
+            folder.mkdir(parents=True, exist_ok=True)
+            self._save(data, folder / f'{quote(world.name, safe="")}@{run_id}.{self.format}')
+
+
+class StatsReader:
+    """Reads the statistics saved by `save_stats`.
+
+    The path can be the log folder of a world run (saved in any format) or a shared dataset (see
+    `ColumnarStatsWriter`). Only the requested columns of the requested world runs are read.
+
+    Args:
+        path: The log folder of a world run or the folder of a dataset
+
+    Examples:
+
+        >>> import tempfile
+        >>> from pathlib import Path
+        >>> import pandas as pd
+        >>> log_dir = Path(tempfile.mkdtemp())
+        >>> pd.DataFrame({'n_breaches': [0, 1], 'market_size': [1.0, 2.0]}).to_csv(str(log_dir / 'stats.csv')
+        ...                                                                        , index_label='index')
+        >>> reader = StatsReader(log_dir)
+        >>> reader.tables
+        ['stats']
+        >>> reader.read('stats', columns=['market_size'])['market_size'].tolist()
+        [1.0, 2.0]
+
+    """
+
+    csv_files = {'stats': 'stats.csv', 'negotiations': 'negotiations.csv', 'breaches': 'breaches.csv'
+        , 'contracts': 'contracts_full_info.csv'}
+    """The csv files saved by `CSVStatsWriter` for every table"""
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = Path(path)
+
+    def _files(self, table: str) -> List[Path]:
+        folder = self.path / table
+        if folder.is_dir():
+            return sorted(_ for _ in folder.iterdir() if _.suffix in ('.parquet', '.feather'))
+        for suffix in ('.parquet', '.feather'):
+            f_name = self.path / f'{table}{suffix}'
+            if f_name.exists():
+                return [f_name]
+        f_name = self.path / self.csv_files.get(table, f'{table}.csv')
+        if f_name.exists() and f_name.stat().st_size > 0:
+            return [f_name]
+        return []
+
+    @property
+    def tables(self) -> List[str]:
+        """The tables available"""
+        return [_ for _ in ColumnarStatsWriter.tables if len(self._files(_)) > 0]
+
+    @staticmethod
+    def _world_name(f_name: Path) -> str:
+        """The name of the world run saved in a dataset file (see `ColumnarStatsWriter`)"""
+        return unquote(f_name.stem.rsplit('@', 1)[0])
+
+    def worlds(self, table: str = 'stats') -> List[str]:
+        """The names of the world runs with data in the given table of a dataset (runs sharing a name appear once)"""
+        if not (self.path / table).is_dir():
+            return []
+        return list(dict.fromkeys(self._world_name(_) for _ in self._files(table)))
+
+    @classmethod
+    def _read_file(cls, f_name: Path, columns: Optional[List[str]]) -> 'pd.DataFrame':
+        import pandas as pd
+        if f_name.suffix == '.parquet':
+            return pd.read_parquet(str(f_name), columns=columns)
+        if f_name.suffix == '.feather':
+            return pd.read_feather(str(f_name), columns=columns)
+        return pd.read_csv(str(f_name), usecols=columns, index_col=None if columns is not None else 0)
+
+    def iter_worlds(self, table: str, columns: Optional[List[str]] = None
+                    , worlds: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, 'pd.DataFrame']]:
+        """
+        Reads a table one world run at a time
+
+        Args:
+            table: The table ('stats', 'negotiations', 'breaches' or 'contracts')
+            columns: The columns to read. All columns are read if not given
+            worlds: The world runs to read (for datasets). All world runs are read if not given
+
+        Returns:
+            An iterator over the world name and its data
+        """
+        worlds = set(worlds) if worlds is not None else None
+        for f_name in self._files(table):
+            name = self._world_name(f_name) if (self.path / table).is_dir() else self.path.name
+            if worlds is not None and name not in worlds:
+                continue
+            yield name, self._read_file(f_name, columns)
+
+    def read(self, table: str, columns: Optional[List[str]] = None
+             , worlds: Optional[Iterable[str]] = None) -> 'pd.DataFrame':
+        """Reads the given columns of a table for the given world runs (see `iter_worlds`) into a single data frame"""
+        import pandas as pd
+        data = [_ for __, _ in self.iter_worlds(table, columns=columns, worlds=worlds)]
+        if len(data) == 0:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(data, ignore_index=True) if len(data) > 1 else data[0]
+
+
+def default_stats_format() -> str:
+    """The format in which statistics are saved if none is given: 'parquet' if pyarrow is installed and 'csv' otherwise
+    """
+    return 'parquet' if importlib.util.find_spec('pyarrow') is not None else 'csv'
+
+
+def save_stats(world: World, log_dir: str, params: Dict[str, Any] = None
+               , writer: Optional[Union[str, StatsWriter]] = None):
     """
     Saves the statistics of a world run
     Args:
-        world:
-        log_dir:
-        params:
+        world: The world
+        log_dir: The folder in which to save the statistics
+        params: Parameters of the world run to be saved in `params.json`
+        writer: The `StatsWriter` to use or one of 'csv' (see `CSVStatsWriter`), 'parquet' or 'feather' (see
+                `ColumnarStatsWriter`). If not given, `default_stats_format` is used
 
     Returns:
 
@@ -1708,57 +2571,8 @@ def save_stats(world: World, log_dir: str, params: Dict[str, Any] = None):
         with open(log_dir / 'params.json', 'w') as f:
             json.dump(params, f, indent=4, sort_keys=True)
 
-    with open(log_dir / 'stats.json', 'w') as f:
-        json.dump(world.stats, f, indent=4, sort_keys=True)
-
-    try:
-        data = pd.DataFrame.from_dict(world.stats)
-        data.to_csv(str(log_dir / 'stats.csv'), index_label='index')
-    except:
-        pass
-    if len(world.saved_negotiations) > 0:
-        data = pd.DataFrame(world.saved_negotiations)
-        data.to_csv(str(log_dir / 'negotiations.csv'), index_label='index')
-    else:
-        with open(log_dir / 'negotiations.csv', 'w') as f:
-            f.write('')
-
-    if len(world.saved_breaches) > 0:
-        data = pd.DataFrame(world.saved_breaches)
-        data.to_csv(str(log_dir / 'breaches.csv'), index_label='index')
-    else:
-        with open(log_dir / 'breaches.csv', 'w') as f:
-            f.write('')
-
-    if len(world.signed_contracts) > 0:
-        data = pd.DataFrame(world.signed_contracts)
-        data = data.sort_values(['delivery_time'])
-        data = data.loc[:, ['seller_type', 'buyer_type', 'seller_name', 'buyer_name', 'delivery_time', 'unit_price'
-                               , 'quantity', 'product_name', 'n_neg_steps', 'signed_at', 'concluded_at', 'cfp']]
-        data.to_csv(str(log_dir / 'signed_contracts.csv'), index_label='index')
-    else:
-        with open(log_dir / 'signed_contracts.csv', 'w') as f:
-            f.write('')
-
-    if len(world.cancelled_contracts) > 0:
-        data = pd.DataFrame(world.cancelled_contracts)
-        data = data.sort_values(['delivery_time'])
-        data = data.loc[:, ['seller_type', 'buyer_type', 'seller_name', 'buyer_name', 'delivery_time', 'unit_price'
-                               , 'quantity', 'product_name', 'n_neg_steps', 'signed_at', 'concluded_at', 'cfp']]
-        data.to_csv(str(log_dir / 'cancelled_contracts.csv'), index_label='index')
-    else:
-        with open(log_dir / 'cancelled_contracts.csv', 'w') as f:
-            f.write('')
-
-    if len(world.saved_contracts) > 0:
-        data = pd.DataFrame(world.saved_contracts)
-        data = data.sort_values(['delivery_time'])
-        data.to_csv(str(log_dir / 'contracts_full_info.csv'), index_label='index')
-        data = data.loc[:, ['seller_type', 'buyer_type', 'seller_name', 'buyer_name', 'delivery_time', 'unit_price'
-                               , 'quantity', 'product_name', 'n_neg_steps', 'signed_at', 'concluded_at', 'cfp']]
-        data.to_csv(str(log_dir / 'all_contracts.csv'), index_label='index')
-    else:
-        with open(log_dir / 'contracts_full_info.csv', 'w') as f:
-            f.write('')
-        with open(log_dir / 'all_contracts.csv', 'w') as f:
-            f.write('')
+    if writer is None:
+        writer = default_stats_format()
+    if isinstance(writer, str):
+        writer = CSVStatsWriter() if writer == 'csv' else ColumnarStatsWriter(format=writer)
+    writer.write(world=world, log_dir=log_dir)
@@ -292,8 +292,8 @@ def do_simulator_run(simulator, profiles, t, at, profile_ind, override):
                   )
 def test_slow_factory_simulator_with_jobs(products, profiles, profile_ind, t, at_, override, simulator_type):
     simulator_type = SlowFactorySimulator if simulator_type == 'slow' else FastFactorySimulator
-    simulator = simulator_type(initial_wallet=initial_wallet, initial_storage=initial_storage, n_steps=n_steps
-                               , n_products=len(products), profiles=profiles, max_storage=max_storage)
+    simulator = FastFactorySimulator(initial_wallet=initial_wallet, initial_storage=initial_storage, n_steps=n_steps
+                                     , n_products=len(products), profiles=profiles, max_storage=max_storage)
     profile = profiles[profile_ind]
     length = profile.n_steps
     if at_ == 'before':
@@ -321,5 +321,100 @@ def test_slow_factory_simulator_with_jobs(products, profiles, profile_ind, t, at
     do_simulator_run(simulator, profiles, t, at, profile_ind, override)
 
 
+def test_fast_simulator_rolls_back_nested_bookmarks(products, profiles):
+    from negmas.apps.scml.simulators import temporary_transaction, transaction
+    simulator = FastFactorySimulator(initial_wallet=initial_wallet, initial_storage=initial_storage, n_steps=n_steps
+                                     , n_products=len(products), profiles=profiles, max_storage=max_storage)
+
+    def state():
+        return (simulator.wallet_to(n_steps - 1).copy(), simulator.loans_to(n_steps - 1).copy()
+                , simulator.storage_to(n_steps - 1).copy(), simulator.line_schedules_to(n_steps - 1).copy()
+                , simulator.total_storage_to(n_steps - 1).copy())
+
+    def assert_state(expected):
+        for a, b in zip(state(), expected):
+            assert np.array_equal(a, b)
+
+    simulator.buy(product=0, quantity=5, price=10, t=3)
+    before = state()
+    with temporary_transaction(simulator):
+        simulator.pay(20, t=5)
+        simulator.add_loan(7, t=2)
+        inner = state()
+        with temporary_transaction(simulator):
+            simulator.sell(product=1, quantity=3, price=9, t=4)
+            assert simulator.schedule(Job(profile=0, time=10, line=profiles[0].line, action='run', contract=None
+                                          , override=False))
+            simulator.transport_to(product=2, quantity=4, t=8)
+        assert_state(inner)
+        with transaction(simulator):
+            simulator.pay(3, t=1)
+    assert_state(before)
+    assert len(simulator._undo_log) == 0
+
+
+def test_free_slots_follow_schedules_and_rollbacks(products, profiles):
+    from negmas.apps.scml.simulators import FactorySimulator, temporary_transaction
+    rng = np.random.RandomState(0)
+    simulator = FastFactorySimulator(initial_wallet=initial_wallet, initial_storage=initial_storage, n_steps=n_steps
+                                     , n_products=len(products), profiles=profiles, max_storage=max_storage)
+
+    def schedule_some():
+        for _ in range(10):
+            profile = rng.randint(len(profiles))
+            simulator.schedule(Job(profile=profile, time=rng.randint(n_steps - 5), line=profiles[profile].line
+                                   , action='run', contract=None, override=False), override=False)
+
+    def assert_slots_match_schedules():
+        for _ in range(30):
+            line, length, start = rng.randint(n_lines), rng.randint(1, 8), rng.randint(n_steps)
+            end = rng.randint(start, n_steps + 5)
+            for strategy in ('earliest', 'latest', 'shortest', 'longest'):
+                assert simulator.free_slot(line, length, start, end, strategy) \
+                       == FactorySimulator.free_slot(simulator, line, length, start, end, strategy)
+
+    schedule_some()
+    with temporary_transaction(simulator):
+        schedule_some()
+        assert_slots_match_schedules()
+    assert_slots_match_schedules()
+    simulator.set_state(5, storage=simulator.storage_at(5), wallet=simulator.wallet_at(5)
+                        , loans=simulator.loans_at(5), line_schedules=np.ones(n_lines) * 7)
+    assert_slots_match_schedules()
+
+
+@mark.parametrize('seed', [0, 1, 2])
+def test_production_engine_matches_stepping_each_factory(profiles, seed):
+    from negmas.apps.scml.common import ProductionEngine
+    rng = np.random.RandomState(seed)
+
+    def make_factories():
+        return [Factory(id=f'f{i}', profiles=profiles, initial_storage=copy.deepcopy(initial_storage)
+                        , initial_wallet=initial_wallet * i, max_storage=max_storage if i < 2 else 500)
+                for i in range(3)]
+
+    stepped, engined = make_factories(), make_factories()
+    engine = ProductionEngine(engined)
+
+    for t in range(n_steps):
+        for _ in range(rng.randint(3)):
+            i, profile, action = rng.randint(3), rng.randint(len(profiles)), rng.choice(['run'] * 5 + ['pause', 'resume'
+                                                                                                        , 'stop'])
+            job = Job(profile=profile, time=t + rng.randint(10), line=profiles[profile].line, action=action
+                      , contract=None, override=True)
+            stepped[i].schedule(job=copy.copy(job), override=True)
+            engined[i].schedule(job=copy.copy(job), override=True)
+        for a, b, reports in zip(stepped, engined, engine.step()):
+            expected = [_ for _ in a.step() if not _.is_empty]
+            assert [(_.line, _.failed) for _ in reports] == [(_.line, _.failed) for _ in expected]
+            assert a.wallet == pytest.approx(b.wallet)
+            assert a.storage == b.storage
+    for a, b in zip(stepped, engined):
+        b.step()
+        a.step()
+        assert [(_.action, _.step, _.end, _.paused) for _ in a.commands] \
+               == [(_.action, _.step, _.end, _.paused) for _ in b.commands]
+
+
 if __name__ == '__main__':
     pytest.main(args=[__file__])
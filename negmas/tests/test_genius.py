@@ -296,5 +296,56 @@ class TestGeniusAgentSessions:
         # print(agent_name1, agent_name2, neg.run(timeout=1))
 
 
+class _NegLoader:
+    """Records the calls a GeniusBridge makes to NegLoader"""
+
+    def __init__(self):
+        self.calls = []
+
+    def receive_message(self, agent_uuid, from_id, action_type, bid):
+        self.calls.append(('receive_message', agent_uuid, from_id, action_type, bid))
+        return True
+
+    def choose_action(self, agent_uuid):
+        self.calls.append(('choose_action', agent_uuid))
+        return f'{agent_uuid}<<sy>>Accept<<sy>>'
+
+
+class _Gateway:
+    def __init__(self, entry_point):
+        self.entry_point = entry_point
+
+
+def test_genius_bridge_forwards_messages_and_counts_calls():
+    from negmas.genius import GeniusBridge
+    java = _NegLoader()
+    bridge = GeniusBridge(_Gateway(java))
+    bridge.receive_message('a1', 'a2', 'Offer', 'x<<s=s>>1')
+    assert bridge.choose_action('a1') == 'a1<<sy>>Accept<<sy>>'
+    assert bridge.n_calls == 2
+    assert java.calls == [('receive_message', 'a1', 'a2', 'Offer', 'x<<s=s>>1'), ('choose_action', 'a1')]
+
+
+def test_genius_outcome_codec_round_trips_domain_outcomes():
+    from negmas import enumerate_outcomes
+    from negmas.genius import GeniusOutcomeCodec
+    codec = GeniusOutcomeCodec.from_domain(dom)
+    assert GeniusOutcomeCodec.from_domain(dom) is codec
+    for outcome in enumerate_outcomes(codec.issues, keep_issue_names=False)[:1000]:
+        bid = codec.encode(outcome)
+        assert codec.decode(bid, keep_issue_names=False) == outcome
+        assert codec.decode(bid) == dict(zip(codec.issue_names, outcome))
+        assert codec.encode(dict(zip(codec.issue_names, outcome))) == bid
+
+
+def test_genius_outcome_codec_memory_is_bounded():
+    from negmas.genius import GeniusOutcomeCodec
+    from negmas.outcomes import Issue
+    codec = GeniusOutcomeCodec([Issue(100, name='x'), Issue(100, name='y')], max_cached=10)
+    for i in range(100):
+        assert codec.decode(codec.encode((i, 99 - i)), keep_issue_names=False) == (i, 99 - i)
+        assert len(codec._encoded) <= 10 and len(codec._decoded) <= 10
+
+
 if __name__ == '__main__':
     pytest.main(args=[__file__])
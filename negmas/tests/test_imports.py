@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ('pandas', 'scipy', 'inflect', 'matplotlib', 'colorlog', 'pkg_resources')
+IMPORT_TIME_BUDGET = 2.0
+"""Seconds allowed for importing negmas (it took ~6s when all optional dependencies were imported eagerly)"""
+
+
+def _run(code: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+                          , universal_newlines=True, check=True)
+
+
+def test_import_does_not_load_heavy_dependencies():
+    result = _run('import sys, negmas; print(",".join(_ for _ in %r if _ in sys.modules))' % (HEAVY_MODULES,))
+    assert result.stdout.strip() == ''
+
+
+def test_import_time_is_within_budget():
+    result = _run('import negmas', '-X', 'importtime')
+    # the last line of the report gives the cumulative time (in microseconds) of importing negmas itself
+    line = [_ for _ in result.stderr.splitlines() if _.rstrip().endswith('| negmas')][-1]
+    assert int(line.split('|')[1]) * 1e-6 < IMPORT_TIME_BUDGET
+
+
+def test_lazy_dependencies_are_still_usable():
+    from negmas.helpers import Distribution, ConfigReader
+    assert Distribution('uniform', loc=0.0, scale=1.0).mean() == 0.5
+    from negmas.helpers import _inflect_engine
+    assert _inflect_engine().singular_noun('agents') == 'agent'
@@ -69,3 +69,48 @@ def test_simple_run_with_aspiration_agents():
     assert mechanism is not None
     state = mechanism.run()
 
+
+@pytest.mark.parametrize('force_single_issue', [False, True])
+def test_cached_genius_domain_loads_match_parsing(tmpdir, force_single_issue):
+    from negmas import GeniusDomainCache
+    folder_name = pkg_resources.resource_filename('negmas', resource_name='tests/data/Laptop')
+    cache = GeniusDomainCache(str(tmpdir.mkdir('cache')))
+    mechanism, agent_info, issues = load_genius_domain_from_folder(folder_name
+                                                                    , force_single_issue=force_single_issue)
+    for _ in range(2):
+        cmechanism, cagent_info, cissues = load_genius_domain_from_folder(folder_name, cache=cache
+                                                                          , force_single_issue=force_single_issue)
+        assert len(cache) > 0
+        assert [str(_) for _ in cissues] == [str(_) for _ in issues]
+        assert cmechanism.outcomes == mechanism.outcomes
+        for info, cinfo in zip(agent_info, cagent_info):
+            assert type(cinfo['ufun']) == type(info['ufun'])
+            assert cinfo['discount_factor'] == info['discount_factor']
+            assert cinfo['ufun'].reserved_value == info['ufun'].reserved_value
+            for outcome in mechanism.outcomes:
+                assert cinfo['ufun'](outcome) == info['ufun'](outcome)
+
+
+def test_bulk_load_and_convert_genius_domains(tmpdir):
+    from negmas import load_genius_domains, convert_genius_domains, GeniusDomainCatalogue
+    src = pkg_resources.resource_filename('negmas', resource_name='tests/data/scenarios/anac')
+    catalogue = load_genius_domains(src, max_workers=2)
+    assert [_.name for _ in catalogue] == ['y2010/EnglandZimbabwe', 'y2010/ItexvsCypress', 'y2010/Travel']
+    assert len(catalogue.failures) == 0
+    for domain in catalogue:
+        _, agent_info, issues = load_genius_domain_from_folder(domain.folder)
+        assert domain.n_issues == len(issues)
+        assert domain.ufun_types == [_['ufun'].__class__.__name__ for _ in agent_info]
+        assert domain.time > 0
+    file_name = str(tmpdir / 'catalogue.json')
+    catalogue.save(file_name)
+    loaded = GeniusDomainCatalogue.load(file_name)
+    assert [_.n_outcomes for _ in loaded] == [576, 180, 188160]
+
+    dst = str(tmpdir.mkdir('converted'))
+    converted = convert_genius_domains(src, dst, parallel=False, force_single_issue=True, max_n_outcomes=1000)
+    assert converted['y2010/Travel'].failed
+    assert [_.name for _ in converted.select(lambda x: x.n_issues == 1)] == ['y2010/EnglandZimbabwe'
+                                                                             , 'y2010/ItexvsCypress']
+    assert converted['y2010/ItexvsCypress'].folder == os.path.join(dst, 'y2010', 'ItexvsCypress')
+    assert converted['y2010/ItexvsCypress'].n_outcomes == 180
@@ -95,5 +95,26 @@ def test_controller():
     # we are just asserting that the controller runs
 
 
+def test_aspiration_incremental_rerank_matches_full_update():
+    from negmas import MappingUtilityFunction
+    from negmas.events import Notification
+    outcomes = [(_,) for _ in range(30)]
+    rng = np.random.RandomState(0)
+    mapping = dict(zip(outcomes, rng.randint(0, 5, len(outcomes)) / 5.0))
+    a1, a2 = AspirationNegotiator(), AspirationNegotiator()
+    neg = SAOMechanism(outcomes=outcomes, n_steps=20)
+    neg.add(a1, ufun=MappingUtilityFunction(mapping))
+    neg.add(a2, ufun=MappingUtilityFunction(mapping))
+    neg.step()
+    for _ in range(10):
+        changed = [outcomes[_] for _ in rng.choice(len(outcomes), 4, replace=False)]
+        for o in changed:
+            mapping[o] = rng.randint(0, 5) / 5.0
+        a1.on_notification(Notification(type='ufun_modified', data=changed), notifier=neg.id)
+        a2.on_notification(Notification(type='ufun_modified', data=None), notifier=neg.id)
+        assert a1.ordered_outcomes == a2.ordered_outcomes
+        assert [u for u, _ in a1.ordered_outcomes] == sorted([mapping[o] for o in outcomes], reverse=True)
+
+
 if __name__ == '__main__':
     pytest.main(args=[__file__])
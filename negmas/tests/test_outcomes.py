@@ -84,5 +84,71 @@ def test_outcome_constraint():
 
     # r = OutcomeSpace(r1)
 
+
+def test_outcome_space_indexing():
+    from negmas import Issue, OutcomeSpace, enumerate_outcomes
+    issues = [Issue(['a', 'b', 'c'], 'type'), Issue(4, 'count'), Issue([0.5, 1.5], 'price')]
+    for keep_names in (True, False):
+        outcomes = enumerate_outcomes(issues, keep_issue_names=keep_names)
+        space = OutcomeSpace(issues, astype=dict if keep_names else tuple)
+        assert len(space) == len(outcomes) == 24
+        assert list(space) == outcomes
+        assert space[3:7] == outcomes[3:7]
+        for i, outcome in enumerate(outcomes):
+            assert space[i] == outcome
+            assert space.index(outcome) == i
+            assert outcome in space
+        assert space.codes.shape == (24, 3)
+        assert [[v[c] for v, c in zip(space.issue_values, code)] for code in space.codes.tolist()] == \
+               [list(o.values()) if keep_names else list(o) for o in outcomes]
+    assert {'type': 'd', 'count': 0, 'price': 0.5} not in space
+    with pytest.raises(IndexError):
+        _ = space[24]
+
+
+def test_mechanism_outcome_index_uses_outcome_space():
+    from negmas import Issue, SAOMechanism
+    issues = [Issue(['a', 'b', 'c'], 'type'), Issue(40, 'count')]
+    mechanism = SAOMechanism(issues=issues)
+    assert mechanism.outcome_space is not None
+    for i in (0, 7, 119):
+        assert mechanism.info.outcome_index(mechanism.outcomes[i]) == i
+
+
+def test_mechanism_outcomes_are_lazy_and_shared():
+    from negmas import Issue, SAOMechanism
+    issues = [Issue(100, 'quantity'), Issue(100, 'price'), Issue(50, 'time')]
+    m1 = SAOMechanism(issues=issues)
+    m2 = SAOMechanism(issues=[Issue(100, 'quantity'), Issue(100, 'price'), Issue(50, 'time')])
+    assert m1.outcomes is m2.outcomes
+    assert m1.outcomes._outcomes is None
+    assert len(m1.outcomes) == m1.n_outcomes == 500000
+    assert m1.outcomes[123456] == {'quantity': 24, 'price': 69, 'time': 6}
+    assert len(m1.outcomes[10:20]) == 10
+    assert len(m1.random_outcomes(5)) == 5
+    assert m1.outcomes._outcomes is None
+    assert SAOMechanism(issues=[Issue(100, 'quantity')]).outcomes is not m1.outcomes
+
+
+def test_shared_outcome_spaces_do_not_collide_or_share_outcomes():
+    from negmas import Issue, OutcomeSpace
+
+    class Value:
+        def __init__(self, value):
+            self.value = value
+
+        def __repr__(self):
+            return 'Value'
+
+    values = [Value(0), Value(1)]
+    first = OutcomeSpace.shared([Issue([0, 1], 'a')])
+    second = OutcomeSpace.shared([Issue(values, 'a')])
+    third = OutcomeSpace.shared([Issue(values[::-1], 'a')])
+    assert first is not second and second is not third and third[0] == {'a': values[1]}
+    outcomes = list(first)
+    outcomes[0]['a'] = 'changed'
+    assert first[0] == {'a': 0} and next(iter(first)) == {'a': 0}
+
+
 if __name__ == '__main__':
     pytest.main(args=[__file__])
@@ -1,5 +1,6 @@
+from dataclasses import dataclass
 from pprint import pprint
-from typing import Iterable
+from typing import Iterable, List
 
 import pytest
 import random
@@ -299,5 +300,200 @@ def test_same_utility_leads_to_agreement():
     assert state.step < 3
 
 
+def test_mechanism_state_snapshots_are_independent():
+    p = SAOMechanism(outcomes=10, n_steps=10, dynamic_entry=False)
+    p.add(AspirationNegotiator(name='a1'), ufun=MappingUtilityFunction(lambda x: x[0] + 1.0))
+    p.add(AspirationNegotiator(name='a2'), ufun=MappingUtilityFunction(lambda x: 10.0 - x[0]))
+    before = p.state
+    p.step()
+    after = p.state
+    assert isinstance(before, SAOState) and isinstance(after, SAOState)
+    assert not before.started and after.started
+    assert before.step == 0 and after.step == 1
+    assert after.current_offerer == p.negotiators[0].id
+    p.run()
+    assert [s.step for s in p.history] == list(range(1, len(p.history) + 1))
+    assert p.history[0] is not p.history[0]
+
+
+@pytest.mark.parametrize('history_policy', ['full', 'none', 1, 3])
+def test_mechanism_history_policies(history_policy):
+    p = SAOMechanism(issues=[Issue(10, 'price'), Issue(5, 'quantity')], n_steps=20
+                     , keep_issue_names=False, history_policy=history_policy)
+    for name, prices in (('a1', (0, 1)), ('a2', (8, 9))):
+        acceptable = [(price, 2) for price in prices]
+        p.add(LimitedOutcomesNegotiator(name=name, acceptable_outcomes=acceptable, outcomes=p.outcomes)
+              , ufun=MappingUtilityFunction(lambda x: 1.0))
+    states = [p.step()]
+    while p.running:
+        states.append(p.step())
+    assert len(states) > 3
+    expected = {'full': len(states), 'none': 0}.get(history_policy, history_policy)
+    assert len(p.history) == expected
+    assert [_.__dict__ for _ in p.history] == [_.__dict__ for _ in states[len(states) - expected:]]
+    assert len(p.history.to_dataframe()) == expected
+
+
+def test_columnar_history_matches_states():
+    # dict outcomes cannot be indexed cheaply so they are kept in the side table of the history
+    p = SAOMechanism(issues=[Issue(6, 'a')], outcomes=[{'a': _} for _ in range(6)], n_steps=10)
+    states = []
+    p.add(AspirationNegotiator(name='a1'), ufun=MappingUtilityFunction(lambda x: x['a']))
+    p.add(AspirationNegotiator(name='a2'), ufun=MappingUtilityFunction(lambda x: -x['a']))
+    states.append(p.step())
+    while p.running:
+        states.append(p.step())
+    assert isinstance(p.history, ColumnarHistory)
+    assert [_.__dict__ for _ in p.history] == [_.__dict__ for _ in states]
+    df = p.history.to_dataframe()
+    assert df.current_offer.tolist() == [_.current_offer for _ in states]
+    assert df.step.tolist() == [_.step for _ in states]
+
+
+def test_columnar_history_keeps_values_it_cannot_store_exactly():
+    @dataclass
+    class ExtendedState(MechanismState):
+        extras: List[int] = None
+
+    history = ColumnarHistory()
+    states = [ExtendedState(step=1, extras=[1]), ExtendedState(step=2.5, running=1, extras=[2])
+              , ExtendedState(step=3, time=1, extras=[3])]
+    del states[1].extras
+    for state in states:
+        history.append(state)
+    assert [_.__dict__ for _ in history] == [_.__dict__ for _ in states]
+    assert history[1].step == 2.5 and history[1].running == 1 and history[1].running is not True
+    assert history.to_dataframe().extras.tolist() == [[1], None, [3]]
+
+
+def test_mechanism_registry_does_not_keep_mechanisms_alive():
+    import gc
+    p = SAOMechanism(outcomes=10, n_steps=10)
+    p.add(LimitedOutcomesNegotiator(acceptable_outcomes=[(0,)], outcomes=10), ufun=MappingUtilityFunction(lambda x: 1.0))
+    p.add(LimitedOutcomesNegotiator(acceptable_outcomes=[(1,)], outcomes=10), ufun=MappingUtilityFunction(lambda x: 1.0))
+    p.run()
+    mid = p.id
+    assert Mechanism.get_info(mid) is p.info
+    del p
+    gc.collect()
+    assert mid not in Mechanism.all
+
+
+def _batch_negotiation(kinds, seed, static=True, history_policy='none'):
+    rng = random.Random(seed)
+    p = SAOMechanism(outcomes=20, n_steps=rng.randint(5, 40), history_policy=history_policy)
+    for i, kind in enumerate(kinds):
+        values = [rng.random() for _ in p.outcomes]
+        values = sorted(values, reverse=i % 2 == 1)
+        mapping = dict(zip(p.outcomes, values))
+        ufun = MappingUtilityFunction(mapping if static else lambda x, m=mapping: m[x]
+                                      , reserved_value=rng.choice([0.0, 0.2]))
+        p.add(kind(), ufun=ufun)
+    return p
+
+
+class _SlowAspirationNegotiator(AspirationNegotiator):
+    pass
+
+
+@pytest.mark.parametrize('kinds', [(AspirationNegotiator, AspirationNegotiator)
+    , (AspirationNegotiator, SimpleTitForTatNegotiator), (SimpleTitForTatNegotiator, ToughNegotiator)
+    , (AspirationNegotiator, ToughNegotiator, AspirationNegotiator), (_SlowAspirationNegotiator, AspirationNegotiator)])
+@pytest.mark.parametrize('static', [True, False])
+def test_batch_runner_matches_running_negotiations_one_by_one(kinds, static):
+    expected = [_batch_negotiation(kinds, seed, static) for seed in range(20)]
+    for p in expected:
+        p.run()
+    batch = [_batch_negotiation(kinds, seed, static) for seed in range(20)]
+    runner = SAOBatchRunner(batch)
+    runner.run()
+    assert len(runner) == 0
+    for a, b in zip(expected, batch):
+        assert not b.running
+        assert (a.agreement, a.state.step, a.state.broken, a.state.timedout) \
+               == (b.agreement, b.state.step, b.state.broken, b.state.timedout)
+        assert [_.my_last_proposal for _ in a.negotiators] == [_.my_last_proposal for _ in b.negotiators]
+
+
+def test_batch_runner_can_release_negotiations():
+    batch = [_batch_negotiation((AspirationNegotiator, AspirationNegotiator), seed) for seed in range(5)]
+    expected = [_batch_negotiation((AspirationNegotiator, AspirationNegotiator), seed) for seed in range(5)]
+    for p in expected:
+        p.run()
+    runner = SAOBatchRunner(batch)
+    runner.run(n_steps=3)
+    runner.release()
+    for a, b in zip(expected, batch):
+        if b.running:
+            assert b.state.step == 3
+            b.run()
+        assert (a.agreement, a.state.step) == (b.agreement, b.state.step)
+
+
+def test_batch_runner_uses_the_normal_path_for_histories_and_callbacks():
+    calls = []
+    kinds = (AspirationNegotiator, AspirationNegotiator)
+    expected = [_batch_negotiation(kinds, seed, history_policy='full') for seed in range(5)]
+    for p in expected:
+        p.run()
+    batch = [_batch_negotiation(kinds, seed, history_policy=policy) for seed, policy
+             in zip(range(5), ('full', 'none', 'none', 'full', 'none'))]
+    batch[1].negotiators[0].on_round_start = lambda state: calls.append(state.step)
+    runner = SAOBatchRunner(batch)
+    runner.run()
+    assert len(runner._fast) == 2
+    assert calls == list(range(batch[1].state.step))
+    for a, b in zip(expected, batch):
+        assert (a.agreement, a.state.step) == (b.agreement, b.state.step)
+    for i in (0, 3):
+        assert [(_.step, _.current_offer, _.n_acceptances) for _ in expected[i].history] \
+               == [(_.step, _.current_offer, _.n_acceptances) for _ in batch[i].history]
+
+
+def test_batch_runner_is_repeatable_when_random_is_seeded():
+    kinds = (LimitedOutcomesNegotiator, LimitedOutcomesNegotiator)
+    results = []
+    for _ in range(2):
+        random.seed(123)
+        batch = []
+        for seed in range(10):
+            p = SAOMechanism(outcomes=10, n_steps=30, history_policy='none')
+            for kind in kinds:
+                p.add(kind(acceptable_outcomes=p.outcomes[:5], outcomes=p.outcomes
+                           , acceptance_probabilities=[0.3] * 5)
+                      , ufun=MappingUtilityFunction(lambda x: 1.0))
+            batch.append(p)
+        runner = SAOBatchRunner(batch)
+        runner.run()
+        assert len(runner._fast) == 10
+        results.append([(p.agreement, p.state.step) for p in batch])
+    assert results[0] == results[1]
+
+
+def test_batch_runner_syncs_negotiations_over_issues_and_compiles_each_once():
+    def negotiation(seed, history_policy='none'):
+        p = SAOMechanism(issues=[Issue(10, 'price'), Issue(3, 'quantity')], n_steps=20 + seed
+                         , history_policy=history_policy)
+        p.add(AspirationNegotiator(), ufun=MappingUtilityFunction(lambda x: x['price'] / 9.0))
+        p.add(AspirationNegotiator(), ufun=MappingUtilityFunction(lambda x: 1.0 - x['price'] / 9.0))
+        return p
+
+    expected = [negotiation(seed) for seed in range(5)]
+    for p in expected:
+        p.run()
+    batch = [negotiation(seed, 'full' if seed == 4 else 'none') for seed in range(5)]
+    runner, compiled = SAOBatchRunner(batch), []
+    compile_ = runner._compile
+    runner._compile = lambda m: compiled.append(m) or compile_(m)
+    runner.run(n_steps=3)
+    runner.sync()
+    assert len(runner._fast) == 4
+    assert all(b.running and b.state.step == 3 for b in batch)
+    runner.run()
+    assert sorted(_.id for _ in compiled) == sorted(_.id for _ in batch)
+    for a, b in zip(expected, batch):
+        assert (a.agreement, a.state.step) == (b.agreement, b.state.step)
+
+
 if __name__ == '__main__':
     pytest.main(args=[__file__])
@@ -158,8 +158,8 @@ def test_can_run_a_random_tiny_scml_world_with_no_factory():
     #     print(f'{key}:{world.stats[key]}')
     assert world.stats['n_negotiations'][0] >= n_steps - 1, "at least n negotiations occur where n is the number of " \
                                                             "steps - 1"
-    assert world.stats['n_negotiations'][1:] == [0] * (len(world.stats['n_negotiations']) - 1), "All negotiations " \
-                                                                                                "happen in step 0"
+    assert world.stats['n_negotiations'][1:].tolist() == [0] * (len(world.stats['n_negotiations']) - 1) \
+        , "All negotiations happen in step 0"
     assert sum(world.stats['n_contracts_concluded']) >= sum(world.stats['n_contracts_signed']), "some contracts signed"
     assert sum(world.stats['n_breaches']) == 0, "No breaches"
     assert sum(world.stats['market_size']) == 0, "No change in the market size"
@@ -228,5 +228,217 @@ def test_can_run_a_random_tiny_scml_world_with_no_factory_with_delay_no_immediat
     assert sum(world.stats['market_size']) == 0, "No change in the market size"
 
 
+def test_can_run_a_random_tiny_scml_world_with_batch_negotiations():
+    world = SCMLWorld.single_path_world(log_file_name='', n_steps=10, batch_negotiations=True)
+    world.run()
+    assert sum(world.stats['n_negotiations']) > 0
+    assert len(world._batch_runner._fast) > 0, "negotiations were run by the fast path"
+
+
+def test_anac2019_tournament_can_be_resumed(tmpdir):
+    import sqlite3
+    from negmas.apps.scml.utils import anac2019_tournament
+    kwargs = dict(competitors=['negmas.apps.scml.DoNothingFactoryManager', 'negmas.apps.scml.GreedyFactoryManager']
+                  , randomize=True, n_runs_per_config=1, max_n_runs=2, tournament_path=str(tmpdir)
+                  , parallelism='serial', name='t', n_steps=3)
+    results = anac2019_tournament(**kwargs)
+    assert sorted(results.scores['config'].unique()) == [0, 1]
+    expected = results.scores.groupby('agent_type')['score'].mean().sort_values(ascending=False)
+    assert np.allclose(results.total_scores['score'].values, expected.values)
+    # simulate a tournament interrupted before the first world run finished
+    connection = sqlite3.connect(str(tmpdir / 't' / 'scores.sqlite'))
+    with connection:
+        connection.execute('DELETE FROM scores WHERE config = 0')
+    connection.close()
+    with pytest.raises(ValueError):
+        anac2019_tournament(**kwargs)
+    resumed = anac2019_tournament(resume=True, **kwargs)
+    assert sorted(resumed.scores['config'].unique()) == [0, 1]
+    # only the missing world run is repeated
+    assert set(resumed.scores.loc[resumed.scores['config'] == 1, 'world']) \
+           == set(results.scores.loc[results.scores['config'] == 1, 'world'])
+
+
+def test_anac2019_tournament_replaces_configs_when_not_resuming(tmpdir):
+    from negmas.apps.scml.utils import anac2019_tournament
+    kwargs = dict(competitors=['negmas.apps.scml.DoNothingFactoryManager', 'negmas.apps.scml.GreedyFactoryManager']
+                  , randomize=True, n_runs_per_config=1, tournament_path=str(tmpdir), name='t', configs_only=True)
+    anac2019_tournament(max_n_runs=4, **kwargs)
+    config_path = anac2019_tournament(max_n_runs=2, **kwargs)
+    assert len(list(config_path.glob('*.json'))) == 2
+
+
+def test_indexed_bulletin_board_answers_cfp_queries_like_a_full_scan():
+    import random
+    from negmas.situated import BulletinBoard
+    random.seed(0)
+
+    def value(integer=True):
+        base = random.randint(0, 30) if integer else random.uniform(0, 30)
+        r = random.random()
+        return base if r < 0.4 else (base, base + random.randint(0, 5)) if r < 0.7 else [base, base + 2, base + 4]
+
+    world = SCMLWorld.single_path_world(log_file_name='', n_steps=5)
+    indexed, plain = BulletinBoard(), BulletinBoard()
+    indexed.add_section('cfps')
+    plain.add_section('cfps')
+    # use the same indexes as SCML worlds
+    for definition in world.bulletin_board._index_definitions:
+        indexed.add_index(*definition)
+    keys = []
+    for i in range(1000):
+        cfp = CFP(is_buy=random.random() < 0.5, publisher=f'a{random.randint(0, 20)}', product=random.randint(0, 10)
+                  , time=value(), unit_price=value(False), quantity=value())
+        for board in (indexed, plain):
+            board.record('cfps', cfp, key=cfp.id)
+        keys.append(cfp.id)
+        if random.random() < 0.3:
+            key = keys.pop(random.randint(0, len(keys) - 1))
+            assert indexed.remove('cfps', key=key) and plain.remove('cfps', key=key)
+    generators = {'product': lambda: random.randint(0, 10), 'products': lambda: random.sample(range(11), 3)
+        , 'is_buy': lambda: random.random() < 0.5, 'publisher': lambda: f'a{random.randint(0, 20)}'
+        , 'time': value, 'unit_price': lambda: value(False), 'quantity': value}
+    for _ in range(200):
+        query = {k: v() for k, v in generators.items() if random.random() < 0.35}
+        assert list(indexed.query('cfps', query).keys()) == list(plain.query('cfps', query).keys())
+    query = {'is_buy': True, 'product': 3}
+    assert indexed.remove('cfps', query=query) == plain.remove('cfps', query=query)
+    assert list(indexed.query('cfps', None).keys()) == list(plain.query('cfps', None).keys())
+    assert len(indexed.query('cfps', query)) == 0
+
+
+def test_cfps_follow_changes_of_interesting_products():
+    world = SCMLWorld.single_path_world(log_file_name='', n_steps=5)
+    receiver, publisher = world.miners[0], world.consumers[0]
+    product = [_ for _ in range(len(world.products)) if _ not in receiver.interesting_products][0]
+    received, events = [], []
+    receiver.on_new_cfp = lambda cfp: received.append(cfp.product)
+    world.on_event = lambda event, sender: events.append(event.type)  # as a subclass overriding on_event would
+
+    def publish():
+        publisher.awi.register_cfp(CFP(is_buy=True, publisher=publisher.id, product=product, time=(1, 3)
+                                       , unit_price=(1.0, 2.0), quantity=(1, 2)))
+
+    publish()
+    receiver.interesting_products = receiver.interesting_products + [product]
+    publish()
+    receiver.interesting_products = []
+    publish()
+    assert received == [product]
+    assert events.count('new_record') == 3
+
+
+def test_negotiator_utility_is_cached_until_the_simulator_state_changes():
+    from negmas.apps.scml.factory_managers import PessimisticNegotiatorUtility
+    from negmas.apps.scml.simulators import temporary_transaction
+
+    class CountingUtility(PessimisticNegotiatorUtility):
+        n_calls = 0
+
+        def call(self, agreement):
+            self.n_calls += 1
+            return super().call(agreement)
+
+    world = SCMLWorld.single_path_world(log_file_name='', n_steps=5)
+    world.step()
+    manager = world.factory_managers[0]
+    buyer = world.consumers[0]
+    cfp = CFP(is_buy=True, publisher=buyer.id, product=list(manager.producing.keys())[0], time=(2, 4)
+              , unit_price=(1, 20), quantity=(1, 3))
+    ufun = CountingUtility(agent=manager, annotation=manager._create_annotation(cfp=cfp))
+    outcomes = cfp.outcomes
+    values = [ufun(_) for _ in outcomes]
+    assert ufun.n_calls == len(outcomes)
+    assert [ufun(_) for _ in outcomes] == values == [ufun.call(SCMLAgreement(**_)) for _ in outcomes]
+    assert ufun.n_calls == 2 * len(outcomes)
+    with temporary_transaction(manager.simulator):
+        manager.simulator.pay(10, t=3)
+    ufun(outcomes[0])
+    assert ufun.n_calls == 2 * len(outcomes)
+    manager.simulator.pay(10, t=3)
+    ufun(outcomes[0])
+    assert ufun.n_calls == 2 * len(outcomes) + 1
+
+
+def test_averaging_negotiator_utility_is_initialized_like_other_negotiator_utilities():
+    from negmas.apps.scml.factory_managers import AveragingNegotiatorUtility, PessimisticNegotiatorUtility
+    world = SCMLWorld.single_path_world(log_file_name='', n_steps=5)
+    world.step()
+    manager, buyer = world.factory_managers[0], world.consumers[0]
+    cfp = CFP(is_buy=True, publisher=buyer.id, product=list(manager.producing.keys())[0], time=(2, 4)
+              , unit_price=(1, 20), quantity=(1, 3))
+    annotation = manager._create_annotation(cfp=cfp)
+    ufun = AveragingNegotiatorUtility(agent=manager, annotation=annotation, optimism=0.25)
+    pessimistic = PessimisticNegotiatorUtility(agent=manager, annotation=annotation)
+    assert ufun.name == pessimistic.name and ufun.agent is manager and ufun.annotation is annotation
+    for outcome in cfp.outcomes:
+        assert ufun(outcome) == 0.25 * ufun.optimistic(outcome) + 0.75 * pessimistic(outcome)
+
+
+def test_greedy_scheduler_batch_evaluation_matches_scheduling_each_contract():
+    from negmas.apps.scml.schedulers import Scheduler
+    world = SCMLWorld.single_path_world(log_file_name='', n_steps=10)
+    world.step()
+    manager = world.factory_managers[0]
+    scheduler = manager.scheduler
+    product = list(manager.producing.keys())[0]
+    contracts = []
+    for is_buy in (True, False):
+        partner = world.consumers[0] if is_buy else world.miners[0]
+        cfp = CFP(is_buy=is_buy, publisher=partner.id, product=product if is_buy else list(manager.consuming.keys())[0]
+                  , time=(0, 9), unit_price=(0, 30), quantity=(1, 12))
+        annotation = manager._create_annotation(cfp=cfp)
+        contracts += [Contract(partners=annotation['partners'], agreement=SCMLAgreement(**_), annotation=annotation
+                               , issues=cfp.issues) for _ in cfp.outcomes[::7]]
+    for assume_no_further_negotiations in (False, True):
+        balances, valid = scheduler.evaluate_batch(contracts
+                                                   , assume_no_further_negotiations=assume_no_further_negotiations)
+        expected_balances, expected_valid = Scheduler.evaluate_batch(
+            scheduler, contracts, assume_no_further_negotiations=assume_no_further_negotiations)
+        assert valid.any() and not valid.all()
+        assert (valid == expected_valid).all()
+        assert np.allclose(balances, expected_balances)
+
+
+@pytest.mark.parametrize('stats_format', ['csv', 'parquet', 'feather'])
+def test_world_stats_can_be_saved_and_read_back(tmpdir, stats_format):
+    from pathlib import Path
+    from negmas.situated import save_stats, ColumnarStatsWriter, StatsReader
+    if stats_format != 'csv':
+        pytest.importorskip('pyarrow')
+    world = SCMLWorld.single_path_world(n_intermediate_levels=1, log_file_name='', n_steps=10, negotiation_speed=None)
+    world.run()
+    dataset = tmpdir / 'stats'
+    save_stats(world, log_dir=str(tmpdir / 'world'), writer=stats_format if stats_format == 'csv'
+               else ColumnarStatsWriter(format=stats_format, dataset=str(dataset)))
+    reader = StatsReader(tmpdir / 'world' if stats_format == 'csv' else dataset)
+    assert 'stats' in reader.tables and ('contracts' in reader.tables) == (len(world.saved_contracts) > 0)
+    stats = reader.read('stats', columns=['n_contracts_signed', 'market_size'])
+    assert list(stats.columns) == ['n_contracts_signed', 'market_size']
+    assert stats['n_contracts_signed'].tolist() == world.stats['n_contracts_signed'].tolist()
+    assert np.allclose(stats['market_size'].values, world.stats['market_size'])
+    assert len(reader.read('contracts', columns=['signed'])) == len(world.saved_contracts)
+    if stats_format != 'csv':
+        assert reader.worlds() == [world.name]
+        assert len(reader.read('stats', columns=['world'], worlds=['other'])) == 0
+        # runs sharing a world name (e.g. n_runs_per_config > 1 in tournaments) do not overwrite each other
+        ColumnarStatsWriter(format=stats_format, dataset=str(dataset)).write(world, log_dir=Path(str(tmpdir)))
+        assert reader.worlds() == [world.name]
+        runs = reader.read('stats', columns=['run'])
+        assert len(runs) == 2 * len(world.stats['n_contracts_signed']) and runs['run'].nunique() == 2
+
+
+def test_world_stats_are_saved_as_csv_only_without_pyarrow(tmpdir):
+    import importlib.util
+    from negmas.situated import save_stats, default_stats_format
+    has_pyarrow = importlib.util.find_spec('pyarrow') is not None
+    assert default_stats_format() == ('parquet' if has_pyarrow else 'csv')
+    world = SCMLWorld.single_path_world(log_file_name='', n_steps=5, negotiation_speed=None)
+    world.run()
+    save_stats(world, log_dir=str(tmpdir))
+    assert (tmpdir / 'stats.parquet').exists() == has_pyarrow
+    assert (tmpdir / 'stats.json').exists() != has_pyarrow
+
+
 if __name__ == '__main__':
     pytest.main(args=[__file__])
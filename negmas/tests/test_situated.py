@@ -140,5 +140,106 @@ def test_config_reader_with_a_world_with_enum():
     assert world.negotiation_speed == 2
 
 
+def test_range_index_candidates_are_the_overlapping_ranges():
+    import random
+    from negmas.situated import _RangeIndex
+    rng = random.Random(0)
+    index, ranges = _RangeIndex('r'), {}
+    for i in range(3000):
+        if ranges and rng.random() < 0.3:
+            key = rng.choice(sorted(ranges.keys()))
+            index.remove(key, {'r': ranges.pop(key)})
+        low = rng.randint(0, 100)
+        ranges[f'k{i}'] = (low, low + rng.randint(0, 10)) if rng.random() < 0.8 else low
+        index.add(f'k{i}', {'r': ranges[f'k{i}']})
+        if i % 100 == 0:
+            index.add(f'u{i}', {'r': 'x'})
+            index.remove(f'u{i}', {'r': 'x'})
+        for query in ((rng.randint(0, 110), rng.randint(0, 110)), rng.randint(0, 110)):
+            low, high = index.bounds(query)
+            expected = {k for k, v in ranges.items() if index.bounds(v)[0] <= high and index.bounds(v)[1] >= low}
+            assert index.candidates('r', query) == expected
+
+
+def test_bulletin_board_removes_expired_records():
+    from negmas.situated import BulletinBoard
+    board = BulletinBoard()
+    board.add_section('offers')
+    board.record('offers', {'expires': 3}, key='a')
+    board.set_expiry('offers', 'expires')
+    for key, t in (('b', 1), ('c', 5), ('d', 3), ('e', 2)):
+        board.record('offers', {'expires': t}, key=key)
+    board.record('offers', {'expires': 7}, key='b')  # replaced records expire at their new time
+    board.remove('offers', key='e')
+    assert board.remove_expired('offers', time=0) == 0
+    assert board.remove_expired('offers', time=3) == 2
+    assert list(board.query('offers', None).keys()) == ['b', 'c']
+    assert board.n_records('offers') == 2
+    assert board.remove_expired('offers', time=10) == 2
+    assert board.n_records('offers') == 0
+
+
+def test_event_source_routes_events_to_filtered_listeners():
+    from negmas.events import Event, EventSink, EventSource
+
+    class Sink(EventSink):
+        def __init__(self, name, received):
+            self.name, self.received = name, received
+
+        def on_event(self, event, sender):
+            self.received.append((self.name, event.data))
+
+    received = []
+    source = EventSource()
+    source.set_event_key('e', lambda event: event.data % 3)
+    source.register_listener('e', Sink('all', received))
+    source.register_listener('e', Sink('zero', received), keys=[0])
+    source.register_listener('e', Sink('even', received), predicate=lambda event: event.data % 2 == 0)
+    source.register_listener('e', Sink('not-zero', received), keys=[1, 2])
+    for i in range(4):
+        source.announce(Event('e', i))
+    assert received == [('all', 0), ('zero', 0), ('even', 0), ('all', 1), ('not-zero', 1), ('all', 2), ('even', 2)
+        , ('not-zero', 2), ('all', 3), ('zero', 3)]
+    with pytest.raises(ValueError):
+        source.register_listener('other', Sink('x', received), keys=[0])
+
+
+def test_stats_recorder_grows_promotes_and_pads_columns():
+    import numpy as np
+    from negmas.situated import StatsRecorder
+    stats = StatsRecorder(n_steps=2)
+    stats.add_group('balance', names=['a', 'b'])
+    for i in range(5):
+        stats.append('count', i)
+        stats.append_group('balance', [i, -i])
+    stats.append('level', 1)
+    stats.append('level', 0.5)
+    assert stats.to_dict() == {'balance_a': [0, 1, 2, 3, 4], 'balance_b': [0, -1, -2, -3, -4]
+        , 'count': [0, 1, 2, 3, 4], 'level': [1.0, 0.5]}
+    assert stats['count'].dtype == np.int64 and stats['level'].dtype == np.float64
+    df = stats.as_dataframe()
+    assert len(df) == 5 and list(df.columns) == ['balance_a', 'balance_b', 'count', 'level']
+    assert df['level'].tolist()[:2] == [1.0, 0.5] and np.isnan(df['level'].tolist()[2:]).all()
+
+
+def test_stats_recorder_keeps_bools_and_world_stats_of_missing_keys_are_empty():
+    import json
+    import numpy as np
+    from negmas.situated import StatsRecorder
+    stats = StatsRecorder(n_steps=2)
+    stats.append('flag', True)
+    stats.append('flag', np.bool_(False))
+    stats.append('mixed', True)
+    stats.append('mixed', 3)
+    assert stats['flag'].dtype == np.bool_ and stats['mixed'].dtype == np.int64
+    assert json.dumps(stats.to_dict(), sort_keys=True) == '{"flag": [true, false], "mixed": [1, 3]}'
+    world = DummyWorld(n_steps=2)
+    world.step()
+    assert len(world.stats['never_recorded']) == 0 and 'never_recorded' not in world.stats
+    assert world.stats['n_negotiations'].tolist() == world.stats.to_dict()['n_negotiations'] == [0]
+    with pytest.raises(ValueError):
+        world.stats['n_negotiations'][0] = 1
+
+
 if __name__ == '__main__':
     pytest.main(args=[__file__])
@@ -1,6 +1,8 @@
+import numpy as np
 import pytest
 
 from negmas import *
+from negmas.utilities import _pareto_frontier
 
 
 def test_pareto_frontier_does_not_depend_on_order():
@@ -104,5 +106,101 @@ def test_hypervolume_utility():
             assert u == e
 
 
+def test_pareto_frontier_multiple_agents():
+    rng = np.random.RandomState(0)
+    points = rng.randint(0, 5, size=(300, 3)).astype(float)
+    ufuns = [MappingUtilityFunction(dict(zip([(_,) for _ in range(len(points))], points[:, i]))) for i in range(3)]
+    frontier, indices = pareto_frontier(ufuns, outcomes=[(_,) for _ in range(len(points))])
+    assert len(frontier) == len(indices) == len(set(map(tuple, frontier)))
+    for i, p in enumerate(points):
+        dominated = any(np.all(q >= p) and np.any(q > p) for q in points)
+        if dominated:
+            assert i not in indices
+        else:
+            assert tuple(p) in frontier
+    for u, i in zip(frontier, indices):
+        assert tuple(points[i]) == u
+
+
+@pytest.mark.parametrize('n_dims', [3, 4])
+def test_pareto_frontier_matches_pairwise_dominance_on_large_frontiers(n_dims):
+    # points on a sphere do not dominate each other so most of them are on the frontier
+    rng = np.random.RandomState(0)
+    points = rng.rand(1500, n_dims)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    points = np.vstack((points, points[:50], rng.randint(0, 3, size=(500, n_dims)) / 2.0))
+    frontier, indices = _pareto_frontier(points)
+    expected = []
+    for i, p in enumerate(points):
+        not_smaller = np.all(points >= p, axis=1)
+        if not (not_smaller & np.any(points > p, axis=1)).any() and not not_smaller[:i].any():
+            expected.append(i)
+    assert sorted(indices) == expected
+    assert frontier == [tuple(points[_]) for _ in indices]
+
+
+def test_pareto_frontier_sort_by_welfare():
+    u1 = [0.0, 0.6, 0.3, 1.0, 0.1]
+    u2 = [1.0, 0.6, 0.9, 0.0, 0.1]
+    outcomes = [(_,) for _ in range(5)]
+    f1 = MappingUtilityFunction(dict(zip(outcomes, u1)))
+    f2 = MappingUtilityFunction(dict(zip(outcomes, u2)))
+    frontier, indices = pareto_frontier([f1, f2], outcomes=outcomes)
+    assert indices == [3, 1, 2, 0]
+    frontier, indices = pareto_frontier([f1, f2], outcomes=outcomes, sort_by_welfare=True)
+    assert indices == [1, 2, 3, 0]
+    assert frontier == [(0.6, 0.6), (0.3, 0.9), (1.0, 0.0), (0.0, 1.0)]
+
+
+def _assert_eval_all_matches_call(f, outcomes):
+    expected = [f(_) for _ in outcomes]
+    utils = f.eval_all(outcomes)
+    assert isinstance(utils, np.ndarray)
+    assert len(utils) == len(outcomes)
+    for u, e in zip(utils, expected):
+        if e is None:
+            assert np.isnan(u)
+        else:
+            assert u == pytest.approx(float(e))
+
+
+def test_eval_all_hypervolume():
+    ranges = [None, {0: (1.0, 2.0), 1: (1.0, 2.0)}, {0: (1.4, 2.0), 2: (2.0, 3.0)}]
+    outcomes = [[1.5, 1.5, 2.5], [1.5, 1.5, 1.0], {0: 1.5, 2: 2.5}, {0: 11.5, 1: 11.5, 2: 12.5}, [1.5], {2: 2.5}
+                , None]
+    for ignore_input in (True, False):
+        for ignore_failing in (True, False):
+            f = HyperRectangleUtilityFunction(outcome_ranges=ranges, utilities=[5.0, 2.0, lambda x: 2 * x[2] + x[0]]
+                                              , ignore_issues_not_in_input=ignore_input
+                                              , ignore_failing_range_utilities=ignore_failing)
+            _assert_eval_all_matches_call(f, outcomes)
+
+
+def test_eval_all_linear_and_complex():
+    issues = [Issue(10, 'quantity'), Issue(['delivered', 'not delivered'], 'delivery'), Issue(5, 'quality')]
+    outcomes = enumerate_outcomes(issues)
+    f = LinearUtilityAggregationFunction({'quantity': lambda x: 2.0 * x
+                                             , 'delivery': {'delivered': 10, 'not delivered': -10}
+                                             , 'quality': MappingUtilityFunction(lambda x: x - 3)}
+                                         , weights={'quantity': 1.0, 'delivery': 2.0, 'quality': 4.0})
+    g = MappingUtilityFunction(lambda x: x['quantity'] * x['quality'])
+    _assert_eval_all_matches_call(f, outcomes)
+    _assert_eval_all_matches_call(g, outcomes)
+    _assert_eval_all_matches_call(ComplexWeightedUtilityFunction(ufuns=[f, g], weights=[0.5, 2.0]), outcomes)
+    _assert_eval_all_matches_call(ComplexNonlinearUtilityFunction(ufuns=[f, g]
+                                                                  , combination_function=lambda x: x[0] * x[1])
+                                  , outcomes)
+    _assert_eval_all_matches_call(normalize(f, outcomes), outcomes)
+    _assert_eval_all_matches_call(NonLinearUtilityAggregationFunction({'quantity': lambda x: 2.0 * x}
+                                                                      , f=lambda u: u['quantity'] ** 2), outcomes)
+
+
+def test_eval_all_mapping():
+    outcomes = [(_,) for _ in range(10)]
+    rng = np.random.RandomState(0)
+    f = MappingUtilityFunction(dict(zip(outcomes[:5], rng.random_sample(5))), reserved_value=-1.0)
+    _assert_eval_all_matches_call(f, outcomes + [None])
+
+
 if __name__ == '__main__':
     pytest.main(args=[__file__])
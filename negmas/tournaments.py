@@ -6,13 +6,16 @@ import concurrent.futures as futures
 import copy
 import itertools
 import json
+import os
 import pathlib
 import random
+import sqlite3
 import time
 import traceback
+import uuid
 from os import PathLike
 from pathlib import Path
-from typing import Optional, List, Callable, Union, Type, Sequence
+from typing import Optional, List, Callable, Union, Type, Sequence, Dict, Any, Set, Tuple
 
 import numpy as np
 import pandas as pd
@@ -20,7 +23,7 @@ import yaml
 from dataclasses import dataclass, field
 from typing_extensions import Protocol
 
-from .situated import Agent, World, save_stats
+from .situated import Agent, World, save_stats, ColumnarStatsWriter, default_stats_format
 
 from negmas.helpers import get_class, unique_name, import_by_name, \
     get_full_type_name
@@ -30,6 +33,7 @@ __all__ = [
     'WorldGenerator',
     'WorldRunResults',
     'TournamentResults',
+    'ScoresStore',
     'run_world',
     'process_world_run',
 ]
@@ -92,6 +96,160 @@ class TournamentResults:
     ttest: pd.DataFrame
 
 
+class ScoresStore:
+    """An append-only on-disk store of the scores of a tournament.
+
+    The scores of every world run are appended as soon as the run finishes so that the results of an interrupted
+    tournament are never lost. Per agent-type statistics are updated incrementally on every append which allows
+    calculating total scores, winners and t-tests without loading all the scores.
+
+    Args:
+        path: The directory in which to keep the store
+        backend: Either 'sqlite' (a single `scores.sqlite` file) or 'parquet' (a `scores.parquet` directory with a
+                 file for every world run which requires pyarrow or fastparquet)
+
+    Examples:
+
+        >>> import tempfile
+        >>> store = ScoresStore(tempfile.mkdtemp())
+        >>> store.append(pd.DataFrame({'agent_name': ['a', 'b'], 'agent_type': ['A', 'B'], 'score': [1.0, 0.0]
+        ...                          , 'log_file': '', 'world': 'w1', 'stats_folder': ''}), config=0)
+        >>> store.append(pd.DataFrame({'agent_name': ['a', 'b'], 'agent_type': ['A', 'B'], 'score': [3.0, 1.0]
+        ...                          , 'log_file': '', 'world': 'w2', 'stats_folder': ''}), config=1)
+        >>> store.completed_configs
+        {0, 1}
+        >>> store.total_scores().values.tolist()
+        [['A', 2.0], ['B', 0.5]]
+
+        - The store can be reopened to resume a tournament
+
+        >>> ScoresStore(store.path).winners()[0]
+        ['A']
+
+    """
+
+    columns = ('config', 'agent_name', 'agent_type', 'score', 'log_file', 'world', 'stats_folder')
+    """The columns of the store. `config` is the index of the world run configuration"""
+
+    def __init__(self, path: Union[str, PathLike], backend: str = 'sqlite'):
+        if backend not in ('sqlite', 'parquet'):
+            raise ValueError(f'Unknown scores store backend {backend}')
+        self.path = Path(path)
+        self.backend = backend
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._configs: Set[int] = set()
+        # agent type -> (count, mean, sum of squared deviations from the mean)
+        self._stats: Dict[str, Tuple[int, float, float]] = {}
+        if backend == 'sqlite':
+            with self._connect() as connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS scores (config INTEGER, agent_name TEXT'
+                                   ', agent_type TEXT, score REAL, log_file TEXT, world TEXT, stats_folder TEXT)')
+        else:
+            self._parquet_path.mkdir(exist_ok=True)
+        existing = self._read(columns=['config', 'agent_type', 'score'])
+        if len(existing) > 0:
+            self._update(existing)
+
+    @property
+    def _sqlite_path(self) -> Path:
+        return self.path / 'scores.sqlite'
+
+    @property
+    def _parquet_path(self) -> Path:
+        return self.path / 'scores.parquet'
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self._sqlite_path))
+
+    def _read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        columns = list(self.columns) if columns is None else columns
+        if self.backend == 'sqlite':
+            connection = self._connect()
+            try:
+                return pd.read_sql_query(f'SELECT {", ".join(columns)} FROM scores ORDER BY rowid', connection)
+            finally:
+                connection.close()
+        files = sorted(self._parquet_path.glob('*.parquet'))
+        if len(files) == 0:
+            return pd.DataFrame(columns=columns)
+        return pd.concat([pd.read_parquet(_, columns=columns) for _ in files], ignore_index=True)
+
+    def _update(self, scores: pd.DataFrame) -> None:
+        """Updates the running statistics with new scores"""
+        self._configs.update(int(_) for _ in scores['config'].unique())
+        scores = scores.loc[~scores['agent_type'].isnull(), :]
+        scores = scores.loc[scores['agent_type'].str.len() > 0, :]
+        for agent_type, values in scores.groupby('agent_type', sort=False)['score']:
+            n, mean, m2 = len(values), float(values.mean()), float(((values - values.mean()) ** 2).sum())
+            if agent_type in self._stats:
+                # the parallel variance algorithm of Chan et al.
+                n0, mean0, m20 = self._stats[agent_type]
+                delta = mean - mean0
+                n, mean, m2 = n0 + n, mean0 + delta * n / (n0 + n), m20 + m2 + delta * delta * n0 * n / (n0 + n)
+            self._stats[agent_type] = (n, mean, m2)
+
+    def append(self, scores: pd.DataFrame, config: int) -> None:
+        """Appends the scores of a world run (see `process_world_run`) to the store
+
+        Args:
+            scores: The scores of the run
+            config: The index of the configuration of the run
+        """
+        scores = scores.copy()
+        scores['config'] = config
+        for column in self.columns:
+            if column not in scores.columns:
+                scores[column] = None
+        scores = scores.loc[:, list(self.columns)]
+        if self.backend == 'sqlite':
+            with self._connect() as connection:
+                scores.to_sql('scores', connection, if_exists='append', index=False)
+        else:
+            # the file is moved only after it is completely written so that partial files are never read
+            f_name = self._parquet_path / f'{config:06}-{uuid.uuid4().hex}.parquet'
+            tmp_name = f_name.with_suffix('.tmp')
+            scores.to_parquet(str(tmp_name), index=False)
+            os.replace(str(tmp_name), str(f_name))
+        self._configs.add(config)
+        self._update(scores)
+
+    @property
+    def completed_configs(self) -> Set[int]:
+        """The indices of configurations that have scores in the store"""
+        return set(self._configs)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """All the scores in the store"""
+        return self._read()
+
+    def total_scores(self) -> pd.DataFrame:
+        """The mean score of every agent type sorted descendingly"""
+        return pd.DataFrame(data=[{'agent_type': k, 'score': v[1]} for k, v in self._stats.items()]
+                            , columns=['agent_type', 'score']).sort_values(by='score', ascending=False
+                                                                           , kind='stable').reset_index(drop=True)
+
+    def winners(self) -> Tuple[List[str], np.ndarray, pd.DataFrame]:
+        """The winner types, their scores and the winners table"""
+        total_scores = self.total_scores()
+        winner_table = total_scores.loc[total_scores['score'] == total_scores['score'].max(), :]
+        return winner_table['agent_type'].values.tolist(), winner_table['score'].values, winner_table
+
+    def ttest(self) -> pd.DataFrame:
+        """Independent two-sample t-tests between the scores of every pair of agent types"""
+        from scipy.stats import ttest_ind_from_stats
+        types = list(self._stats.keys())
+        results = []
+        for i, t1 in enumerate(types):
+            for t2 in types[i + 1:]:
+                (n1, mean1, m21), (n2, mean2, m22) = self._stats[t1], self._stats[t2]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    std1 = np.sqrt(m21 / (n1 - 1)) if n1 > 1 else np.nan
+                    std2 = np.sqrt(m22 / (n2 - 1)) if n2 > 1 else np.nan
+                    t, p = ttest_ind_from_stats(mean1, std1, n1, mean2, std2, n2)
+                results.append({'a': t1, 'b': t2, 't': t, 'p': p})
+        return pd.DataFrame(data=results)
+
+
 def run_world(world_info: dict):
     """Runs a world and returns stats. This function is designed to be used with distributed systems like dask.
 
@@ -160,11 +318,16 @@ def _run_world(world_info: dict, world_generator: WorldGenerator,
             - randomize: whether to randomize assignment
             - agent_names_reveal_type: whether agent names reveal type
             - __dir_name: directory to store the world stats
+            - __stats_format: the format of the world stats ('csv', 'parquet' or 'feather', see `save_stats`). If not
+                              given, `default_stats_format` is used
+            - __stats_dataset: the dataset to which the world stats are appended if they are not saved as csv
             - others: values of all other keys are passed to the world generator as kwargs
     """
     world_info = world_info.copy()
     dir_name = world_info['__dir_name']
     del world_info['__dir_name']
+    stats_format = world_info.pop('__stats_format', None) or default_stats_format()
+    stats_dataset = world_info.pop('__stats_dataset', None)
     world = world_generator(**world_info)
     if world_progress_callback is None:
         world.run()
@@ -176,7 +339,8 @@ def _run_world(world_info: dict, world_generator: WorldGenerator,
             if not world.step():
                 break
             world_progress_callback(world)
-    save_stats(world=world, log_dir=dir_name)
+    save_stats(world=world, log_dir=dir_name, writer=stats_format if stats_format == 'csv'
+               else ColumnarStatsWriter(format=stats_format, dataset=stats_dataset))
     scores = score_calculator(world)
     return scores, dir_name
 
@@ -207,10 +371,9 @@ def process_world_run(results: WorldRunResults, tournament_name: str, dir_name:
 
 
 def _run_dask(scheduler_ip, scheduler_port, verbose, world_infos, world_generator, tournament_progress_callback
-              , n_worlds, name, score_calculator) -> List[pd.DataFrame]:
-    """Runs the tournament on dask"""
+              , n_worlds, name, score_calculator, store: ScoresStore, configs: List[int]) -> None:
+    """Runs the tournament on dask storing the scores of every world run as soon as it is received"""
     import distributed
-    scores = []
     if scheduler_ip is None and scheduler_port is None:
         address = None
     else:
@@ -222,9 +385,11 @@ def _run_dask(scheduler_ip, scheduler_port, verbose, world_infos, world_generato
     if verbose:
         print(f'Will use DASK on {address}')
     client = distributed.Client(address=address, set_as_default=True)
-    future_results = []
-    for world_info in world_infos:
-        future_results.append(client.submit(_run_world, world_info, world_generator, score_calculator))
+    future_results, future_configs = [], {}
+    for config, world_info in zip(configs, world_infos):
+        future = client.submit(_run_world, world_info, world_generator, score_calculator)
+        future_results.append(future)
+        future_configs[future.key] = config
     print(f'Submitted all processes to DASK ({len(world_infos)})')
     for i, (future, result) in enumerate(
         distributed.as_completed(future_results, with_results=True, raise_errors=False)):
@@ -232,14 +397,14 @@ def _run_dask(scheduler_ip, scheduler_port, verbose, world_infos, world_generato
             score_, dir_name = result
             if tournament_progress_callback is not None:
                 tournament_progress_callback(score_, i, n_worlds)
-            scores.append(process_world_run(score_, tournament_name=name, dir_name=str(dir_name)))
+            store.append(process_world_run(score_, tournament_name=name, dir_name=str(dir_name))
+                         , config=future_configs[future.key])
         except Exception as e:
             if tournament_progress_callback is not None:
                 tournament_progress_callback(None, i, n_worlds)
             print(traceback.format_exc())
             print(e)
     client.shutdown()
-    return scores
 
 
 def tournament(competitors: Sequence[Union[str, Type[Agent]]]
@@ -259,6 +424,9 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
                , name: str = None
                , verbose: bool = False
                , configs_only: bool = False
+               , results_store: str = 'sqlite'
+               , resume: bool = False
+               , stats_format: Optional[str] = None
                , **kwargs
                ) -> Union[TournamentResults, PathLike]:
     """
@@ -288,6 +456,15 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
         processing
         verbose: Verbosity
         configs_only: If true, a config file for each
+        results_store: The backend used to store scores as soon as every world run finishes. Either 'sqlite' or
+        'parquet' (see `ScoresStore`)
+        resume: If true and a tournament with the same `name` was already started at the same `tournament_path`, its
+        saved configs are reused and only the world runs that have no stored scores are run. Otherwise, configs saved
+        in the same folder by earlier runs are removed and a `ValueError` is raised if the folder already has scores
+        stats_format: The format of the statistics of world runs. 'csv' saves json and csv files in the folder of
+        every world run while 'parquet' and 'feather' append them to a shared `stats` dataset in the tournament folder
+        (see `ColumnarStatsWriter` and `StatsReader`). If not given, 'parquet' is used if pyarrow is installed and
+        'csv' otherwise (see `default_stats_format`)
         kwargs: Arguments to pass to the `world_generator` function
 
     Returns:
@@ -301,11 +478,17 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
     assert world_progress_callback is None or parallelism not in dask_options, f'Cannot use {parallelism} with a world callback'
     if name is None:
         name = unique_name('', add_time=True, rand_digits=0)
+    if stats_format is None:
+        stats_format = default_stats_format()
     competitors = list(set(competitors))
     if tournament_path.startswith('~'):
         tournament_path = Path.home() / ('/'.join(tournament_path.split('/')[1:]))
     tournament_path = (pathlib.Path(tournament_path) / name).absolute()
     tournament_path.mkdir(parents=True, exist_ok=True)
+    store = None if configs_only else ScoresStore(tournament_path, backend=results_store)
+    if store is not None and not resume and len(store.completed_configs) > 0:
+        raise ValueError(f'Tournament {name} already has scores at {str(tournament_path)}. Pass resume=True to '
+                         f'continue it')
     if verbose:
         print(f'Results of Tournament {name} will be saved to {str(tournament_path)}')
     params = {
@@ -318,6 +501,7 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
         'scheduler_ip': scheduler_ip,
         'scheduler_port': scheduler_port,
         'name': name,
+        'stats_format': stats_format,
         'n_worlds_to_run': None
     }
     params.update(kwargs)
@@ -331,7 +515,8 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
             dir_name = tournament_path / world_name
             world_info = {'name': world_name, 'competitors': competitors, 'log_file_name': str(dir_name / 'log.txt')
                 , 'randomize': True, 'agent_names_reveal_type': agent_names_reveal_type
-                , '__dir_name': str(dir_name)}
+                , '__dir_name': str(dir_name), '__stats_format': stats_format
+                , '__stats_dataset': str(tournament_path / 'stats')}
             world_info.update(kwargs)
             world_infos += [world_info.copy() for _ in range(n_runs_per_config)]
     else:
@@ -347,7 +532,8 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
             dir_name = tournament_path / world_name
             world_info = {'name': world_name, 'competitors': list(c), 'log_file_name': str(dir_name / 'log.txt')
                 , 'randomize': False, 'agent_names_reveal_type': agent_names_reveal_type
-                , '__dir_name': str(dir_name)}
+                , '__dir_name': str(dir_name), '__stats_format': stats_format
+                , '__stats_dataset': str(tournament_path / 'stats')}
             world_info.update(kwargs)
             world_infos += [world_info.copy() for _ in range(n_runs_per_config)]
 
@@ -364,15 +550,31 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
         d['__tournament_name'] = name
     config_path = tournament_path / 'configs'
     config_path.mkdir(exist_ok=True, parents=True)
-    for i, conf in enumerate(saved_configs):
-        f_name = config_path / f'{i:06}.json'
-        with open(f_name, 'w') as f:
-            json.dump(conf, f, sort_keys=True, indent=4)
+    config_files = sorted(config_path.glob('*.json'))
+    if resume and len(config_files) > 0:
+        # the configs of the interrupted tournament are used instead of the newly generated (random) ones
+        world_infos = []
+        for f_name in config_files:
+            with open(f_name, 'r') as f:
+                world_info = json.load(f)
+            for k in ('__score_calculator', '__world_generator', '__tournament_name'):
+                world_info.pop(k, None)
+            world_info['competitors'] = [get_class(_) for _ in world_info['competitors']]
+            world_infos.append(world_info)
+    else:
+        # configs left in the folder by an earlier run must not be mixed with the new ones
+        for f_name in config_files:
+            f_name.unlink()
+        for i, conf in enumerate(saved_configs):
+            f_name = config_path / f'{i:06}.json'
+            with open(f_name, 'w') as f:
+                json.dump(conf, f, sort_keys=True, indent=4)
 
     if configs_only:
         return config_path
 
-    scores = []
+    configs = [i for i in range(len(world_infos)) if i not in store.completed_configs]
+    world_infos = [world_infos[i] for i in configs]
     scores_file = str(tournament_path / 'scores.csv')
     n_worlds = len(world_infos)
     params['n_worlds_to_run'] = n_worlds
@@ -382,7 +584,7 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
         print(f'Will run {n_worlds} worlds')
     if parallelism in serial_options:
         strt = time.perf_counter()
-        for i, world_info in enumerate(world_infos):
+        for i, (config, world_info) in enumerate(zip(configs, world_infos)):
             if total_timeout is not None and time.perf_counter() - strt > total_timeout:
                 break
             try:
@@ -391,7 +593,8 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
                                        , score_calculator=score_calculator)
                 if tournament_progress_callback is not None:
                     tournament_progress_callback(score_, i, n_worlds)
-                scores.append(process_world_run(score_, tournament_name=name, dir_name=str(world_info['__dir_name'])))
+                store.append(process_world_run(score_, tournament_name=name, dir_name=str(world_info['__dir_name']))
+                             , config=config)
             except Exception as e:
                 if tournament_progress_callback is not None:
                     tournament_progress_callback(None, i, n_worlds)
@@ -399,10 +602,10 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
                 print(e)
     elif parallelism in multiprocessing_options:
         executor = futures.ProcessPoolExecutor(max_workers=None)
-        future_results = []
-        for world_info in world_infos:
-            future_results.append(executor.submit(_run_world, world_info, world_generator, score_calculator
-                                                  , world_progress_callback))
+        future_results = {}
+        for config, world_info in zip(configs, world_infos):
+            future_results[executor.submit(_run_world, world_info, world_generator, score_calculator
+                                           , world_progress_callback)] = config
         if verbose:
             print(f'Submitted all processes ({len(world_infos)})')
         for i, future in enumerate(futures.as_completed(future_results, timeout=total_timeout)):
@@ -410,7 +613,8 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
                 score_, dir_name = future.result()
                 if tournament_progress_callback is not None:
                     tournament_progress_callback(score_, i, n_worlds)
-                scores.append(process_world_run(score_, tournament_name=name, dir_name=str(dir_name)))
+                store.append(process_world_run(score_, tournament_name=name, dir_name=str(dir_name))
+                             , config=future_results[future])
             except futures.TimeoutError:
                 if tournament_progress_callback is not None:
                     tournament_progress_callback(None, i, n_worlds)
@@ -422,31 +626,21 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
                 print(traceback.format_exc())
                 print(e)
     elif parallelism in dask_options:
-        scores = _run_dask(scheduler_ip, scheduler_port, verbose, world_infos, world_generator
-                           , tournament_progress_callback, n_worlds, name, score_calculator)
+        _run_dask(scheduler_ip, scheduler_port, verbose, world_infos, world_generator
+                  , tournament_progress_callback, n_worlds, name, score_calculator, store=store, configs=configs)
     if verbose:
         print(f'Finding winners')
-    if len(scores) < 1:
+    if len(store.completed_configs) < 1:
         return TournamentResults(scores=pd.DataFrame(), total_scores=pd.DataFrame()
                           , winners=[], winners_scores=np.array([])
                           , ttest=pd.DataFrame())
-    scores: pd.DataFrame = pd.concat(scores, ignore_index=True)
-    scores = pd.DataFrame(data=scores)
+    scores = store.to_dataframe()
     scores.to_csv(scores_file, index_label='index')
     scores = scores.loc[~scores['agent_type'].isnull(), :]
     scores = scores.loc[scores['agent_type'].str.len() > 0, :]
-    total_scores = scores.groupby(['agent_type'])['score'].mean().sort_values(ascending=False).reset_index()
-    winner_table = total_scores.loc[total_scores['score'] == total_scores['score'].max(), :]
-    winners = winner_table['agent_type'].values.tolist()
-    winner_scores = winner_table['score'].values
-    types = list(scores['agent_type'].unique())
-
-    ttest_results = []
-    for i, t1 in enumerate(types):
-        for j, t2 in enumerate(types[i + 1:]):
-            from scipy.stats import ttest_ind
-            t, p = ttest_ind(scores[scores['agent_type'] == t1].score, scores[scores['agent_type'] == t2].score)
-            ttest_results.append({'a': t1, 'b': t2, 't': t, 'p': p})
+    total_scores = store.total_scores()
+    winners, winner_scores, winner_table = store.winners()
+    ttest_results = store.ttest()
 
     if verbose:
         print(f'Tournament completed successfully\nWinners: {list(zip(winners, winner_scores))}')
@@ -454,7 +648,6 @@ def tournament(competitors: Sequence[Union[str, Type[Agent]]]
     scores.to_csv(str(tournament_path / 'scores.csv'), index_label='index')
     total_scores.to_csv(str(tournament_path / 'total_scores.csv'), index_label='index')
     winner_table.to_csv(str(tournament_path / 'winners.csv'), index_label='index')
-    ttest_results = pd.DataFrame(data=ttest_results)
     ttest_results.to_csv(str(tournament_path / 'ttest.csv'), index_label='index')
 
     return TournamentResults(scores=scores, total_scores=total_scores, winners=winners, winners_scores=winner_scores
@@ -31,7 +31,6 @@ from typing import MutableMapping, Mapping, Union, Optional, Any, Sequence, Call
 from typing import TYPE_CHECKING
 
 import numpy as np
-import pkg_resources
 
 from negmas.common import NamedObject
 from negmas.common import MechanismInfo
@@ -145,6 +144,7 @@ class UtilityFunction(ABC, NamedObject):
 
         Examples:
 
+            >>> import pkg_resources
             >>> from negmas import UtilityFunction
             >>> u, d = UtilityFunction.from_genius(file_name = pkg_resources.resource_filename('negmas'
             ...                                      , resource_name='tests/data/Laptop/Laptop-C-prof1.xml'))
@@ -181,6 +181,7 @@ class UtilityFunction(ABC, NamedObject):
 
         Examples:
 
+            >>> import pkg_resources
             >>> from negmas import UtilityFunction
             >>> from negmas import load_genius_domain
             >>> _, _, issues = load_genius_domain(domain_file_name=pkg_resources.resource_filename('negmas'
@@ -257,6 +258,7 @@ class UtilityFunction(ABC, NamedObject):
 
                 Examples:
 
+                    >>> import pkg_resources
                     >>> u, _ = UtilityFunction.from_xml_str(open(pkg_resources.resource_filename('negmas'
                     ...                                      , resource_name='tests/data/Laptop/Laptop-C-prof1.xml')
                     ...                                      , 'r').read(), force_single_issue=False
@@ -335,6 +337,7 @@ class UtilityFunction(ABC, NamedObject):
         real_issues = {}
         issue_info = {}
         issue_keys = {}
+        domain_values = {}
         rects, rect_utils = [], []
 
         def _get_hyperrects(ufun, max_utility, utiltype=float):
@@ -448,12 +451,15 @@ class UtilityFunction(ABC, NamedObject):
                                 continue
                             item_key = item_name if keep_value_names and item_name is not None else item_indx
                             if domain_issues is not None:
-                                domain_all = list(domain_issues[myname].all)
+                                if myname not in domain_values:
+                                    domain_all = list(domain_issues[myname].all)
+                                    domain_values[myname] = (domain_all, set(domain_all))
+                                domain_all, domain_set = domain_values[myname]
                                 if len(domain_all) > 0 and isinstance(domain_all[0], int):
                                     item_key = int(item_key)
                                 if len(domain_all) > 0 and isinstance(domain_all[0], int):
                                     item_name = int(item_name)
-                                if item_name not in domain_all:
+                                if item_name not in domain_set:
                                     raise ValueError(
                                         f'Value {item_name} is not in the domain issue values: '
                                         f'{domain_issues[myname].values}')
@@ -649,6 +655,39 @@ class UtilityFunction(ABC, NamedObject):
             return self.reserved_value
         return None
 
+    def eval_all(self, outcomes: Iterable[Outcome]) -> np.ndarray:
+        """Calculates the utility values of a batch of outcomes.
+
+        Args:
+            outcomes: The outcomes to be evaluated. `None` entries are evaluated to the `reserved_value`.
+
+        Returns:
+            np.ndarray: A float array with one utility value per outcome. Utility distributions are replaced by their
+            expectation (see `eu`) and outcomes for which the utility cannot be calculated are given `np.nan`.
+
+        Examples:
+            >>> f = MappingUtilityFunction({('a',): 1.0, ('b',): 2.0}, reserved_value=-1.0)
+            >>> f.eval_all([('b',), ('a',), None, ('c',)]).tolist()
+            [2.0, 1.0, -1.0, nan]
+
+        Remarks:
+            - Override `eval_all_` (not this method) to provide a vectorized implementation for a utility function
+              type. The default implementation just calls the utility function once per outcome.
+
+        """
+        outcomes = list(outcomes)
+        valid = [i for i, o in enumerate(outcomes) if o is not None]
+        if len(valid) == len(outcomes):
+            return self.eval_all_(outcomes)
+        u = np.full(len(outcomes), _as_float(self.reserved_value), dtype=float)
+        if len(valid) > 0:
+            u[valid] = self.eval_all_([outcomes[_] for _ in valid])
+        return u
+
+    def eval_all_(self, outcomes: List[Outcome]) -> np.ndarray:
+        """Calculates the utility values of a list of outcomes none of which is `None`. Override to vectorize."""
+        return _as_floats(self(o) for o in outcomes)
+
     @classmethod
     def approximate(cls, ufuns: List['UtilityFunction'], issues: Iterable['Issue'], n_outcomes: int, min_per_dim=5
                     , force_single_issue=False) -> Tuple[
@@ -683,7 +722,7 @@ class UtilityFunction(ABC, NamedObject):
 
         utils = []
         for ufun in ufuns:
-            u = [ufun(o) for o in outcomes]
+            u = [_as_utility(_) for _ in ufun.eval_all(outcomes)]
             utils.append(MappingUtilityFunction(mapping=dict(zip(output_outcomes, u))))
 
         return utils, output_outcomes, output_issues
@@ -864,7 +903,7 @@ class UtilityFunction(ABC, NamedObject):
         if isinstance(outcomes, int):
             outcomes = [(_,) for _ in range(outcomes)]
         n_outcomes = len(outcomes)
-        points = np.array([[u1(o), u2(o)] for o in outcomes])
+        points = np.vstack((u1.eval_all(outcomes), u2.eval_all(outcomes))).T
         order = np.random.permutation(np.array(range(n_outcomes)))
         p1, p2 = points[order, 0], points[order, 1]
         signs = []
@@ -909,7 +948,7 @@ class UtilityFunction(ABC, NamedObject):
         if isinstance(outcomes, int):
             outcomes = [(_,) for _ in range(outcomes)]
         n_outcomes = len(outcomes)
-        points = np.array([[u1(o), u2(o)] for o in outcomes])
+        points = np.vstack((u1.eval_all(outcomes), u2.eval_all(outcomes))).T
         order = np.random.permutation(np.array(range(n_outcomes)))
         p1, p2 = points[order, 0], points[order, 1]
         signs = []
@@ -940,6 +979,21 @@ class UtilityFunction(ABC, NamedObject):
         return signs.mean()
 
 
+def _as_float(u: Optional[UtilityValue]) -> float:
+    """Converts a utility value to a float with `None` converted to `np.nan`"""
+    return np.nan if u is None else float(u)
+
+
+def _as_floats(utils: Iterable[Optional[UtilityValue]]) -> np.ndarray:
+    """Converts an iterable of utility values to a float array with `None` converted to `np.nan`"""
+    return np.fromiter((_as_float(_) for _ in utils), dtype=float)
+
+
+def _as_utility(u: float) -> Optional[UtilityValue]:
+    """The inverse of `_as_float`"""
+    return None if np.isnan(u) else float(u)
+
+
 UtilityFunctions = List['UtilityFunction']  # type: ignore
 UtilityFunctionProxy = UtilityFunction
 """A utility function stands as a proxy for itself"""
@@ -977,6 +1031,19 @@ class ExpDiscountedUFun(UtilityFunction):
             factor = self.factor(self.info)
         return (factor ** self.beta) * u
 
+    def eval_all(self, outcomes: Iterable[Outcome]) -> np.ndarray:
+        outcomes = list(outcomes)
+        u = self.ufun.eval_all(outcomes)
+        if self.beta and self.beta != 1.0:
+            if isinstance(self.factor, str):
+                factor = getattr(self.info, self.factor)
+            else:
+                factor = self.factor(self.info)
+            u *= factor ** self.beta
+        if not self.dynamic_reservation:
+            u[[i for i, o in enumerate(outcomes) if o is None]] = _as_float(self.reserved_value)
+        return u
+
     def xml(self, issues: List[Issue]) -> str:
         output = self.ufun.xml(issues)
         output += '</objective>\n'
@@ -1042,6 +1109,19 @@ class LinDiscountedUFun(UtilityFunction):
             factor = self.factor(self.info)
         return u - ((factor * self.cost) ** self.power)
 
+    def eval_all(self, outcomes: Iterable[Outcome]) -> np.ndarray:
+        outcomes = list(outcomes)
+        u = self.ufun.eval_all(outcomes)
+        if self.cost and self.cost != 0.0:
+            if isinstance(self.factor, str):
+                factor = getattr(self.info, self.factor)
+            else:
+                factor = self.factor(self.info)
+            u -= (factor * self.cost) ** self.power
+        if not self.dynamic_reservation:
+            u[[i for i, o in enumerate(outcomes) if o is None]] = _as_float(self.reserved_value)
+        return u
+
     def xml(self, issues: List[Issue]) -> str:
         output = self.ufun.xml(issues)
         output += '</objective>\n'
@@ -1083,6 +1163,9 @@ class ConstUFun(UtilityFunction):
             return self.reserved_value
         return self.value
 
+    def eval_all_(self, outcomes: List[Outcome]) -> np.ndarray:
+        return np.full(len(outcomes), _as_float(self.value), dtype=float)
+
     def xml(self, issues: List[Issue]) -> str:
         pass
 
@@ -1225,6 +1308,16 @@ class LinearUtilityAggregationFunction(UtilityFunction):
                 continue
         return u
 
+    def eval_all_(self, outcomes: List[Outcome]) -> np.ndarray:
+        u = np.zeros(len(outcomes), dtype=float)
+        for k in ikeys(self.issue_utilities):
+            w = iget(self.weights, k)  # type: ignore
+            if w is None:
+                return np.full(len(outcomes), np.nan, dtype=float)
+            # issue utilities are evaluated in batch over the values of this issue in all outcomes
+            u += w * iget(self.issue_utilities, k).eval_all(iget(_, k) for _ in outcomes)
+        return u
+
     def xml(self, issues: List[Issue]) -> str:
         """ Generates an XML string representing the utility function
 
@@ -1395,6 +1488,22 @@ class MappingUtilityFunction(UtilityFunction):
 
         return m
 
+    def eval_all_(self, outcomes: List[Outcome]) -> np.ndarray:
+        # The mapping is applied once per distinct outcome. This is what makes issue utilities of linear ufuns
+        # cheap as an issue usually has far less values than the number of outcomes
+        utils = {}
+        mapped = []
+        for outcome in outcomes:
+            key = tuple(outcome.items()) if isinstance(outcome, dict) else outcome
+            try:
+                u = utils[key]
+            except KeyError:
+                u = utils[key] = self(outcome)
+            except TypeError:
+                u = self(outcome)
+            mapped.append(u)
+        return _as_floats(mapped)
+
     def xml(self, issues: List[Issue]) -> str:
         """
 
@@ -1723,6 +1832,59 @@ class HyperRectangleUtilityFunction(UtilityFunction):
 
         return u
 
+    def eval_all_(self, outcomes: List[Outcome]) -> np.ndarray:
+        n = len(outcomes)
+        u = np.zeros(n, dtype=float)
+        failed = np.zeros(n, dtype=bool)
+        offer_keys = [set(ikeys(_)) for _ in outcomes]
+        columns = {}
+        for weight, outcome_range, mapping in zip(
+            self.weights, self.outcome_ranges, self.mappings
+        ):  # type: ignore
+            if outcome_range is None:
+                inside = np.ones(n, dtype=bool)
+            else:
+                range_keys = set(ikeys(outcome_range))
+                incomplete = np.fromiter((len(range_keys - _) > 0 for _ in offer_keys), dtype=bool, count=n)
+                if not self.ignore_issues_not_in_input:
+                    failed |= incomplete
+                inside = ~incomplete
+                for key in range_keys:
+                    if key not in columns:
+                        columns[key] = [iget(_, key) for _ in outcomes]
+                    inside &= _values_in_range(columns[key], iget(outcome_range, key))
+            inside &= ~failed
+            if isinstance(mapping, float):
+                u[inside] += weight * mapping
+                continue
+            for i in np.nonzero(inside)[0]:
+                try:
+                    # noinspection PyTypeChecker
+                    u[i] += weight * gmap(mapping, outcomes[i])
+                except KeyError:
+                    if not self.ignore_failing_range_utilities:
+                        failed[i] = True
+        u[failed] = np.nan
+        return u
+
+
+def _values_in_range(values: List[Any], constraint: Any) -> np.ndarray:
+    """Checks a column of issue values against the constraint of a single issue in an outcome range
+
+    Remarks:
+        - Implements the same semantics as `outcome_in_range` but is vectorized for numeric (min, max) constraints
+    """
+    if constraint is None:
+        return np.zeros(len(values), dtype=bool)
+    if isinstance(constraint, tuple):
+        try:
+            v = np.asarray(values, dtype=float)
+        except (TypeError, ValueError):
+            pass
+        else:
+            return (constraint[0] < v) & (v < constraint[1])
+    return np.fromiter((outcome_in_range({0: _}, {0: constraint}) for _ in values), dtype=bool, count=len(values))
+
 
 class NonlinearHyperRectangleUtilityFunction(UtilityFunction):
     """A utility function defined as a set of outcome_ranges.
@@ -1812,6 +1974,12 @@ class ComplexWeightedUtilityFunction(UtilityFunction):
                 failure = True
         return u if not failure else None
 
+    def eval_all_(self, outcomes: List[Outcome]) -> np.ndarray:
+        u = np.zeros(len(outcomes), dtype=float)
+        for f, w in zip(self.ufuns, self.weights):
+            u += w * f.eval_all(outcomes)
+        return u
+
     def xml(self, issues: List[Issue]) -> str:
         output = ''
         # @todo implement weights. Here I assume they are always 1.0
@@ -1857,6 +2025,12 @@ class ComplexNonlinearUtilityFunction(UtilityFunction):
             return self.reserved_value
         return self.combination_function([f(offer) for f in self.ufuns])
 
+    def eval_all_(self, outcomes: List[Outcome]) -> np.ndarray:
+        if len(self.ufuns) == 0:
+            return super().eval_all_(outcomes)
+        utils = [[_as_utility(_) for _ in f.eval_all(outcomes)] for f in self.ufuns]
+        return _as_floats(self.combination_function(list(_)) for _ in zip(*utils))
+
     def xml(self, issues: List[Issue]) -> str:
         raise NotImplementedError(f'Cannot convert {self.__class__.__name__} to xml')
 
@@ -2104,59 +2278,133 @@ class IPUtilityFunction(UtilityFunction):
         raise NotImplementedError(f'Cannot convert {self.__class__.__name__} to xml')
 
 
-def _pareto_frontier(points, eps=-1e-18, sort_by_welfare=False) -> Tuple[List[Tuple[float]], List[int]]:
+def _pareto_frontier(points, sort_by_welfare=False) -> Tuple[List[Tuple[float]], List[int]]:
     """Finds the pareto-frontier of a set of points
 
     Args:
         points: list of points
-        eps: A (usually negative) small number to treat as zero during calculations
         sort_by_welfare: If True, the results are sorted descindingly by total welfare
 
     Returns:
+        The utilities of the points on the frontier and their indices in `points`. Unless `sort_by_welfare` is given,
+        the frontier is sorted descendingly by the first utility. Only the first of any set of identical points is
+        kept and points with unknown (nan) utilities are ignored.
+
+    Examples:
+        >>> _pareto_frontier([[0.5, 0.5], [1.0, 0.0], [0.2, 0.2], [0.0, 1.0], [0.5, 0.5]])
+        ([(1.0, 0.0), (0.5, 0.5), (0.0, 1.0)], [1, 0, 3])
+        >>> _pareto_frontier([[0.5, 0.5, 0.5], [1.0, 0.0, 0.0], [0.4, 0.5, 0.5], [0.0, 0.5, 1.0]], sort_by_welfare=True)
+        ([(0.5, 0.5, 0.5), (0.0, 0.5, 1.0), (1.0, 0.0, 0.0)], [0, 3, 1])
+
+    Remarks:
+        - Points are sorted lexicographically (descendingly) so that no point can be dominated by a point after it.
+        - For two dimensions, a point is on the frontier iff its second utility is larger than that of all the points
+          before it which is found using a running maximum.
+        - For more dimensions, a point is on the frontier iff no point before it is at least as large in all the
+          remaining dimensions which is found by divide and conquer in O(n log^(d-2) n) comparisons.
 
     """
-    points = np.asarray(points)
-    n = len(points)
-    indices = np.array(range(n))
-    for j in range(points.shape[1]):
-        order = points[:, 0].argsort()[-1::-1]
-        points = points[order]
-        indices = indices[order]
-
-    frontier = [(indices[0], points[0, :])]
-    for p in range(1, n):
-        current = points[p, :]
-        for i, (_, f) in enumerate(frontier):
-            current_better, current_worse = current > f, current < f
-            if np.all(current == f):
-                break
-            if not np.any(current_better) and np.any(current_worse):
-                # current is dominated, break
-                break
-            if np.any(current_better):
-                if not np.any(current_worse):
-                    # current dominates f, append it, remove f and scan for anything else dominated by current
-                    for j, (_, g) in enumerate(frontier[i + 1:]):
-                        if np.all(current == g):
-                            frontier = frontier[:i] + frontier[i + 1:]
-                            break
-                        if np.any(current > g) and not np.any(current < g):
-                            frontier = frontier[:j] + frontier[j + 1:]
-                    else:
-                        frontier[i] = (indices[p], current)
-                else:
-                    # neither current nor f dominate each other, append current only if it is not
-                    # dominated by anything in frontier
-                    for j, (_, g) in enumerate(frontier[i + 1:]):
-                        if np.all(current == g) or (np.any(g > current) and not np.any(current > g)):
-                            break
-                    else:
-                        frontier.append((indices[p], current))
+    points = np.asarray(points, dtype=float)
+    if points.ndim != 2 or len(points) == 0:
+        return [], []
+    indices = np.nonzero(~np.isnan(points).any(axis=1))[0]
+    points = points[indices]
+    n, n_dims = points.shape
+    if n == 0:
+        return [], []
+    if n_dims > 2:
+        # cheaply remove most dominated points before the exact (but slower) skyline filter
+        undominated = _not_dominated_by_best(points)
+        points, indices = points[undominated], indices[undominated]
+    # a stable sort that is descending on the first dimension then the second and so on
+    order = np.lexsort(tuple(-points[:, _] for _ in reversed(range(n_dims))))
+    points, indices = points[order], indices[order]
+    if n_dims == 1:
+        selected = np.array([0])
+    elif n_dims == 2:
+        best_so_far = np.maximum.accumulate(points[:, 1])
+        selected = np.nonzero(points[:, 1] > np.concatenate(([-np.inf], best_so_far[:-1])))[0]
+    else:
+        # sorting guarantees that earlier points are not smaller in the first dimension
+        selected = np.nonzero(~_dominated_by_earlier(points[:, 1:]))[0]
+    frontier, indices = points[selected], indices[selected]
     if sort_by_welfare:
-        welfare = [np.sum(_[1]) for _ in frontier]
-        indx = sorted(range(len(welfare)), key=lambda x: welfare[x], reverse=True)
-        frontier = [frontier[_] for _ in indx]
-    return [tuple(_[1]) for _ in frontier], [_[0] for _ in frontier]
+        order = np.argsort(-frontier.sum(axis=1), kind='stable')
+        frontier, indices = frontier[order], indices[order]
+    return [tuple(_) for _ in frontier.tolist()], indices.tolist()
+
+
+def _not_dominated_by_best(points: np.ndarray, n_pivots: int = 32, max_comparisons: int = 1 << 22) -> np.ndarray:
+    """Returns a mask of the points not strictly dominated by any of the points with the highest welfare"""
+    n, n_dims = points.shape
+    welfare = points.sum(axis=1)
+    pivots = points[np.argsort(-welfare, kind='stable')[:n_pivots]]
+    mask = np.ones(n, dtype=bool)
+    step = max(1, max_comparisons // (len(pivots) * n_dims))
+    for first in range(0, n, step):
+        chunk = points[None, first:first + step, :]
+        dominated = np.all(pivots[:, None, :] >= chunk, axis=2) & np.any(pivots[:, None, :] > chunk, axis=2)
+        mask[first:first + step] = ~dominated.any(axis=0)
+    return mask
+
+
+def _dominated_by_earlier(points: np.ndarray, leaf_size: int = 512) -> np.ndarray:
+    """Returns a mask of the points weakly dominated by (i.e. not smaller than in any dimension) a point before them
+
+    Remarks:
+        - A divide and conquer: each half is solved recursively then the second half is checked against the
+          non-dominated points of the first half (weak dominance is transitive so the dominated ones add nothing).
+    """
+    n = len(points)
+    if n <= leaf_size:
+        dominates = np.all(points[:, None, :] >= points[None, :, :], axis=2)
+        return np.triu(dominates, k=1).any(axis=0)
+    middle = n // 2
+    first, second = points[:middle], points[middle:]
+    dominated = np.concatenate((_dominated_by_earlier(first, leaf_size), _dominated_by_earlier(second, leaf_size)))
+    candidates = np.nonzero(~dominated[middle:])[0]
+    dominated[middle + candidates] = _dominance_query(first[~dominated[:middle]], second[candidates])
+    return dominated
+
+
+def _dominance_query(dominators: np.ndarray, points: np.ndarray, max_comparisons: int = 1 << 16) -> np.ndarray:
+    """Returns a mask of the points weakly dominated by any of the dominators
+
+    Remarks:
+        - One and two dimensions are answered directly using a maximum and a suffix-maximum respectively.
+        - For more dimensions, both sets are split at the median of the first dimension. Dominators above it weakly
+          exceed all points below it in that dimension so only the remaining dimensions are compared for these pairs.
+    """
+    n_dims = points.shape[1]
+    if len(dominators) == 0 or len(points) == 0:
+        return np.zeros(len(points), dtype=bool)
+    if n_dims == 1:
+        return points[:, 0] <= dominators[:, 0].max()
+    if n_dims == 2:
+        order = np.argsort(dominators[:, 0], kind='stable')
+        firsts = dominators[order, 0]
+        best_seconds = np.maximum.accumulate(dominators[order[::-1], 1])[::-1]
+        locations = np.searchsorted(firsts, points[:, 0], side='left')
+        found = locations < len(firsts)
+        found[found] = best_seconds[locations[found]] >= points[found, 1]
+        return found
+    if len(dominators) * len(points) <= max_comparisons:
+        return np.all(dominators[:, None, :] >= points[None, :, :], axis=2).any(axis=0)
+    median = np.median(np.concatenate((dominators[:, 0], points[:, 0])))
+    high_dominators, high_points = dominators[:, 0] > median, points[:, 0] > median
+    if not high_dominators.any() and not high_points.any():
+        high_dominators, high_points = dominators[:, 0] >= median, points[:, 0] >= median
+        if high_dominators.all() and high_points.all():
+            # all points have the same value in this dimension
+            return _dominance_query(dominators[:, 1:], points[:, 1:], max_comparisons)
+    dominated = np.empty(len(points), dtype=bool)
+    low_points = ~high_points
+    dominated[high_points] = _dominance_query(dominators[high_dominators], points[high_points], max_comparisons)
+    dominated[low_points] = _dominance_query(dominators[~high_dominators], points[low_points], max_comparisons)
+    rest = np.nonzero(low_points)[0]
+    rest = rest[~dominated[rest]]
+    dominated[rest] = _dominance_query(dominators[high_dominators][:, 1:], points[rest, 1:], max_comparisons)
+    return dominated
 
 
 def pareto_frontier(ufuns: Iterable[UtilityFunction], outcomes: Iterable[Outcome] = None
@@ -2188,7 +2436,10 @@ def pareto_frontier(ufuns: Iterable[UtilityFunction], outcomes: Iterable[Outcome
         if issues is None:
             return [], []
         outcomes = itertools.product(*[issue.alli(n=n_discretization) for issue in issues])
-    points = [[ufun(outcome) for ufun in ufuns] for outcome in outcomes]
+    outcomes = list(outcomes)
+    if len(outcomes) == 0:
+        return [], []
+    points = np.vstack([ufun.eval_all(outcomes) for ufun in ufuns]).T
     return _pareto_frontier(points, sort_by_welfare=sort_by_welfare)
 
 
@@ -2207,15 +2458,13 @@ def normalize(ufun: UtilityFunction, outcomes: Collection[Outcome], rng: Tuple[f
         UtilityFunction: A utility function that is guaranteed to be normalized for the set of given outcomes
 
     """
-    u: List[float]
-    u = [ufun(o) for o in outcomes]
+    u = ufun.eval_all(outcomes)
+    u = u[~np.isnan(u)]
     if infeasible_cutoff is not None:
-        u = [float(_) for _ in u if _ is not None and float(_) >= infeasible_cutoff]
-    else:
-        u = [float(_) for _ in u if _ is not None]
+        u = u[u >= infeasible_cutoff]
     if len(u) == 0:
         return ufun
-    mx, mn = max(u), min(u)
+    mx, mn = float(u.max()), float(u.min())
     if abs(mx - 1.0) < epsilon and abs(mn) < epsilon:
         return ufun
     if mx == mn: